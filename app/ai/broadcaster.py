@@ -0,0 +1,123 @@
+"""
+MJPEG Broadcaster
+Encode JPEG 1 lần cho mỗi frame, gửi cùng bytes tới mọi subscriber (async)
+Client chậm chỉ nhận frame mới nhất, không tích backlog
+"""
+
+import asyncio
+import threading
+import cv2
+
+
+def encode_mjpeg_chunk(frame, encode_param):
+    """Encode frame → 1 part của multipart MJPEG stream (None nếu lỗi)"""
+    ret, buffer = cv2.imencode('.jpg', frame, encode_param)
+    if not ret:
+        return None
+    return (b'--frame\r\n'
+            b'Content-Type: image/jpeg\r\n\r\n' + buffer.tobytes() + b'\r\n')
+
+
+class _Subscriber:
+    """Slot 1 phần tử: frame mới đè lên frame cũ chưa gửi"""
+
+    def __init__(self, loop: asyncio.AbstractEventLoop):
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize=1)
+        self.dropped = 0
+
+    def offer(self, chunk):
+        # Chạy trên event loop của subscriber
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(chunk)
+
+
+class FrameBroadcaster:
+    """
+    Producer (pipeline thread) gọi publish(frame)
+    Consumer (StreamingResponse) iterate stream() trên event loop
+    """
+
+    def __init__(self, jpeg_quality: int = 75):
+        self.encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), jpeg_quality]
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+        # Stats
+        self.frames_encoded = 0
+        self.dropped_frames = 0
+
+    @property
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return len(self._subscribers)
+
+    def has_subscribers(self) -> bool:
+        return self.subscriber_count > 0
+
+    def publish(self, frame):
+        """Encode frame 1 lần và phát cho tất cả subscriber (thread-safe)"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if not subscribers:
+            return
+
+        chunk = encode_mjpeg_chunk(frame, self.encode_param)
+        if chunk is None:
+            return
+        self.frames_encoded += 1
+        self._dispatch(subscribers, chunk)
+
+    def publish_encoded(self, chunk: bytes):
+        """Phát chunk MJPEG đã encode sẵn (vd. từ camera worker process)"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        if subscribers:
+            self.frames_encoded += 1
+            self._dispatch(subscribers, chunk)
+
+    def close(self):
+        """Báo cho mọi subscriber kết thúc stream"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        self._dispatch(subscribers, None)
+
+    def _dispatch(self, subscribers, chunk):
+        for sub in subscribers:
+            try:
+                sub.loop.call_soon_threadsafe(sub.offer, chunk)
+            except RuntimeError:
+                # Event loop đã đóng → bỏ subscriber
+                self._unsubscribe(sub)
+
+    def _unsubscribe(self, sub):
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.discard(sub)
+                self.dropped_frames += sub.dropped
+
+    async def stream(self):
+        """Async generator MJPEG cho StreamingResponse"""
+        sub = _Subscriber(asyncio.get_running_loop())
+        with self._lock:
+            self._subscribers.add(sub)
+        try:
+            while True:
+                chunk = await sub.queue.get()
+                if chunk is None:
+                    break
+                yield chunk
+        finally:
+            self._unsubscribe(sub)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            dropped = self.dropped_frames + sum(s.dropped for s in self._subscribers)
+            subscribers = len(self._subscribers)
+        return {
+            "subscribers": subscribers,
+            "frames_encoded": self.frames_encoded,
+            "dropped_frames": dropped,
+        }
@@ -0,0 +1,120 @@
+"""
+Detection Cadence
+- DetectionCadence: chọn số frame giữa 2 lần chạy YOLO theo chuyển động của xe và CPU còn trống
+- MotionPredictor: dự đoán bbox giữa 2 lần detect theo vận tốc của từng track (constant velocity)
+"""
+
+import dataclasses
+import math
+import numpy as np
+import supervision as sv
+
+
+class MotionPredictor:
+    """Vận tốc bbox theo tracker_id, ước lượng từ các lần detect liên tiếp"""
+
+    SMOOTHING = 0.5  # EMA cho vận tốc
+
+    def __init__(self, max_age: float = 2.0):
+        self.max_age = max_age
+        # tracker_id → (xyxy, velocity px/s, timestamp)
+        self._tracks = {}
+
+    def update(self, detections: sv.Detections, now: float):
+        if detections is not None and detections.tracker_id is not None:
+            for xyxy, tracker_id in zip(detections.xyxy, detections.tracker_id):
+                tracker_id = int(tracker_id)
+                xyxy = np.asarray(xyxy, dtype=np.float32)
+                prev = self._tracks.get(tracker_id)
+                velocity = np.zeros(4, dtype=np.float32)
+                if prev is not None and now > prev[2]:
+                    measured = (xyxy - prev[0]) / (now - prev[2])
+                    velocity = self.SMOOTHING * measured + (1 - self.SMOOTHING) * prev[1]
+                self._tracks[tracker_id] = (xyxy, velocity, now)
+
+        # Bỏ các track quá cũ
+        self._tracks = {
+            tid: track for tid, track in self._tracks.items()
+            if now - track[2] <= self.max_age
+        }
+
+    def predict(self, detections: sv.Detections, now: float) -> sv.Detections:
+        """Bbox dự đoán tại thời điểm now (giữ nguyên box nếu không có vận tốc)"""
+        if detections is None or len(detections) == 0 or detections.tracker_id is None:
+            return detections
+        xyxy = detections.xyxy.astype(np.float32, copy=True)
+        for i, tracker_id in enumerate(detections.tracker_id):
+            track = self._tracks.get(int(tracker_id))
+            if track is not None:
+                xyxy[i] = track[0] + track[1] * (now - track[2])
+        return dataclasses.replace(detections, xyxy=xyxy)
+
+    def max_speed(self, frame_width: int) -> float:
+        """Tốc độ tâm bbox lớn nhất, theo tỉ lệ chiều rộng frame / giây"""
+        if not self._tracks or frame_width <= 0:
+            return 0.0
+        speeds = []
+        for _, velocity, _ in self._tracks.values():
+            vx = (velocity[0] + velocity[2]) / 2
+            vy = (velocity[1] + velocity[3]) / 2
+            speeds.append(math.hypot(vx, vy))
+        return max(speeds) / frame_width
+
+
+class DetectionCadence:
+    """
+    interval = số frame giữa 2 lần detect
+    - Xe đang chạy (speed > motion_threshold) → min_interval (mỗi frame)
+    - Có xe nhưng đứng yên → base_interval (FRAME_SKIP)
+    - Lane trống → tăng dần tới max_interval
+    - Không vượt quá cpu_budget (tỉ lệ 1 core dành cho detect của camera này)
+    """
+
+    def __init__(self, base_interval: int, min_interval: int = 1, max_interval: int = 15,
+                 motion_threshold: float = 0.05, cpu_budget: float = 0.7):
+        self.base_interval = base_interval
+        self.min_interval = max(1, min_interval)
+        self.max_interval = max(self.min_interval, max_interval)
+        self.motion_threshold = motion_threshold
+        self.cpu_budget = cpu_budget
+        self.interval = base_interval
+
+        # EMA của thời gian detect và fps của nguồn
+        self.detect_seconds = 0.0
+        self.fps = 0.0
+        self._last_frame_time = None
+
+    def on_frame(self, now: float):
+        """Gọi mỗi frame để ước lượng fps của nguồn"""
+        if self._last_frame_time is not None and now > self._last_frame_time:
+            fps = 1.0 / (now - self._last_frame_time)
+            self.fps = fps if self.fps == 0 else 0.9 * self.fps + 0.1 * fps
+        self._last_frame_time = now
+
+    def update(self, num_detections: int, speed: float, detect_seconds: float):
+        """Cập nhật interval sau mỗi lần detect"""
+        self.detect_seconds = (
+            detect_seconds if self.detect_seconds == 0
+            else 0.8 * self.detect_seconds + 0.2 * detect_seconds
+        )
+
+        if num_detections == 0:
+            interval = min(self.max_interval, max(self.interval, self.base_interval) * 2)
+        elif speed > self.motion_threshold:
+            interval = self.min_interval
+        else:
+            interval = self.base_interval
+
+        # Giới hạn theo CPU: detect_seconds * (fps / interval) <= cpu_budget
+        if self.fps > 0 and self.cpu_budget > 0:
+            cpu_floor = math.ceil(self.detect_seconds * self.fps / self.cpu_budget)
+            interval = max(interval, cpu_floor)
+
+        self.interval = int(min(max(interval, self.min_interval), self.max_interval))
+
+    def get_stats(self) -> dict:
+        return {
+            "detect_interval": self.interval,
+            "detect_ms": round(self.detect_seconds * 1000, 1),
+            "source_fps": round(self.fps, 1),
+        }
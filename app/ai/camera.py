@@ -0,0 +1,106 @@
+"""
+Camera Source
+Mở camera theo cấu hình: device index, RTSP/HTTP URL, hoặc file video (loop)
+Tự reconnect khi mất kết nối
+"""
+
+import time
+import cv2
+from app.core.config import CameraConfig
+
+
+class CameraSource:
+    """Wrapper quanh cv2.VideoCapture cho 1 camera"""
+
+    RECONNECT_DELAY = 2.0  # giây giữa các lần thử mở lại
+
+    def __init__(self, config: CameraConfig):
+        self.config = config
+        self.cap = None
+        self.kind = self._detect_kind(config.source)
+        self._last_open_attempt = 0.0
+        self._frame_interval = 1.0 / config.fps if config.fps > 0 else 0.0
+        self._last_frame_time = 0.0
+
+    @staticmethod
+    def _detect_kind(source) -> str:
+        if isinstance(source, int) or (isinstance(source, str) and source.isdigit()):
+            return "device"
+        if isinstance(source, str) and source.lower().startswith(("rtsp://", "rtmp://", "http://", "https://")):
+            return "stream"
+        return "file"
+
+    def is_opened(self) -> bool:
+        return self.cap is not None and self.cap.isOpened()
+
+    def open(self) -> bool:
+        """Mở camera (có backoff giữa các lần thử)"""
+        if self.is_opened():
+            return True
+
+        now = time.monotonic()
+        if now - self._last_open_attempt < self.RECONNECT_DELAY:
+            return False
+        self._last_open_attempt = now
+
+        self.release()
+        source = self.config.source
+        if self.kind == "device":
+            self.cap = cv2.VideoCapture(int(source))
+        else:
+            self.cap = cv2.VideoCapture(source)
+
+        if not self.cap.isOpened():
+            print(f"[CAMERA] Cannot open {self.config.id}: {source}")
+            return False
+
+        if self.kind == "device":
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.config.width)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.config.height)
+            self.cap.set(cv2.CAP_PROP_FPS, self.config.fps)
+            # Warm up camera
+            for _ in range(5):
+                self.cap.read()
+        elif self.kind == "stream":
+            # Giữ buffer nhỏ để luôn đọc frame mới nhất
+            self.cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+        else:
+            file_fps = self.cap.get(cv2.CAP_PROP_FPS)
+            if file_fps and file_fps > 0:
+                self._frame_interval = 1.0 / file_fps
+
+        print(f"[CAMERA] Opened {self.config.id} ({self.kind}): {source}")
+        return True
+
+    def read(self):
+        """
+        Đọc 1 frame
+        Returns: (ret, frame) — ret False nếu chưa có frame (đang reconnect)
+        """
+        if not self.open():
+            time.sleep(0.1)
+            return False, None
+
+        if self.kind == "file":
+            # File video: giữ tốc độ real-time và loop khi hết
+            wait = self._frame_interval - (time.monotonic() - self._last_frame_time)
+            if wait > 0:
+                time.sleep(wait)
+            ret, frame = self.cap.read()
+            if not ret and self.config.loop:
+                self.cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                ret, frame = self.cap.read()
+            self._last_frame_time = time.monotonic()
+            return ret, frame
+
+        ret, frame = self.cap.read()
+        if not ret:
+            print(f"[CAMERA] Lost frame from {self.config.id}, reconnecting...")
+            self.release()
+        return ret, frame
+
+    def release(self):
+        """Release camera resources"""
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
@@ -0,0 +1,260 @@
+"""
+Camera Manager
+Registry các camera pipeline + OCR worker dùng chung
+Mỗi camera có pipeline, ByteTrack và stats riêng
+"""
+
+from app.core.config import settings, CameraConfig
+from app.services.detection_service import detection_tracker
+from app.services.detection_writer import DetectionWriter
+from app.utils.format_plate import standardize_plate
+from app.utils import validate_plate
+from app.ai.ocr_worker import OCRWorker
+from app.ai.pipeline import CameraPipeline
+from app.ai.yolo import get_model
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from typing import Optional
+import threading
+import time
+
+
+# ✅ GLOBAL CAMERA STATE (singleton pattern)
+class CameraManager:
+    _instance = None
+    _lock = threading.Lock()
+
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+
+    def __init__(self):
+        if self._initialized:
+            return
+
+        self.ocr_worker = None
+        self.running = False
+        self.pipelines = {}  # camera_id → CameraPipeline / RemotePipeline
+        self.loaded = False  # load_cameras() đã chạy xong (chỉ lifespan gọi, route không tự load)
+        self.worker_pool = None
+        self.detector_service = None  # BatchedDetector khi có nhiều camera
+        self.detection_writer = None  # DetectionWriter: ghi DB theo batch
+        self._load_lock = threading.Lock()
+        self._ocr_lock = threading.Lock()
+        self._writer_lock = threading.Lock()
+        self._initialized = True
+
+    def start_ocr_worker(self, processes: Optional[int] = None):
+        """
+        Background OCR worker (micro-batch) không block camera stream
+        processes > 0: dùng OCR process pool (tránh GIL), 0: thread trong process hiện tại
+        """
+        with self._ocr_lock:
+            if self.running:
+                return
+            processes = processes if processes is not None else settings.OCR_PROCESSES
+            if processes > 0:
+                from app.ai.ocr_pool import OCRProcessPool
+                self.ocr_worker = OCRProcessPool(on_result=self._on_ocr_result, processes=processes)
+            else:
+                self.ocr_worker = OCRWorker(on_result=self._on_ocr_result)
+            self.ocr_worker.start()
+            self.running = True
+
+    def submit_ocr(self, camera_id: str, plate_id: str, crop) -> bool:
+        """Queue numpy crop cho OCR worker, kết quả ghi về track state của camera"""
+        pipeline = self.pipelines.get(camera_id)
+        if pipeline is None:
+            return False
+        pipeline.track_states.set_pending(plate_id)
+        if not self.ocr_worker.submit((camera_id, plate_id), crop):
+            # Pool quá tải → bỏ qua, lần sau thử lại
+            pipeline.track_states.clear_pending(plate_id)
+            return False
+        return True
+
+    def recognize(self, crops: list, timeout: float = 10.0) -> list[tuple[str, float]]:
+        """
+        OCR đồng bộ cho ảnh upload qua OCR worker dùng chung (key là Future, không đụng track state)
+        Returns: [(text, score)], "Error" nếu quá tải / quá timeout
+        timeout tính cho cả request (không phải từng crop)
+        """
+        if not crops:
+            return []
+        self.start_ocr_worker()
+        futures = []
+        for crop in crops:
+            future = Future()
+            if not self.ocr_worker.submit(future, crop):
+                future.set_result(("Error", 0.0, None))
+            futures.append(future)
+
+        deadline = time.monotonic() + timeout
+        reads = []
+        for future in futures:
+            try:
+                text, score, _ = future.result(timeout=max(0, deadline - time.monotonic()))
+            except FutureTimeout:
+                text, score = "Error", 0.0
+            reads.append((text, score))
+        return reads
+
+    def _on_ocr_result(self, key, text: str, score: float, char_scores: Optional[list] = None):
+        if isinstance(key, Future):
+            # OCR của ảnh upload (recognize)
+            if not key.done():
+                key.set_result((text, score, char_scores))
+            return
+        # Text thô được vote theo track, chuẩn hóa khi chốt
+        camera_id, plate_id = key
+        pipeline = self.pipelines.get(camera_id)
+        if pipeline is None:
+            return
+        pipeline.handle_ocr_result(plate_id, text, score, char_scores)
+
+    def get_ocr_stats(self) -> dict:
+        return self.ocr_worker.get_stats() if self.ocr_worker is not None else {}
+
+    def start_detector_service(self, cameras: int):
+        """Gom frame của các camera thành batch inference (chỉ khi >= 2 camera và DETECT_BATCH_SIZE > 1)"""
+        if self.detector_service is not None or settings.DETECT_BATCH_SIZE <= 1 or cameras <= 1:
+            return
+        from app.ai.detector_service import BatchedDetector
+        self.detector_service = BatchedDetector(
+            get_model(),
+            max_batch=min(settings.DETECT_BATCH_SIZE, cameras),
+            max_wait_ms=settings.DETECT_BATCH_WAIT_MS
+        )
+        self.detector_service.start()
+
+    def detect(self, camera_id: str, frame):
+        """Detect 1 frame của camera: qua batch service nếu có, ngược lại gọi thẳng detector"""
+        if self.detector_service is not None:
+            return self.detector_service.detect(camera_id, frame)
+        return get_model().detect(frame)
+
+    def get_detector_stats(self) -> dict:
+        return self.detector_service.get_stats() if self.detector_service is not None else {}
+
+    def load_cameras(self, cameras: Optional[list[CameraConfig]] = None, workers: Optional[int] = None):
+        """
+        Tạo pipeline cho từng camera trong config
+        workers > 0: chia camera cho các worker process (mỗi process có OCR riêng)
+        """
+        with self._load_lock:
+            if self.pipelines:
+                return
+            cameras = cameras if cameras is not None else settings.get_cameras()
+            workers = workers if workers is not None else settings.CAMERA_WORKERS
+
+            if workers > 0:
+                from app.ai.camera_workers import CameraWorkerPool
+                self.worker_pool = CameraWorkerPool(cameras, workers)
+                self.pipelines = self.worker_pool.start()
+            else:
+                self.start_ocr_worker()
+                self.start_detector_service(len(cameras))
+                pipelines = {}
+                for config in cameras:
+                    pipelines[config.id] = CameraPipeline(config, self)
+                for pipeline in pipelines.values():
+                    pipeline.start()
+                self.pipelines = pipelines
+
+            self.loaded = True
+            print(f"[CAMERA] Loaded {len(self.pipelines)} camera(s), workers={workers}")
+
+    def get_pipeline(self, camera_id: Optional[str] = None):
+        """
+        Lấy pipeline theo camera_id (None → camera đầu tiên). Trả None nếu không có
+        Không tự load camera: route gọi trên event loop, load + warmup OCR chỉ chạy trong lifespan
+        """
+        if camera_id is None:
+            return next(iter(self.pipelines.values()), None)
+        return self.pipelines.get(camera_id)
+
+    def list_cameras(self) -> list[dict]:
+        return [
+            {
+                "id": camera_id,
+                "name": pipeline.config.name or camera_id,
+                "stats": pipeline.get_stats(),
+            }
+            for camera_id, pipeline in self.pipelines.items()
+        ]
+
+    def _get_writer(self) -> DetectionWriter:
+        """Writer DB dùng chung cho mọi camera (tạo + start lần đầu dùng)"""
+        with self._writer_lock:
+            if self.detection_writer is None:
+                from app.ai.evidence import save_plate_crop
+                self.detection_writer = DetectionWriter(
+                    max_queue=settings.DB_WRITER_QUEUE,
+                    batch_size=settings.DB_WRITER_BATCH,
+                    flush_interval=settings.DB_WRITER_FLUSH_MS / 1000,
+                    save_crop=save_plate_crop
+                )
+                self.detection_writer.start()
+            return self.detection_writer
+
+    def save_detection(self, plate_text: str, confidence: float, tracker_id: int = None,
+                       camera_id: str = None, crop=None) -> bool:
+        """
+        Validate + anti-spam rồi đưa detection vào hàng đợi của writer (không block, không mở session)
+        Reject invalid plates - không lưu nếu format không hợp lệ
+        crop: ảnh bằng chứng (numpy), writer ghi ra disk nếu SAVE_PLATE_CROPS
+        """
+        # Chuẩn hóa trước
+        standardized_plate = standardize_plate(plate_text)
+
+        # Validate plate format trước khi lưu
+        validation_result = validate_plate(standardized_plate)
+        if not validation_result['valid']:
+            print(f"[DB] ✗ REJECTED - Invalid plate format: {standardized_plate} - {validation_result['error']}")
+            return False  # ❌ REJECT - không lưu vào DB
+
+        # ✅ ANTI-SPAM: cooldown theo (camera_id, tracker_id)
+        if tracker_id is not None and not detection_tracker.should_save((camera_id, tracker_id)):
+            print(f"[DB] ⏭️  Skipped (cooldown): {validation_result['plate']}")
+            return False
+
+        return self._get_writer().submit(
+            validation_result['plate'], confidence,
+            raw_text=plate_text,  # Giữ raw text gốc
+            camera_id=camera_id,
+            tracker_id=tracker_id,
+            crop=crop
+        )
+
+    def get_writer_stats(self) -> dict:
+        if self.detection_writer is None:
+            return {"running": False}
+        return self.detection_writer.get_stats()
+
+    def cleanup(self):
+        """Cleanup resources"""
+        self.running = False
+        if self.ocr_worker is not None:
+            self.ocr_worker.stop()
+        for pipeline in self.pipelines.values():
+            pipeline.stop()
+        if self.detector_service is not None:
+            self.detector_service.stop()
+            self.detector_service = None
+        if self.worker_pool is not None:
+            self.worker_pool.stop()
+            self.worker_pool = None
+        self.pipelines = {}
+        self.loaded = False
+        # Flush detection còn trong hàng đợi sau khi pipeline / OCR đã dừng
+        with self._writer_lock:
+            if self.detection_writer is not None:
+                self.detection_writer.stop()
+                self.detection_writer = None
+
+
+# Global camera manager
+camera_manager = CameraManager()
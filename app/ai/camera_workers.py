@@ -0,0 +1,208 @@
+"""
+Camera Worker Processes
+Chia camera cho nhiều process để scale tới hàng chục nguồn trên 1 host
+Mỗi process chạy pipeline + OCR riêng, gửi frame đã encode và plates về web process
+"""
+
+import multiprocessing as mp
+import queue
+import threading
+import time
+import cv2
+from app.core.config import CameraConfig
+from app.ai.broadcaster import FrameBroadcaster, encode_mjpeg_chunk
+
+STATE_INTERVAL = 0.5  # giây giữa các lần gửi plates/stats về web process
+
+
+class QueueBroadcaster:
+    """
+    Broadcaster phía worker process: encode frame rồi đẩy qua multiprocessing queue
+    Chỉ encode khi web process báo có viewer (shared array `watchers`)
+    """
+
+    def __init__(self, camera_id: str, index: int, events, watchers, jpeg_quality: int = 75):
+        self.camera_id = camera_id
+        self.index = index
+        self.events = events
+        self.watchers = watchers
+        self.encode_param = [int(cv2.IMWRITE_JPEG_QUALITY), jpeg_quality]
+        self.frames_encoded = 0
+
+    def has_subscribers(self) -> bool:
+        return self.watchers[self.index] > 0
+
+    def publish(self, frame):
+        chunk = encode_mjpeg_chunk(frame, self.encode_param)
+        if chunk is None:
+            return
+        self.frames_encoded += 1
+        try:
+            self.events.put_nowait(("frame", self.camera_id, chunk))
+        except queue.Full:
+            pass  # Web process chậm → bỏ frame
+
+    def close(self):
+        pass
+
+    def get_stats(self) -> dict:
+        return {"frames_encoded": self.frames_encoded}
+
+
+def _worker_main(worker_index: int, configs: list[dict], events, watchers, stop_event):
+    """Entry point của worker process"""
+    from app.ai.camera_manager import camera_manager
+    from app.ai.pipeline import CameraPipeline
+    from app.ai.runtime import warmup_detector
+
+    # Warmup trước khi nhận frame, rồi báo ready cho web process
+    warmup_detector()
+    # Process daemon không được spawn process con → OCR chạy thread trong worker
+    camera_manager.start_ocr_worker(processes=0)
+    camera_manager.start_detector_service(len(configs))
+    events.put(("ready", None, worker_index))
+    pipelines = {}
+    for index, raw in enumerate(configs):
+        config = CameraConfig(**raw)
+        broadcaster = QueueBroadcaster(config.id, index, events, watchers)
+        pipelines[config.id] = CameraPipeline(config, camera_manager, broadcaster=broadcaster)
+    camera_manager.pipelines = pipelines
+
+    for pipeline in pipelines.values():
+        pipeline.start()
+
+    try:
+        while not stop_event.is_set():
+            for camera_id, pipeline in pipelines.items():
+                try:
+                    events.put(
+                        ("state", camera_id, pipeline.get_latest_plates(), pipeline.get_stats()),
+                        timeout=STATE_INTERVAL
+                    )
+                except queue.Full:
+                    pass
+            stop_event.wait(STATE_INTERVAL)
+    finally:
+        camera_manager.cleanup()
+
+
+class RemotePipeline:
+    """Proxy trong web process cho 1 camera chạy ở worker process"""
+
+    def __init__(self, config: CameraConfig, worker_index: int):
+        self.config = config
+        self.camera_id = config.id
+        self.worker_index = worker_index
+        self.broadcaster = FrameBroadcaster()
+        self.latest_plates = []
+        self.stats = {}
+
+    def start(self):
+        pass  # Worker process đã chạy pipeline
+
+    def stop(self):
+        self.broadcaster.close()
+
+    def stream(self):
+        return self.broadcaster.stream()
+
+    def get_latest_plates(self):
+        return list(self.latest_plates)
+
+    def get_stats(self) -> dict:
+        return {
+            **self.stats,
+            "worker": self.worker_index,
+            **self.broadcaster.get_stats(),
+        }
+
+
+class CameraWorkerPool:
+    """Spawn N worker process, chia camera round-robin"""
+
+    def __init__(self, cameras: list[CameraConfig], workers: int):
+        self.cameras = cameras
+        self.workers = max(1, min(workers, len(cameras)))
+        self.ctx = mp.get_context("spawn")
+        self.events = self.ctx.Queue(maxsize=256)
+        self.stop_event = self.ctx.Event()
+        self.processes = []
+        self.pipelines = {}
+        self._watchers = {}  # camera_id → (shared array, index)
+        self._listener = None
+        self.running = False
+        self.ready_workers = set()
+
+    def start(self) -> dict:
+        groups = [self.cameras[i::self.workers] for i in range(self.workers)]
+        for worker_index, group in enumerate(groups):
+            watchers = self.ctx.Array('i', len(group), lock=False)
+            for index, config in enumerate(group):
+                self.pipelines[config.id] = RemotePipeline(config, worker_index)
+                self._watchers[config.id] = (watchers, index)
+
+            process = self.ctx.Process(
+                target=_worker_main,
+                args=(worker_index, [c.model_dump() for c in group], self.events, watchers, self.stop_event),
+                name=f"camera-worker-{worker_index}",
+                daemon=True,
+            )
+            process.start()
+            self.processes.append(process)
+            print(f"[CAMERA] Worker {worker_index} (pid={process.pid}): {[c.id for c in group]}")
+
+        self.running = True
+        self._listener = threading.Thread(target=self._listen, daemon=True)
+        self._listener.start()
+        return self.pipelines
+
+    def _sync_watchers(self):
+        for camera_id, (watchers, index) in self._watchers.items():
+            watchers[index] = self.pipelines[camera_id].broadcaster.subscriber_count
+
+    def _listen(self):
+        """Nhận frame/plates từ worker process và chuyển cho proxy tương ứng"""
+        last_sync = 0.0
+        while self.running:
+            now = time.monotonic()
+            if now - last_sync > 0.2:
+                self._sync_watchers()
+                last_sync = now
+            try:
+                event = self.events.get(timeout=0.2)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                break
+
+            kind, camera_id = event[0], event[1]
+            if kind == "ready":
+                self._on_worker_ready(event[2])
+                continue
+            pipeline = self.pipelines.get(camera_id)
+            if pipeline is None:
+                continue
+            if kind == "frame":
+                pipeline.broadcaster.publish_encoded(event[2])
+            elif kind == "state":
+                pipeline.latest_plates = event[2]
+                pipeline.stats = event[3]
+
+    def _on_worker_ready(self, worker_index: int):
+        """Detector + OCR chỉ ready khi mọi worker process đã warmup xong"""
+        from app.ai.runtime import readiness
+
+        self.ready_workers.add(worker_index)
+        print(f"[CAMERA] Worker {worker_index} ready [{len(self.ready_workers)}/{self.workers}]")
+        if len(self.ready_workers) == self.workers:
+            readiness.mark_warm("detector")
+            readiness.mark_warm("ocr")
+
+    def stop(self):
+        self.running = False
+        self.stop_event.set()
+        for process in self.processes:
+            process.join(timeout=15)  # Chờ worker flush detection còn trong hàng đợi ghi DB
+            if process.is_alive():
+                process.terminate()
+        self.processes = []
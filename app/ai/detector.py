@@ -0,0 +1,257 @@
+"""
+Plate Detector Backends
+Cùng 1 interface cho nhiều runtime inference trên CPU, luôn trả về sv.Detections
+- torch: ultralytics YOLO (PyTorch eager) — mặc định
+- onnx: ONNX Runtime, weights export 1 lần từ file .pt
+- openvino: OpenVINO IR, weights export 1 lần từ file .pt
+
+Export thủ công: python -m app.ai.detector --format onnx --imgsz 640
+"""
+
+import ast
+import os
+import threading
+import time
+from typing import Optional
+import cv2
+import numpy as np
+import supervision as sv
+
+BACKENDS = ("torch", "onnx", "openvino")
+
+
+def exported_path(weights: str, backend: str) -> str:
+    """Đường dẫn weights đã export cạnh file .pt (theo quy ước đặt tên của ultralytics)"""
+    stem = os.path.splitext(weights)[0]
+    if backend == "onnx":
+        return stem + ".onnx"
+    if backend == "openvino":
+        return stem + "_openvino_model"
+    return weights
+
+
+def export_weights(weights: str, backend: str, imgsz: int = 640) -> str:
+    """Export .pt → ONNX / OpenVINO nếu chưa có (dynamic batch + kích thước input). Returns: đường dẫn"""
+    target = exported_path(weights, backend)
+    if backend == "torch" or os.path.exists(target):
+        return target
+
+    from ultralytics import YOLO
+
+    print(f"[MODEL] Exporting {os.path.basename(weights)} → {backend} (imgsz={imgsz})...")
+    started = time.perf_counter()
+    YOLO(weights).export(format=backend, imgsz=imgsz, dynamic=True, simplify=True)
+    print(f"[MODEL] Export done in {time.perf_counter() - started:.1f}s: {target}")
+    return target
+
+
+def letterbox(frame, imgsz: int):
+    """Resize giữ tỉ lệ + pad về imgsz x imgsz. Returns: (ảnh, ratio, (pad_x, pad_y))"""
+    height, width = frame.shape[:2]
+    ratio = min(imgsz / height, imgsz / width)
+    new_w, new_h = int(round(width * ratio)), int(round(height * ratio))
+    pad_x, pad_y = (imgsz - new_w) / 2, (imgsz - new_h) / 2
+
+    resized = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, left = int(round(pad_y - 0.1)), int(round(pad_x - 0.1))
+    canvas = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    canvas[top:top + new_h, left:left + new_w] = resized
+    return canvas, ratio, (left, top)
+
+
+class Detector:
+    """
+    Base class: detect(frame) / detect_batch(frames) → sv.Detections
+    Subclass chỉ cần implement _infer(frames)
+    """
+
+    backend = "base"
+
+    def __init__(self, imgsz: int = 640, conf: float = 0.25, iou: float = 0.45, threads: int = 0):
+        self.imgsz = imgsz
+        self.conf = conf
+        self.iou = iou
+        self.threads = threads
+        self.names: dict[int, str] = {}
+        # Các camera pipeline dùng chung 1 detector → serialize inference
+        self._lock = threading.Lock()
+
+    def detect(self, frame) -> sv.Detections:
+        return self.detect_batch([frame])[0]
+
+    def detect_batch(self, frames: list) -> list[sv.Detections]:
+        if not frames:
+            return []
+        with self._lock:
+            return self._infer(frames)
+
+    def _infer(self, frames: list) -> list[sv.Detections]:
+        raise NotImplementedError
+
+    def warmup(self) -> float:
+        """1 inference giả để compile graph + cấp phát bộ nhớ. Returns: thời gian (ms)"""
+        dummy_frame = np.full((self.imgsz, self.imgsz, 3), 255, dtype=np.uint8)
+        started = time.perf_counter()
+        self.detect(dummy_frame)
+        return (time.perf_counter() - started) * 1000
+
+    def _to_detections(self, xyxy, confidence, class_id) -> sv.Detections:
+        class_id = class_id.astype(int)
+        return sv.Detections(
+            xyxy=xyxy.astype(np.float32),
+            confidence=confidence.astype(np.float32),
+            class_id=class_id,
+            data={"class_name": np.array([self.names.get(int(c), str(c)) for c in class_id])},
+        )
+
+
+class TorchDetector(Detector):
+    """ultralytics YOLO trên PyTorch"""
+
+    backend = "torch"
+
+    def __init__(self, weights: str, **kwargs):
+        super().__init__(**kwargs)
+        from ultralytics import YOLO
+
+        if self.threads > 0:
+            import torch
+            torch.set_num_threads(self.threads)
+        self.model = YOLO(weights)
+        self.names = dict(self.model.model.names)
+
+    def _infer(self, frames: list) -> list[sv.Detections]:
+        results = self.model(frames, imgsz=self.imgsz, conf=self.conf, iou=self.iou, verbose=False)
+        return [sv.Detections.from_ultralytics(result) for result in results]
+
+
+class _ExportedDetector(Detector):
+    """Pre/post-process chung cho model YOLO đã export (output [B, 4 + num_classes, N])"""
+
+    def _preprocess(self, frames: list):
+        batch, transforms = [], []
+        for frame in frames:
+            image, ratio, pad = letterbox(frame, self.imgsz)
+            batch.append(image)
+            transforms.append((ratio, pad, frame.shape[:2]))
+        # BGR → RGB, HWC → CHW, [0, 1]
+        tensor = np.stack(batch)[..., ::-1].transpose(0, 3, 1, 2)
+        return np.ascontiguousarray(tensor, dtype=np.float32) / 255.0, transforms
+
+    def _postprocess(self, output, transforms) -> list[sv.Detections]:
+        results = []
+        for predictions, (ratio, (pad_x, pad_y), (height, width)) in zip(output, transforms):
+            predictions = predictions.T  # [N, 4 + num_classes]
+            scores = predictions[:, 4:]
+            class_id = scores.argmax(axis=1)
+            confidence = scores[np.arange(len(scores)), class_id]
+            keep = confidence >= self.conf
+            if not keep.any():
+                results.append(sv.Detections.empty())
+                continue
+
+            boxes, confidence, class_id = predictions[keep, :4], confidence[keep], class_id[keep]
+            # cx, cy, w, h (toạ độ letterbox) → x1, y1, x2, y2 (toạ độ frame gốc)
+            xyxy = np.empty_like(boxes)
+            xyxy[:, 0] = boxes[:, 0] - boxes[:, 2] / 2
+            xyxy[:, 1] = boxes[:, 1] - boxes[:, 3] / 2
+            xyxy[:, 2] = boxes[:, 0] + boxes[:, 2] / 2
+            xyxy[:, 3] = boxes[:, 1] + boxes[:, 3] / 2
+            xyxy[:, [0, 2]] = ((xyxy[:, [0, 2]] - pad_x) / ratio).clip(0, width)
+            xyxy[:, [1, 3]] = ((xyxy[:, [1, 3]] - pad_y) / ratio).clip(0, height)
+
+            # NMS theo class (offset box theo class_id)
+            offset = class_id[:, None].astype(np.float32) * 4096
+            nms_boxes = xyxy + offset
+            nms_boxes[:, 2:] -= nms_boxes[:, :2]  # → x, y, w, h
+            indices = cv2.dnn.NMSBoxes(nms_boxes.tolist(), confidence.tolist(), self.conf, self.iou)
+            indices = np.array(indices, dtype=int).reshape(-1)
+            results.append(self._to_detections(xyxy[indices], confidence[indices], class_id[indices]))
+        return results
+
+
+class OnnxDetector(_ExportedDetector):
+    """ONNX Runtime (CPUExecutionProvider)"""
+
+    backend = "onnx"
+
+    def __init__(self, weights: str, **kwargs):
+        super().__init__(**kwargs)
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.threads > 0:
+            options.intra_op_num_threads = self.threads
+            options.inter_op_num_threads = 1
+        self.session = ort.InferenceSession(weights, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+
+        metadata = self.session.get_modelmeta().custom_metadata_map
+        if "names" in metadata:
+            self.names = {int(k): v for k, v in ast.literal_eval(metadata["names"]).items()}
+
+    def _infer(self, frames: list) -> list[sv.Detections]:
+        tensor, transforms = self._preprocess(frames)
+        output = self.session.run(None, {self.input_name: tensor})[0]
+        return self._postprocess(output, transforms)
+
+
+class OpenVINODetector(_ExportedDetector):
+    """OpenVINO IR trên CPU"""
+
+    backend = "openvino"
+
+    def __init__(self, weights: str, **kwargs):
+        super().__init__(**kwargs)
+        import openvino as ov
+        import yaml
+
+        xml = next(
+            os.path.join(weights, f) for f in sorted(os.listdir(weights)) if f.endswith(".xml")
+        )
+        config = {"PERFORMANCE_HINT": "LATENCY"}
+        if self.threads > 0:
+            config["INFERENCE_NUM_THREADS"] = self.threads
+        core = ov.Core()
+        self.compiled = core.compile_model(core.read_model(xml), "CPU", config)
+        self.output = self.compiled.output(0)
+
+        metadata_path = os.path.join(weights, "metadata.yaml")
+        if os.path.exists(metadata_path):
+            with open(metadata_path, encoding="utf-8") as f:
+                names = (yaml.safe_load(f) or {}).get("names", {})
+            self.names = {int(k): v for k, v in names.items()}
+
+    def _infer(self, frames: list) -> list[sv.Detections]:
+        tensor, transforms = self._preprocess(frames)
+        output = self.compiled(tensor)[self.output]
+        return self._postprocess(output, transforms)
+
+
+def create_detector(weights: str, backend: str = "torch", imgsz: int = 640, threads: int = 0,
+                    conf: float = 0.25, iou: float = 0.45, path: Optional[str] = None) -> Detector:
+    """
+    Tạo detector theo backend, export weights lần đầu nếu cần
+    path: dùng file đã export sẵn thay vì đường dẫn mặc định cạnh .pt
+    """
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown detector backend: {backend} (expected one of {BACKENDS})")
+    path = path or export_weights(weights, backend, imgsz)
+    kwargs = dict(imgsz=imgsz, conf=conf, iou=iou, threads=threads)
+    if backend == "onnx":
+        return OnnxDetector(path, **kwargs)
+    if backend == "openvino":
+        return OpenVINODetector(path, **kwargs)
+    return TorchDetector(path, **kwargs)
+
+
+if __name__ == "__main__":
+    import argparse
+    from app.ai.yolo import MODEL_PATH
+
+    parser = argparse.ArgumentParser(description="Export plate detector weights")
+    parser.add_argument("--format", choices=("onnx", "openvino"), default="onnx")
+    parser.add_argument("--imgsz", type=int, default=640)
+    args = parser.parse_args()
+    export_weights(MODEL_PATH, args.format, args.imgsz)
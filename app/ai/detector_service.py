@@ -0,0 +1,162 @@
+"""
+Batched Detector Service
+Gom frame mới nhất của nhiều camera thành 1 batch, chạy 1 lần forward rồi trả kết quả về tracker của từng camera
+- Mỗi pipeline gọi detect(frame) và block tới khi có kết quả (mỗi camera tối đa 1 frame trong batch)
+- batch_size mục tiêu = số camera đang hoạt động (giới hạn bởi max_batch)
+- Cửa sổ chờ tự co lại theo thời gian gom đủ batch thực tế (không vượt max_wait_ms)
+- detect() chờ tối đa max_wait + infer_timeout; stop() / thread chết → báo lỗi ngay, không block pipeline
+"""
+
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError, TimeoutError as FutureTimeout
+from queue import Queue
+import supervision as sv
+from app.ai.ocr_worker import collect_batch
+
+ACTIVE_SECONDS = 1.0  # Camera gửi frame trong khoảng này được coi là đang hoạt động
+
+
+class BatchedDetector:
+    def __init__(self, detector, max_batch: int = 8, max_wait_ms: float = 10.0, infer_timeout: float = 5.0):
+        self.detector = detector
+        self.max_batch = max(1, max_batch)
+        self.max_wait = max_wait_ms / 1000.0
+        self.infer_timeout = infer_timeout
+        self.window = self.max_wait  # Cửa sổ chờ hiện tại (tự điều chỉnh)
+        self.queue = Queue()
+        self.running = False
+        self.thread = None
+        self._last_seen = {}  # camera_id → thời điểm gửi frame gần nhất
+        self._pending = set()  # Future đang chờ kết quả
+        self._pending_lock = threading.Lock()
+
+        # Stats (EMA)
+        self.batches = 0
+        self.frames = 0
+        self.avg_batch_size = 0.0
+        self.avg_wait = 0.0
+        self.avg_infer = 0.0
+        self.timeouts = 0
+
+    @property
+    def names(self) -> dict:
+        return self.detector.names
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        print(f"[DETECT] Batched detector started (max_batch={self.max_batch}, "
+              f"max_wait={self.max_wait * 1000:.0f}ms)")
+
+    def stop(self):
+        self.running = False
+        self.queue.put(None)  # Đánh thức thread đang block
+        # Pipeline đang chờ nhận lỗi ngay → pipeline.stop() join được
+        with self._pending_lock:
+            pending, self._pending = self._pending, set()
+        for future in pending:
+            self._resolve(future, error=RuntimeError("Detector service stopped"))
+
+    def detect(self, camera_id: str, frame):
+        """
+        Gửi frame vào batch kế tiếp, block tới khi có sv.Detections
+        Quá max_wait + infer_timeout → bỏ frame (detections rỗng), camera chạy tiếp
+        Raises: RuntimeError nếu service đã dừng / thread gom batch đã chết
+        """
+        if not self.running or self.thread is None or not self.thread.is_alive():
+            raise RuntimeError("Detector service stopped")
+        future = Future()
+        with self._pending_lock:
+            self._pending.add(future)
+        self._last_seen[camera_id] = time.monotonic()
+        self.queue.put((frame, future))
+        try:
+            return future.result(timeout=self.max_wait + self.infer_timeout)
+        except FutureTimeout:
+            self.timeouts += 1
+            print(f"[DETECT] ✗ Batched detect timed out for {camera_id}, frame skipped")
+            return sv.Detections.empty()
+        finally:
+            with self._pending_lock:
+                self._pending.discard(future)
+
+    @staticmethod
+    def _resolve(future: Future, result=None, error: Exception = None):
+        """Set kết quả 1 lần (stop() và thread gom batch có thể cùng set)"""
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    def _target_batch(self) -> int:
+        now = time.monotonic()
+        active = sum(1 for seen in list(self._last_seen.values()) if now - seen <= ACTIVE_SECONDS)
+        return max(1, min(self.max_batch, active))
+
+    def _run(self):
+        while self.running:
+            target = self._target_batch()
+            started = time.perf_counter()
+            batch, stop = collect_batch(self.queue, target, self.window)
+            waited = time.perf_counter() - started
+            if stop:
+                self.running = False
+            if not batch:
+                continue
+
+            frames = [frame for frame, _ in batch]
+            infer_started = time.perf_counter()
+            try:
+                results = self.detector.detect_batch(frames)
+            except Exception as e:
+                for _, future in batch:
+                    self._resolve(future, error=e)
+                continue
+            infer_seconds = time.perf_counter() - infer_started
+
+            for (_, future), detections in zip(batch, results):
+                self._resolve(future, detections)
+
+            self._update_stats(len(batch), target, waited, infer_seconds)
+
+        # Không để pipeline nào block mãi khi service dừng
+        while not self.queue.empty():
+            item = self.queue.get_nowait()
+            if item is not None:
+                self._resolve(item[1], error=RuntimeError("Detector service stopped"))
+
+    def _update_stats(self, size: int, target: int, waited: float, infer_seconds: float):
+        self.batches += 1
+        self.frames += size
+        alpha = 0.1 if self.batches > 1 else 1.0
+        self.avg_batch_size += alpha * (size - self.avg_batch_size)
+        self.avg_wait += alpha * (waited - self.avg_wait)
+        self.avg_infer += alpha * (infer_seconds - self.avg_infer)
+
+        # Đủ batch → co cửa sổ về ~1.5x thời gian gom thực tế; thiếu → nới dần tới max_wait
+        if size >= target and target > 1:
+            self.window = min(self.max_wait, max(0.001, 1.5 * self.avg_wait))
+        elif size < target:
+            self.window = min(self.max_wait, self.window * 1.25 + 0.0005)
+
+    def get_stats(self) -> dict:
+        return {
+            "max_batch": self.max_batch,
+            "target_batch": self._target_batch(),
+            "avg_batch_size": round(self.avg_batch_size, 2),
+            "window_ms": round(self.window * 1000, 2),
+            "avg_wait_ms": round(self.avg_wait * 1000, 2),
+            "avg_infer_ms": round(self.avg_infer * 1000, 2),
+            "frames_per_second": round(self.avg_batch_size / (self.avg_wait + self.avg_infer), 1)
+            if self.avg_infer > 0 else 0,
+            "batches": self.batches,
+            "frames": self.frames,
+            "timeouts": self.timeouts,
+        }
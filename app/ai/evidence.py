@@ -0,0 +1,31 @@
+"""
+Evidence Storage
+Lưu ảnh crop biển số ra disk làm bằng chứng (tùy chọn, SAVE_PLATE_CROPS)
+Tách khỏi đường OCR: OCR chạy trên numpy array trong RAM
+"""
+
+import os
+import time
+import cv2
+from typing import Optional
+from app.core.config import settings
+
+
+def save_plate_crop(crop, camera_id: str, tracker_id: Optional[int] = None) -> Optional[str]:
+    """
+    Ghi crop ra CROP_DIR với tên file unique (không ghi đè khi trùng tracker_id)
+    Returns: đường dẫn file, hoặc None nếu tắt / lỗi
+    """
+    if not settings.SAVE_PLATE_CROPS or crop is None or crop.size == 0:
+        return None
+
+    os.makedirs(settings.CROP_DIR, exist_ok=True)
+    timestamp_ms = int(time.time() * 1000)
+    track = tracker_id if tracker_id is not None else "na"
+    path = os.path.join(settings.CROP_DIR, f"{camera_id}_{track}_{timestamp_ms}.jpg")
+    try:
+        if cv2.imwrite(path, crop, [int(cv2.IMWRITE_JPEG_QUALITY), 90]):
+            return path
+    except Exception as e:
+        print(f"[EVIDENCE] ✗ Error saving crop: {e}")
+    return None
@@ -0,0 +1,154 @@
+"""
+Image Inference
+Detect / OCR cho ảnh upload (hệ thống bên thứ ba gửi ảnh tĩnh)
+- Chạy trên executor giới hạn (số worker + độ sâu hàng đợi), không block event loop
+- Hết chỗ → ExecutorSaturated (route trả 429) thay vì xếp hàng vô hạn làm chậm dashboard
+- Xử lý numpy trong bộ nhớ, không ghi file tạm, không đụng tracker / track state của camera
+"""
+
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional
+import cv2
+import numpy as np
+import supervision as sv
+from app.core.config import settings
+from app.ai.yolo import get_model, MIN_PLATE_AREA
+
+
+class ExecutorSaturated(Exception):
+    """Executor đã đủ số job đang chạy + đang chờ"""
+
+
+class BoundedExecutor:
+    """ThreadPoolExecutor với giới hạn tổng số job (đang chạy + đang chờ)"""
+
+    def __init__(self, max_workers: int = 1, max_queue: int = 4):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = self.max_workers + max(0, max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="image-inference")
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise ExecutorSaturated(f"Inference queue full ({self.max_pending} jobs)")
+        with self._lock:
+            self.in_flight += 1
+        try:
+            future = self._executor.submit(fn, *args, **kwargs)
+        except Exception:
+            self._release(None)
+            raise
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _):
+        with self._lock:
+            self.in_flight -= 1
+            self.completed += 1
+        self._slots.release()
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "in_flight": self.in_flight,
+                "completed": self.completed,
+                "rejected": self.rejected,
+            }
+
+
+def _to_results(detector, detections) -> list[dict]:
+    return [
+        {
+            "bbox": [int(v) for v in detections.xyxy[i]],
+            "class": detector.names.get(int(detections.class_id[i]), str(detections.class_id[i])),
+            "confidence": float(detections.confidence[i]),
+        }
+        for i in range(len(detections))
+    ]
+
+
+def detect_frame(frame) -> list[dict]:
+    """Chỉ detect: [{bbox, class, confidence}]"""
+    return detect_frames([frame])[0]
+
+
+def detect_frames(frames: list) -> list[list[dict]]:
+    """Detect cả batch ảnh trong 1 lần forward"""
+    detector = get_model()
+    return [_to_results(detector, detections) for detections in detector.detect_batch(frames)]
+
+
+def process_frame(frame, camera_manager, annotate: bool = True, timeout: float = 10.0):
+    """
+    Detect + OCR các biển số trong 1 ảnh
+    Returns: (danh sách detection, ảnh đã annotate hoặc None)
+    """
+    results = process_frames([frame], camera_manager, timeout=timeout)[0]
+    annotated = None
+    if annotate:
+        from app.ai.pipeline import annotate_frame
+
+        detections = sv.Detections(xyxy=np.array([r["bbox"] for r in results], dtype=np.float32).reshape(-1, 4))
+        labels = [r.get("text") or f"{r['class']} {r['confidence']:.2f}" for r in results]
+        annotated = annotate_frame(frame, detections, labels)
+    return results, annotated
+
+
+def process_frames(frames: list, camera_manager, timeout: float = 10.0) -> list[list[dict]]:
+    """
+    Detect + OCR cho cả batch ảnh: 1 lần detect_batch, crop biển số của mọi ảnh gửi OCR cùng lúc
+    OCR đi qua OCR worker dùng chung (không load model thứ 2), chờ tối đa timeout giây
+    """
+    from app.ai.plate_tracking import preprocess_plate_crop
+    from app.utils.format_plate import standardize_plate
+    from app.utils import validate_plate
+
+    batch_results = detect_frames(frames)
+    targets, crops = [], []
+    for frame, results in zip(frames, batch_results):
+        for result in results:
+            if result["class"] != 'License_Plate':
+                continue
+            x1, y1, x2, y2 = result["bbox"]
+            crop = frame[max(y1, 0):y2, max(x1, 0):x2]
+            if (x2 - x1) * (y2 - y1) < MIN_PLATE_AREA or crop.size == 0:
+                result["text"] = "Small plate"
+                continue
+            targets.append(result)
+            crops.append(preprocess_plate_crop(crop))
+
+    for result, (text, score) in zip(targets, camera_manager.recognize(crops, timeout=timeout)):
+        result["raw_text"] = text
+        result["ocr_score"] = round(score, 4)
+        if text in ("No text", "Error"):
+            result["text"] = text
+            continue
+        plate = standardize_plate(text)
+        validation = validate_plate(plate)
+        result["text"] = validation['plate'] if validation['valid'] else plate
+        result["valid"] = validation['valid']
+    return batch_results
+
+
+def decode_image(contents: bytes) -> Optional[object]:
+    """bytes upload → numpy BGR (None nếu không phải ảnh)"""
+    return cv2.imdecode(np.frombuffer(contents, np.uint8), cv2.IMREAD_COLOR)
+
+
+# Executor dùng chung cho các endpoint upload
+inference_executor = BoundedExecutor(
+    max_workers=settings.UPLOAD_INFERENCE_WORKERS,
+    max_queue=settings.UPLOAD_INFERENCE_QUEUE
+)
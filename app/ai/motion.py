@@ -0,0 +1,68 @@
+"""
+Motion Gate
+Phát hiện chuyển động rẻ trên frame đã thu nhỏ (background subtraction bằng running average)
+Đặt trước YOLO: lane trống / cảnh tĩnh → bỏ qua detect, có chuyển động → detect lại ngay
+"""
+
+from typing import Optional, Sequence
+import cv2
+import numpy as np
+
+
+class MotionGate:
+    """
+    roi: [x1, y1, x2, y2] theo tỉ lệ 0..1 của frame (None = cả frame)
+    Còn coi là "active" thêm hold_seconds sau lần chuyển động cuối để track kịp kết thúc
+    """
+
+    def __init__(self, roi: Optional[Sequence[float]] = None, width: int = 160, pixel_threshold: int = 25,
+                 min_area: float = 0.002, hold_seconds: float = 2.0, learning_rate: float = 0.05):
+        self.roi = roi
+        self.width = width
+        self.pixel_threshold = pixel_threshold
+        self.min_area = min_area
+        self.hold_seconds = hold_seconds
+        self.learning_rate = learning_rate
+
+        self._background = None
+        self._last_motion = None
+        self.motion_ratio = 0.0
+        self.active = True
+
+    def _prepare(self, frame):
+        """Thu nhỏ, xám, blur, cắt ROI"""
+        height, width = frame.shape[:2]
+        small_h = max(1, int(height * self.width / width))
+        small = cv2.resize(frame, (self.width, small_h), interpolation=cv2.INTER_AREA)
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY) if small.ndim == 3 else small
+        gray = cv2.GaussianBlur(gray, (5, 5), 0)
+        if self.roi:
+            x1, y1, x2, y2 = self.roi
+            gray = gray[int(y1 * small_h):max(int(y2 * small_h), 1), int(x1 * self.width):max(int(x2 * self.width), 1)]
+        return gray
+
+    def update(self, frame, now: float) -> bool:
+        """Cập nhật background với frame mới. Returns True nếu nên chạy detect"""
+        gray = self._prepare(frame)
+        if self._background is None or self._background.shape != gray.shape:
+            self._background = gray.astype(np.float32)
+            self._last_motion = now
+            self.active = True
+            return True
+
+        diff = cv2.absdiff(gray, cv2.convertScaleAbs(self._background))
+        _, mask = cv2.threshold(diff, self.pixel_threshold, 255, cv2.THRESH_BINARY)
+        self.motion_ratio = cv2.countNonZero(mask) / mask.size
+        # Background thích nghi dần với thay đổi ánh sáng / xe đỗ lâu
+        cv2.accumulateWeighted(gray, self._background, self.learning_rate)
+
+        if self.motion_ratio >= self.min_area:
+            self._last_motion = now
+        self.active = now - self._last_motion <= self.hold_seconds
+        return self.active
+
+    def get_stats(self) -> dict:
+        return {
+            "motion_active": self.active,
+            "motion_ratio": round(self.motion_ratio, 4),
+        }
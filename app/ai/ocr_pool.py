@@ -0,0 +1,267 @@
+"""
+OCR Process Pool
+Chạy OCR trên nhiều process để tránh GIL của web process
+- Mỗi process load PaddleOCR 1 lần
+- Crop được ghi vào shared memory (slot cố định), chỉ gửi (slot, shape) qua queue
+- Kết quả trả về qua results queue, callback on_result(key, text, score, char_scores) như OCRWorker
+- Mỗi process 1 task queue riêng → biết slot nào đang ở process nào
+- Process chết: trả slot (kết quả "Error"), spawn lại; load model lỗi → readiness.mark_error("ocr")
+"""
+
+import multiprocessing as mp
+import os
+import queue
+import threading
+from multiprocessing import shared_memory
+from typing import Callable, Optional
+import cv2
+import numpy as np
+from app.core.config import settings
+from app.ai.ocr_worker import resolve_batch_params, collect_batch
+
+
+def _slot_view(shm, slot: int, slot_bytes: int, shape):
+    return np.ndarray(shape, dtype=np.uint8, buffer=shm.buf, offset=slot * slot_bytes)
+
+
+def _ocr_process_main(shm_name, slot_bytes, tasks, results, batch_size, max_wait):
+    """Entry point của OCR process"""
+    from app.ai.ocr_worker import load_ocr_model, recognize_crops, warmup_ocr
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        ocr = load_ocr_model()
+        warmup_ms = warmup_ocr(ocr)
+    except Exception as e:
+        results.put(("error", os.getpid(), f"{e.__class__.__name__}: {e}"))
+        shm.close()
+        return
+    # Báo web process khi model đã warmup (tuple, phân biệt với list kết quả)
+    results.put(("ready", os.getpid(), warmup_ms))
+    try:
+        while True:
+            batch, stop = collect_batch(tasks, batch_size, max_wait)
+            if batch:
+                slots = [slot for slot, _ in batch]
+                # Copy ra khỏi shared memory trước khi OCR
+                crops = [_slot_view(shm, slot, slot_bytes, shape).copy() for slot, shape in batch]
+                try:
+                    reads = recognize_crops(ocr, crops)
+                except Exception as e:
+                    print(f"OCR Error: {e}")
+                    reads = [("Error", 0.0, None)] * len(batch)
+                results.put([(slot, *read) for slot, read in zip(slots, reads)])
+            if stop:
+                break
+    finally:
+        shm.close()
+
+
+class OCRProcessPool:
+    """Cùng interface với OCRWorker: start / stop / submit / get_stats"""
+
+    def __init__(
+        self,
+        on_result: Callable[[object, str, float, Optional[list]], None],
+        processes: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+    ):
+        self.on_result = on_result
+        self.processes = max(1, processes or settings.OCR_PROCESSES)
+        self.batch_size, self.max_wait = resolve_batch_params(batch_size, max_wait_ms)
+        self.slot_bytes = settings.OCR_SHM_SLOT_KB * 1024
+        self.n_slots = max(8, self.processes * self.batch_size * 2)
+
+        self.ctx = mp.get_context("spawn")
+        self.results = self.ctx.Queue()
+        self.shm = None
+        self.free_slots = queue.Queue()
+        self.pending = {}  # slot → (key, index của process)
+        self._pending_lock = threading.Lock()
+        self.workers = []  # [(process, task queue)] theo index
+        self._ready = set()  # pid đã warmup
+        self._failed = set()  # index load model lỗi → không spawn lại
+        self.running = False
+        self._listener = None
+
+        # Stats
+        self.batches = 0
+        self.items = 0
+        self.rejected = 0
+        self.ready_workers = 0
+        self.restarts = 0
+
+    def start(self):
+        if self.running:
+            return
+        self.shm = shared_memory.SharedMemory(create=True, size=self.n_slots * self.slot_bytes)
+        for slot in range(self.n_slots):
+            self.free_slots.put(slot)
+
+        self.workers = [self._spawn(index) for index in range(self.processes)]
+
+        self.running = True
+        self._listener = threading.Thread(target=self._listen, daemon=True)
+        self._listener.start()
+        print(f"[OCR] Process pool started (processes={self.processes}, slots={self.n_slots}, "
+              f"batch_size={self.batch_size}, max_wait={self.max_wait * 1000:.0f}ms)")
+
+    def _spawn(self, index: int):
+        tasks = self.ctx.Queue()
+        process = self.ctx.Process(
+            target=_ocr_process_main,
+            args=(self.shm.name, self.slot_bytes, tasks, self.results, self.batch_size, self.max_wait),
+            name=f"ocr-worker-{index}",
+            daemon=True,
+        )
+        process.start()
+        return process, tasks
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        for process, tasks in self.workers:
+            if process.is_alive():
+                tasks.put(None)
+        for process, _ in self.workers:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        with self._pending_lock:
+            self.workers = []
+        self.results.put(None)  # Đánh thức listener
+        if self._listener is not None:
+            self._listener.join(timeout=2)
+        if self.shm is not None:
+            self.shm.close()
+            self.shm.unlink()
+            self.shm = None
+
+    def submit(self, key, crop) -> bool:
+        """
+        Copy crop vào 1 slot shared memory và gửi cho process đang ít việc nhất
+        Không block thread camera: Returns False ngay nếu pool quá tải (hết slot) hoặc không còn process
+        """
+        crop = np.ascontiguousarray(crop, dtype=np.uint8)
+        if crop.nbytes > self.slot_bytes:
+            # Thu nhỏ để vừa slot
+            scale = (self.slot_bytes / crop.nbytes) ** 0.5
+            h, w = crop.shape[:2]
+            crop = np.ascontiguousarray(cv2.resize(crop, (max(1, int(w * scale)), max(1, int(h * scale)))))
+
+        try:
+            slot = self.free_slots.get_nowait()
+        except queue.Empty:
+            self.rejected += 1
+            return False
+
+        _slot_view(self.shm, slot, self.slot_bytes, crop.shape)[...] = crop
+        with self._pending_lock:
+            alive = [i for i, (process, _) in enumerate(self.workers) if process.is_alive()]
+            if not alive:
+                self.free_slots.put(slot)
+                self.rejected += 1
+                return False
+            in_flight = [index for _, index in self.pending.values()]
+            index = min(alive, key=in_flight.count)
+            self.pending[slot] = (key, index)
+            self.workers[index][1].put((slot, crop.shape))
+        return True
+
+    def _listen(self):
+        """Nhận kết quả từ các OCR process, trả slot và gọi callback; giám sát process chết"""
+        while self.running:
+            try:
+                batch = self.results.get(timeout=0.5)
+            except queue.Empty:
+                self._check_workers()
+                continue
+            except (EOFError, OSError):
+                break
+            if batch is None:
+                break
+            if isinstance(batch, tuple):
+                if batch[0] == "ready":
+                    self._on_worker_ready(batch[1], batch[2])
+                elif batch[0] == "error":
+                    self._on_worker_error(batch[1], batch[2])
+                continue
+
+            self.batches += 1
+            self.items += len(batch)
+            for slot, text, score, char_scores in batch:
+                self._complete(slot, text, score, char_scores)
+            self._check_workers()
+
+    def _complete(self, slot: int, text: str, score: float, char_scores=None):
+        """Trả slot về pool và gọi callback"""
+        with self._pending_lock:
+            entry = self.pending.pop(slot, None)
+        self.free_slots.put(slot)
+        if entry is None:
+            return
+        try:
+            self.on_result(entry[0], text, score, char_scores)
+        except Exception as e:
+            print(f"OCR result callback error: {e}")
+
+    def _check_workers(self):
+        """Process chết: trả các slot nó đang giữ (kết quả "Error") và spawn lại"""
+        if not self.running:
+            return
+        for index, (process, _) in enumerate(self.workers):
+            if process.is_alive() or index in self._failed:
+                continue
+            with self._pending_lock:
+                lost = [slot for slot, (_, i) in self.pending.items() if i == index]
+            for slot in lost:
+                self._complete(slot, "Error", 0.0)
+            if process.pid in self._ready:
+                self._ready.discard(process.pid)
+                self.ready_workers -= 1
+            else:
+                # Chết trước khi warmup xong mà không gửi "error" (crash / OOM khi load model)
+                self._on_worker_error(process.pid, f"exit code {process.exitcode} before ready")
+                continue
+            print(f"[OCR] ✗ Process {process.pid} died (exit code {process.exitcode}), "
+                  f"{len(lost)} crops lost, restarting")
+            self.restarts += 1
+            self.workers[index] = self._spawn(index)
+
+    def _on_worker_error(self, pid: int, error: str):
+        """Load model lỗi: không spawn lại (sẽ lỗi tiếp), báo readiness"""
+        from app.ai.runtime import readiness
+
+        for index, (process, _) in enumerate(self.workers):
+            if process.pid == pid:
+                self._failed.add(index)
+        readiness.mark_error("ocr", f"OCR process {pid}: {error}")
+
+    def _on_worker_ready(self, pid: int, warmup_ms: float):
+        from app.ai.runtime import readiness
+
+        self._ready.add(pid)
+        self.ready_workers += 1
+        print(f"[OCR] Process {pid} ready (warmup {warmup_ms:.0f}ms) "
+              f"[{self.ready_workers}/{self.processes}]")
+        if self.ready_workers == self.processes:
+            readiness.mark_warm("ocr", warmup_ms)
+
+    def get_stats(self) -> dict:
+        return {
+            "processes": self.processes,
+            "alive": sum(1 for process, _ in self.workers if process.is_alive()),
+            "ready": self.ready_workers,
+            "failed": len(self._failed),
+            "restarts": self.restarts,
+            "batch_size": self.batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "in_flight": len(self.pending),
+            "free_slots": self.free_slots.qsize(),
+            "batches": self.batches,
+            "items": self.items,
+            "rejected": self.rejected,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0,
+        }
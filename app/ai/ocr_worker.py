@@ -1,34 +1,206 @@
-from paddleocr import PaddleOCR
-from queue import Queue
-import threading, time, os
+from queue import Queue, Empty
+from typing import Callable, Optional
+from app.core.config import settings
+import threading, time
+import numpy as np
 
 # ocr = PaddleOCR(use_angle_cls=True, lang='en')
 def load_ocr_model():
+    if settings.OCR_ENGINE == "plate":
+        from app.ai.plate_ocr import PlateRecognizer
+        model_path = settings.OCR_REC_ONNX
+        if settings.OCR_REC_PRECISION == "int8" and model_path:
+            from app.ai.quantize import quantized_path
+            model_path = quantized_path(model_path)
+        print(f"Preloading plate recognizer ({settings.OCR_REC_BACKEND}, {settings.OCR_REC_PRECISION})...")
+        return PlateRecognizer(
+            backend=settings.OCR_REC_BACKEND,
+            model_name=settings.OCR_REC_MODEL,
+            model_path=model_path,
+            dict_path=settings.OCR_REC_DICT,
+            threads=settings.OCR_REC_THREADS
+        )
+    from paddleocr import PaddleOCR  # Import nặng → chỉ khi thật sự load model
     print("Preloading PaddleOCR model...")
     ocr = PaddleOCR(use_angle_cls=True, lang='en')
     return ocr
-ocr_queue = Queue()
-ocr_results = {}
-ocr_cache = {}
-
-def worker():
-    while True:
-        if not ocr_queue.empty():
-            plate_id, image_path = ocr_queue.get()
+
+def warmup_ocr(ocr) -> float:
+    """Chạy 1 lần predict trên crop giả (kích thước biển số) để khởi tạo model. Returns: thời gian (ms)"""
+    dummy_crop = np.full((48, 160, 3), 255, dtype=np.uint8)
+    started = time.perf_counter()
+    list(ocr.predict([dummy_crop]))
+    return (time.perf_counter() - started) * 1000
+
+# Preset batch theo OCR_MODE: (batch_size, max_wait_ms)
+# latency: chỉ gom những crop đã có sẵn trong queue, không chờ thêm
+# throughput: chờ tối đa vài ms để gom batch lớn hơn
+OCR_MODE_PRESETS = {
+    "latency": (4, 0),
+    "throughput": (16, 20),
+}
+
+def parse_ocr_item(res) -> str:
+    """Ghép rec_texts từ 1 kết quả PaddleOCR → text ("No text" nếu rỗng)"""
+    if res is not None and 'rec_texts' in res:
+        return ''.join(res['rec_texts']) if res['rec_texts'] else "No text"
+    return "No text"
+
+def parse_ocr_scored(res) -> tuple[str, float]:
+    """(text, score) từ 1 kết quả PaddleOCR, score = trung bình rec_scores"""
+    text = parse_ocr_item(res)
+    scores = res.get('rec_scores') if res is not None and 'rec_scores' in res else None
+    if text == "No text" or scores is None or len(scores) == 0:
+        return text, 0.0
+    return text, float(sum(scores) / len(scores))
+
+def parse_char_scores(res) -> Optional[list]:
+    """Confidence từng ký tự (chỉ có với plate engine), None nếu không có"""
+    if res is not None and 'char_scores' in res and res['char_scores']:
+        return list(res['char_scores'])
+    return None
+
+def parse_ocr_result(result_ocr) -> str:
+    """Ghép rec_texts từ kết quả PaddleOCR.predict → text ("No text" nếu rỗng)"""
+    if result_ocr and len(result_ocr) > 0:
+        return parse_ocr_item(result_ocr[0])
+    return "No text"
+
+
+def recognize_crops(ocr, crops: list) -> list[tuple[str, float, Optional[list]]]:
+    """Chạy OCR cho cả batch trong 1 lần gọi predict() → [(text, score, char_scores)]"""
+    results = list(ocr.predict(crops))
+    reads = [(*parse_ocr_scored(res), parse_char_scores(res)) for res in results]
+    # Phòng trường hợp backend trả thiếu kết quả
+    reads += [("No text", 0.0, None)] * (len(crops) - len(reads))
+    return reads
+
+def resolve_batch_params(batch_size: Optional[int] = None, max_wait_ms: Optional[float] = None):
+    """batch_size, max_wait (giây) theo OCR_MODE preset, cho phép override"""
+    preset_size, preset_wait = OCR_MODE_PRESETS.get(settings.OCR_MODE, OCR_MODE_PRESETS["latency"])
+    batch_size = max(1, batch_size or settings.OCR_BATCH_SIZE or preset_size)
+    if max_wait_ms is None:
+        max_wait_ms = settings.OCR_MAX_WAIT_MS if settings.OCR_MAX_WAIT_MS >= 0 else preset_wait
+    return batch_size, max_wait_ms / 1000.0
+
+def collect_batch(queue, batch_size: int, max_wait: float):
+    """
+    Block tới khi có item đầu tiên, rồi gom thêm tới batch_size / max_wait
+    None trong queue là tín hiệu dừng
+    Returns: (batch, stop)
+    """
+    item = queue.get()
+    if item is None:
+        return [], True
+    batch = [item]
+    deadline = time.monotonic() + max_wait
+    while len(batch) < batch_size:
+        remaining = deadline - time.monotonic()
+        try:
+            item = queue.get(timeout=remaining) if remaining > 0 else queue.get_nowait()
+        except Empty:
+            break
+        if item is None:
+            return batch, True
+        batch.append(item)
+    return batch, False
+
+
+class OCRWorker:
+    """
+    Background thread OCR theo micro-batch
+    - Block trên queue khi idle (không polling)
+    - Gom crop thành batch giới hạn bởi batch_size và max_wait_ms
+    - Mỗi batch chạy 1 lần predict(), kết quả trả về qua on_result(key, text, score, char_scores)
+    """
+
+    def __init__(
+        self,
+        on_result: Callable[[object, str, float, Optional[list]], None],
+        ocr=None,
+        batch_size: Optional[int] = None,
+        max_wait_ms: Optional[float] = None,
+    ):
+        self.batch_size, self.max_wait = resolve_batch_params(batch_size, max_wait_ms)
+
+        self.on_result = on_result
+        self.ocr = ocr
+        self.queue = Queue()
+        self.running = False
+        self.thread = None
+
+        # Stats
+        self.batches = 0
+        self.items = 0
+
+    def start(self):
+        if self.running:
+            return
+        from app.ai.runtime import readiness
+        try:
+            started = time.perf_counter()
+            if self.ocr is None:
+                self.ocr = load_ocr_model()
+            readiness.mark_loaded("ocr", (time.perf_counter() - started) * 1000)
+            readiness.mark_warm("ocr", warmup_ocr(self.ocr))
+        except Exception as e:
+            readiness.mark_error("ocr", str(e))
+            raise
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+        print(f"[OCR] Worker started (batch_size={self.batch_size}, max_wait={self.max_wait * 1000:.0f}ms)")
+
+    def stop(self):
+        self.running = False
+        self.queue.put(None)  # Đánh thức thread đang block
+
+    def submit(self, key, crop) -> bool:
+        """Đưa crop (numpy BGR) vào hàng đợi OCR"""
+        self.queue.put((key, crop))
+        return True
+
+    def _collect_batch(self):
+        batch, stop = collect_batch(self.queue, self.batch_size, self.max_wait)
+        if stop:
+            self.running = False
+        return batch
+
+    def recognize_batch(self, crops: list) -> list[tuple[str, float, Optional[list]]]:
+        return recognize_crops(self.ocr, crops)
+
+    def _run(self):
+        while self.running:
+            batch = self._collect_batch()
+            if not batch:
+                continue
+            keys = [key for key, _ in batch]
             try:
-                result_ocr = ocr.predict(image_path)
-                if result_ocr and 'rec_texts' in result_ocr[0]:
-                    text = ''.join(result_ocr[0]['rec_texts']) if result_ocr[0]['rec_texts'] else "No text"
-                else:
-                    text = "No text"
-                ocr_results[plate_id] = text
-                ocr_cache[plate_id] = text
+                reads = self.recognize_batch([crop for _, crop in batch])
             except Exception as e:
-                print(f"OCR worker error: {e}")
-                ocr_results[plate_id] = "Error"
-        time.sleep(0.01)
+                print(f"OCR Error: {e}")
+                reads = [("Error", 0.0, None)] * len(batch)
+
+            self.batches += 1
+            self.items += len(batch)
+            for key, (text, score, char_scores) in zip(keys, reads):
+                try:
+                    self.on_result(key, text, score, char_scores)
+                except Exception as e:
+                    print(f"OCR result callback error: {e}")
+
+    def get_stats(self) -> dict:
+        return {
+            "batch_size": self.batch_size,
+            "max_wait_ms": self.max_wait * 1000,
+            "queue_size": self.queue.qsize(),
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0,
+        }
 
-# Start thread once
-threading.Thread(target=worker, daemon=True).start()
 
-__all__ = ['ocr', 'ocr_queue', 'ocr_results', 'ocr_cache', 'worker']
+__all__ = [
+    'load_ocr_model', 'warmup_ocr', 'parse_ocr_item', 'parse_ocr_scored', 'parse_char_scores', 'parse_ocr_result', 'OCRWorker', 'OCR_MODE_PRESETS',
+    'recognize_crops', 'resolve_batch_params', 'collect_batch'
+]
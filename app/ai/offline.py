@@ -0,0 +1,274 @@
+"""
+Offline Video Processing
+Chạy cùng pipeline detect → track → OCR → validate trên video đã ghi (chạy lại ban đêm, điều tra)
+- Không pace theo fps: đọc frame nhanh nhất có thể, thời gian track theo thời gian của video
+- Process pool: mỗi task là 1 video (hoặc 1 đoạn video nếu --segment-seconds > 0)
+- Đoạn video đọc chồng lên đoạn trước --overlap-seconds: xe đi qua ranh giới chỉ được ghi bởi đoạn thấy nó trước
+- Kết quả ghi vào DB (bulk insert) hoặc CSV / Parquet, báo cáo frames/s và plates/s
+
+Chạy: python -m app.ai.offline videos/ --workers 4 --output detections.csv
+"""
+
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime, timedelta
+import multiprocessing as mp
+from typing import Optional
+import cv2
+
+VIDEO_EXTENSIONS = (".mp4", ".avi", ".mkv", ".mov", ".ts", ".flv")
+OUTPUT_FIELDS = (
+    "video", "camera_id", "tracker_id", "plate_text", "raw_text", "confidence", "video_seconds", "timestamp"
+)
+
+_ocr = None  # OCR model của worker process (load 1 lần)
+
+
+def find_videos(inputs: list[str]) -> list[str]:
+    videos = []
+    for path in inputs:
+        if os.path.isdir(path):
+            videos.extend(
+                os.path.join(root, name)
+                for root, _, names in sorted(os.walk(path)) for name in sorted(names)
+                if name.lower().endswith(VIDEO_EXTENSIONS)
+            )
+        elif os.path.isfile(path):
+            videos.append(path)
+    return videos
+
+
+def plan_tasks(videos: list[str], segment_seconds: float,
+               overlap_seconds: float = 0) -> list[tuple[str, int, int, int]]:
+    """Chia video thành các đoạn (path, start_frame, end_frame, overlap_frames) để chạy song song"""
+    tasks = []
+    for path in videos:
+        capture = cv2.VideoCapture(path)
+        total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0)
+        fps = capture.get(cv2.CAP_PROP_FPS) or 30
+        capture.release()
+        if total <= 0:
+            print(f"[OFFLINE] Skip unreadable video: {path}")
+            continue
+        step = int(segment_seconds * fps) if segment_seconds > 0 else total
+        overlap = int(overlap_seconds * fps) if segment_seconds > 0 else 0
+        for start in range(0, total, max(step, 1)):
+            tasks.append((path, start, min(start + step, total), overlap if start > 0 else 0))
+    return tasks
+
+
+def _get_ocr():
+    global _ocr
+    if _ocr is None:
+        from app.ai.ocr_worker import load_ocr_model
+        _ocr = load_ocr_model()
+    return _ocr
+
+
+def process_segment(path: str, start_frame: int, end_frame: int, stride: int = 1, batch: int = 4,
+                    overlap_frames: int = 0) -> dict:
+    """
+    Xử lý 1 đoạn video trong worker process
+    overlap_frames: đọc trước start_frame để khởi tạo track, bỏ track thấy lần đầu trước start_frame
+    (đoạn trước đã thấy và chốt track đó)
+    Returns: {"rows": [...], "frames": số frame của đoạn, "detected": số frame detect, "video_seconds", "seconds"}
+    """
+    import supervision as sv
+    from app.core.config import settings
+    from app.ai.yolo import get_model
+    from app.ai.ocr_worker import recognize_crops
+    from app.ai.plate_tracking import PlateTrackProcessor
+    from app.ai.track_state import TrackStateStore
+
+    started = time.perf_counter()
+    detector = get_model()
+    ocr = _get_ocr()
+
+    capture = cv2.VideoCapture(path)
+    fps = capture.get(cv2.CAP_PROP_FPS) or 30
+    read_from = max(0, start_frame - overlap_frames)
+    keep_from = start_frame / fps
+    capture.set(cv2.CAP_PROP_POS_FRAMES, read_from)
+    # Thời gian bắt đầu của video ≈ mtime - độ dài
+    duration = (capture.get(cv2.CAP_PROP_FRAME_COUNT) or 0) / fps
+    video_start = datetime.fromtimestamp(os.path.getmtime(path)) - timedelta(seconds=duration)
+    camera_id = os.path.splitext(os.path.basename(path))[0]
+
+    clock = [read_from / fps]
+    store = TrackStateStore(
+        max_tracks=settings.TRACK_STATE_MAX, ttl_seconds=settings.TRACK_STATE_TTL, clock=lambda: clock[0]
+    )
+    tracker = sv.ByteTrack(frame_rate=max(1, int(round(fps / stride))))
+    rows = []
+    first_seen = {}  # tracker_id → thời điểm (video) thấy lần đầu
+    ocr_queue = []  # [(plate_id, crop)] gom trong 1 frame, OCR 1 lần predict()
+
+    def on_final(plate_text, raw_text, confidence, tracker_id, crop):
+        if first_seen.get(tracker_id, clock[0]) < keep_from:
+            return  # Track bắt đầu trong phần chồng lấn → đã ghi bởi đoạn trước
+        rows.append({
+            "video": path,
+            "camera_id": camera_id,
+            "tracker_id": tracker_id,
+            "plate_text": plate_text,
+            "raw_text": raw_text,
+            "confidence": round(float(confidence), 4),
+            "video_seconds": round(clock[0], 2),
+            "timestamp": video_start + timedelta(seconds=clock[0]),
+        })
+
+    plates = PlateTrackProcessor(
+        store, submit_ocr=lambda key, crop: ocr_queue.append((key, crop)), on_final=on_final
+    )
+
+    def run_ocr():
+        # OCR đồng bộ theo batch thay cho OCR worker của pipeline live
+        reads = list(dict(ocr_queue).items())
+        ocr_queue.clear()
+        if not reads:
+            return
+        for (key, _), (text, score, char_scores) in zip(reads, recognize_crops(ocr, [c for _, c in reads])):
+            plates.record_read(key, text, score, char_scores)
+
+    def handle(frame, detections):
+        detections = tracker.update_with_detections(detections)
+        if detections.tracker_id is not None:
+            for tracker_id in detections.tracker_id:
+                first_seen.setdefault(int(tracker_id), clock[0])
+        plates.process(frame, detections)
+        run_ocr()
+
+    def detect_pending(pending):
+        results = detector.detect_batch([frame for _, frame in pending])
+        for (video_time, frame), detections in zip(pending, results):
+            clock[0] = video_time
+            handle(frame, detections)
+
+    frames = detected = 0
+    pending = []  # [(video_time, frame)] chờ detect theo batch
+    for index in range(read_from, end_frame):
+        if not capture.grab():
+            break
+        if index >= start_frame:
+            frames += 1
+        if (index - read_from) % stride == 0:
+            ok, frame = capture.retrieve()
+            if ok:
+                pending.append((index / fps, frame))
+        if len(pending) >= batch:
+            detect_pending(pending)
+            detected += len(pending)
+            pending = []
+    if pending:
+        detect_pending(pending)
+        detected += len(pending)
+    capture.release()
+
+    # Hết đoạn video: mọi track coi như đã mất → OCR crop còn lại và chốt text
+    for _ in range(settings.OCR_BUDGET + 1):
+        clock[0] += settings.TRACK_LOST_SECONDS + 1
+        if not plates.flush_lost():
+            break
+        run_ocr()
+
+    return {
+        "rows": rows,
+        "frames": frames,
+        "detected": detected,
+        "video_seconds": frames / fps,
+        "seconds": time.perf_counter() - started,
+    }
+
+
+def write_csv(rows: list[dict], path: str):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=OUTPUT_FIELDS)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({**row, "timestamp": row["timestamp"].isoformat()})
+
+
+def write_parquet(rows: list[dict], path: str):
+    try:
+        import pandas as pd
+    except ImportError:
+        raise SystemExit("Parquet output requires pandas + pyarrow (pip install pandas pyarrow)")
+    pd.DataFrame(rows, columns=OUTPUT_FIELDS).to_parquet(path, index=False)
+
+
+def write_db(rows: list[dict]) -> int:
+    from app.core.database import SessionLocal
+    from app.services.detection_service import DetectionService
+
+    db = SessionLocal()
+    try:
+        return DetectionService.bulk_create_detections(db, rows)
+    finally:
+        db.close()
+
+
+def main(argv: Optional[list[str]] = None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Process recorded videos: detect → track → OCR → validate")
+    parser.add_argument("inputs", nargs="+", help="Video files hoặc thư mục")
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) // 2))
+    parser.add_argument("--segment-seconds", type=float, default=0,
+                        help="Chia video dài thành đoạn để chạy song song (0 = mỗi video 1 task)")
+    parser.add_argument("--overlap-seconds", type=float, default=5.0,
+                        help="Mỗi đoạn đọc chồng lên đoạn trước để không ghi 2 lần xe đi qua ranh giới")
+    parser.add_argument("--stride", type=int, default=1, help="Detect 1 trên N frame")
+    parser.add_argument("--batch", type=int, default=4, help="Số frame mỗi lần detect")
+    parser.add_argument("--output", default="db", help="db | đường dẫn .csv | đường dẫn .parquet")
+    args = parser.parse_args(argv)
+
+    videos = find_videos(args.inputs)
+    tasks = plan_tasks(videos, args.segment_seconds, args.overlap_seconds)
+    if not tasks:
+        raise SystemExit("No videos to process")
+
+    # Chia đều CPU cho các worker (chỉ khi chưa cấu hình)
+    if not os.getenv("DETECTOR_THREADS"):
+        os.environ["DETECTOR_THREADS"] = str(max(1, (os.cpu_count() or 1) // args.workers))
+
+    print(f"[OFFLINE] {len(videos)} video(s), {len(tasks)} task(s), workers={args.workers}")
+    started = time.perf_counter()
+    rows, frames, detected, video_seconds = [], 0, 0, 0.0
+    with ProcessPoolExecutor(max_workers=args.workers, mp_context=mp.get_context("spawn")) as pool:
+        futures = {
+            pool.submit(process_segment, path, start, end, args.stride, args.batch, overlap): (path, start, end)
+            for path, start, end, overlap in tasks
+        }
+        for future in as_completed(futures):
+            path, start, end = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                print(f"[OFFLINE] ✗ {path} [{start}:{end}]: {e}")
+                continue
+            rows.extend(result["rows"])
+            frames += result["frames"]
+            detected += result["detected"]
+            video_seconds += result["video_seconds"]
+            print(f"[OFFLINE] ✓ {path} [{start}:{end}]: {len(result['rows'])} plates, "
+                  f"{result['frames'] / result['seconds']:.1f} fps")
+
+    rows.sort(key=lambda r: (r["video"], r["video_seconds"]))
+    elapsed = time.perf_counter() - started
+
+    if args.output == "db":
+        write_db(rows)
+    elif args.output.lower().endswith(".parquet"):
+        write_parquet(rows, args.output)
+    else:
+        write_csv(rows, args.output)
+
+    print(f"[OFFLINE] Done in {elapsed:.1f}s: {frames} frames ({detected} detected), {len(rows)} plates")
+    print(f"[OFFLINE] {frames / elapsed:.1f} frames/s, {len(rows) / elapsed:.2f} plates/s, "
+          f"{video_seconds / elapsed:.1f}x real time")
+
+
+if __name__ == "__main__":
+    main()
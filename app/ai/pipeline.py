@@ -0,0 +1,271 @@
+"""
+Camera Pipeline
+Một background thread duy nhất cho mỗi camera: capture → detect → track → OCR
+Các viewer chỉ subscribe vào frame đã annotate, không tự chạy YOLO
+"""
+
+import threading
+import time
+import cv2
+import supervision as sv
+from datetime import datetime
+from app.ai.yolo import FRAME_SKIP
+from app.ai.camera import CameraSource
+from app.core.config import settings, CameraConfig
+from app.ai.broadcaster import FrameBroadcaster
+from app.ai.track_state import TrackStateStore
+from app.ai.plate_tracking import PlateTrackProcessor
+from app.ai.cadence import DetectionCadence, MotionPredictor
+from app.ai.motion import MotionGate
+from app.utils.format_plate import standardize_plate
+from app.utils import validate_plate
+
+
+class CameraPipeline:
+    """
+    Chạy capture + inference đúng 1 lần cho mỗi frame,
+    publish frame đã annotate cho tất cả viewer
+    """
+
+    def __init__(self, config: CameraConfig, camera_manager, broadcaster=None):
+        self.config = config
+        self.camera_id = config.id
+        self.camera_manager = camera_manager
+        self.source = CameraSource(config)
+        self.byte_tracker = sv.ByteTrack()
+        self.cadence = DetectionCadence(
+            base_interval=FRAME_SKIP,
+            min_interval=settings.DETECT_MIN_INTERVAL,
+            max_interval=settings.DETECT_MAX_INTERVAL,
+            motion_threshold=settings.DETECT_MOTION_THRESHOLD,
+            cpu_budget=settings.DETECT_CPU_BUDGET
+        )
+        self.predictor = MotionPredictor()
+        # Hold phải dài hơn TRACK_LOST_SECONDS để track cuối kịp chốt OCR trước khi ngừng detect
+        self.motion_gate = MotionGate(
+            roi=config.roi,
+            pixel_threshold=settings.MOTION_PIXEL_THRESHOLD,
+            min_area=settings.MOTION_MIN_AREA,
+            hold_seconds=max(settings.MOTION_HOLD_SECONDS, settings.TRACK_LOST_SECONDS * 2)
+        ) if settings.MOTION_GATE else None
+        self.track_states = TrackStateStore(
+            max_tracks=settings.TRACK_STATE_MAX,
+            ttl_seconds=settings.TRACK_STATE_TTL
+        )
+        self.plate_tracking = PlateTrackProcessor(
+            self.track_states, submit_ocr=self._submit_ocr, on_final=self._on_track_final
+        )
+        self.running = False
+        self.thread = None
+        self._start_lock = threading.Lock()
+
+        # Plates mới nhất của camera này
+        self.latest_plates = []
+        self.latest_plates_lock = threading.Lock()
+
+        # Encode 1 lần, phát cho mọi viewer
+        self.broadcaster = broadcaster if broadcaster is not None else FrameBroadcaster()
+
+        # Stats
+        self.frames_captured = 0
+        self.frames_detected = 0
+        self.frames_gated = 0  # Frame bỏ qua detect vì cảnh tĩnh
+
+    def start(self):
+        """Start pipeline thread (idempotent)"""
+        with self._start_lock:
+            if self.running:
+                return
+            self.running = True
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+            print(f"[PIPELINE] Started camera pipeline: {self.camera_id}")
+
+    def stop(self):
+        """Dừng pipeline và đóng stream của các viewer"""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+            self.thread = None
+        self.source.release()
+
+    def stream(self):
+        """Async MJPEG stream cho 1 viewer"""
+        self.start()
+        return self.broadcaster.stream()
+
+    def add_detected_plate(self, plate_text, confidence, tracker_id=None, crop_path=None):
+        """Thread-safe thêm plate mới và hiển thị (với format chuẩn)"""
+        if "Processing" in plate_text or "Small" in plate_text or "Error" in plate_text:
+            return
+
+        # Chuẩn hóa plate text để hiển thị
+        formatted_plate = standardize_plate(plate_text)
+
+        # Validate format
+        validation_result = validate_plate(formatted_plate)
+        if not validation_result['valid']:
+            print(f"[DISPLAY] ✗ Skip invalid plate: {formatted_plate}")
+            return  # ❌ Không thêm vào danh sách hiển thị nếu invalid
+
+        with self.latest_plates_lock:
+            # Kiểm tra trùng lặp (trong 60s gần nhất)
+            now = datetime.now()
+            self.latest_plates = [
+                p for p in self.latest_plates
+                if (now - p['timestamp']).total_seconds() < 60  # Giữ 1 phút
+            ]
+
+            # Thêm plate mới (với format chuẩn)
+            self.latest_plates.insert(0, {
+                "plate": formatted_plate,  # ✅ Hiển thị plate đã format
+                "confidence": confidence,
+                "timestamp": now,
+                "tracker_id": tracker_id,
+                "camera_id": self.camera_id
+            })
+
+            # Giới hạn 50 plates
+            if len(self.latest_plates) > 50:
+                self.latest_plates = self.latest_plates[:50]
+
+    def get_latest_plates(self):
+        """Thread-safe lấy danh sách plates"""
+        with self.latest_plates_lock:
+            return self.latest_plates.copy()
+
+    def get_stats(self) -> dict:
+        return {
+            "camera_id": self.camera_id,
+            "source_kind": self.source.kind,
+            "running": self.running,
+            "frames_captured": self.frames_captured,
+            "frames_detected": self.frames_detected,
+            "frames_gated": self.frames_gated,
+            **(self.motion_gate.get_stats() if self.motion_gate is not None else {}),
+            **self.cadence.get_stats(),
+            "detector_batch": self.camera_manager.get_detector_stats(),
+            "db_writer": self.camera_manager.get_writer_stats(),
+            "track_states": self.track_states.get_stats(),
+            **self.broadcaster.get_stats(),
+        }
+
+    def _run(self):
+        frames_since_detect = 0
+        prev_detections = None
+        prev_labels = []
+
+        try:
+            while self.running:
+                ret, frame = self.source.read()
+                if not ret:
+                    time.sleep(0.1)
+                    continue
+
+                now = time.monotonic()
+                frames_since_detect += 1
+                self.frames_captured += 1
+                self.cadence.on_frame(now)
+
+                # ✅ Motion gate: cảnh tĩnh → không detect, có chuyển động trở lại → detect ngay
+                if self.motion_gate is not None:
+                    was_active = self.motion_gate.active
+                    if not self.motion_gate.update(frame, now):
+                        self.frames_gated += 1
+                        prev_detections, prev_labels = None, []
+                        if self.broadcaster.has_subscribers():
+                            self.broadcaster.publish(frame)
+                        continue
+                    if not was_active:
+                        frames_since_detect = self.cadence.interval
+
+                # ✅ Detection theo interval thích ứng (chuyển động + CPU)
+                if frames_since_detect >= self.cadence.interval:
+                    started = time.perf_counter()
+                    detections, labels = self._detect(frame)
+                    detect_seconds = time.perf_counter() - started
+
+                    self.frames_detected += 1
+                    frames_since_detect = 0
+                    self.predictor.update(detections, now)
+                    self.cadence.update(
+                        num_detections=len(detections),
+                        speed=self.predictor.max_speed(frame.shape[1]),
+                        detect_seconds=detect_seconds
+                    )
+                    prev_detections = detections
+                    prev_labels = labels
+                else:
+                    # Giữa 2 lần detect: bbox dự đoán theo vận tốc của track
+                    detections = self.predictor.predict(prev_detections, now)
+                    labels = prev_labels
+
+                # Chỉ annotate + encode khi có người xem
+                if self.broadcaster.has_subscribers():
+                    self.broadcaster.publish(annotate_frame(frame, detections, labels))
+        except Exception as e:
+            print(f"Pipeline error: {e}")
+            import traceback
+            traceback.print_exc()
+        finally:
+            self.running = False
+            self.broadcaster.close()
+
+    def _detect(self, frame):
+        """Chạy YOLO + ByteTrack + queue OCR cho 1 frame"""
+        # Qua camera manager: gom batch với các camera khác nếu bật DETECT_BATCH_SIZE
+        detections = self.camera_manager.detect(self.camera_id, frame)
+        detections = self.byte_tracker.update_with_detections(detections)
+        labels = self.plate_tracking.process(frame, detections)
+        return detections, labels
+
+    def _submit_ocr(self, plate_id: str, crop):
+        """OCR bất đồng bộ qua OCR worker dùng chung, kết quả về handle_ocr_result"""
+        self.camera_manager.submit_ocr(self.camera_id, plate_id, crop)
+
+    def handle_ocr_result(self, plate_id: str, text: str, score: float, char_scores=None):
+        """Callback khi OCR xong (chạy trên thread của OCR worker)"""
+        self.plate_tracking.record_read(plate_id, text, score, char_scores)
+
+    def _on_track_final(self, plate_text: str, raw_text: str, confidence: float, tracker_id, crop):
+        """Text của track đã chốt: hiển thị và lưu DB đúng 1 lần"""
+        self.add_detected_plate(plate_text, confidence, tracker_id)
+
+        # ✅ LƯU VÀO DATABASE: đưa vào hàng đợi của writer dùng chung (ghi theo batch)
+        evidence_crop = crop if settings.SAVE_PLATE_CROPS else None
+        self.camera_manager.save_detection(
+            plate_text, confidence, tracker_id, camera_id=self.camera_id, crop=evidence_crop
+        )
+
+
+def annotate_frame(frame, detections, labels):
+    """Vẽ bbox + label lên bản copy của frame"""
+    annotated_frame = frame.copy()
+    if detections is not None and len(detections) > 0:
+        for i, label in enumerate(labels):
+            x1, y1, x2, y2 = map(int, detections.xyxy[i])
+
+            # Vẽ bbox
+            cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 255, 0), 3)
+
+            # Vẽ label
+            (text_width, text_height), baseline = cv2.getTextSize(
+                label, cv2.FONT_HERSHEY_SIMPLEX, 0.7, 2
+            )
+            cv2.rectangle(
+                annotated_frame,
+                (x1, y1 - text_height - 10),
+                (x1 + text_width + 10, y1),
+                (0, 255, 0),
+                -1
+            )
+            cv2.putText(
+                annotated_frame,
+                label,
+                (x1 + 5, y1 - 5),
+                cv2.FONT_HERSHEY_SIMPLEX,
+                0.7,
+                (0, 0, 0),
+                2
+            )
+    return annotated_frame
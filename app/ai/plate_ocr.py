@@ -0,0 +1,129 @@
+"""
+Plate Recognizer
+OCR chỉ chạy model recognition trên crop biển số (YOLO đã cắt sẵn)
+→ bỏ text detection + angle classification của PaddleOCR pipeline đầy đủ
+- Biển 2 dòng (xe máy VN) được tách thành 2 ảnh 1 dòng trước khi nhận dạng
+- Trả về confidence từng ký tự (dùng cho vote nhiều lần đọc)
+
+Cùng interface với PaddleOCR: predict(crops) → [{'rec_texts', 'rec_scores', 'char_scores'}]
+
+Backend:
+- paddle: paddleocr.TextRecognition (confidence ký tự = confidence của dòng)
+- onnx: model recognition PP-OCR đã export ONNX + file dict, CTC greedy decode → confidence từng ký tự
+"""
+
+import re
+from typing import Optional
+import cv2
+import numpy as np
+
+# Biển có tỉ lệ rộng/cao nhỏ hơn giá trị này coi là 2 dòng
+TWO_ROW_MAX_ASPECT = 2.2
+REC_HEIGHT = 48
+REC_MAX_WIDTH = 320
+
+
+def is_plate_char(char: str) -> bool:
+    """Ký tự được giữ khi vote (khớp text_vote.normalize_read)"""
+    return re.fullmatch(r'[A-Z0-9]', char.upper()) is not None
+
+
+def split_rows(crop) -> list:
+    """
+    Tách biển 2 dòng theo hàng ít nét chữ nhất ở khoảng giữa (horizontal projection)
+    Biển 1 dòng → trả về [crop]
+    """
+    height, width = crop.shape[:2]
+    if height == 0 or width / height >= TWO_ROW_MAX_ASPECT:
+        return [crop]
+
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    _, binary = cv2.threshold(gray, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    profile = binary.sum(axis=1)
+    low, high = int(height * 0.35), max(int(height * 0.65), int(height * 0.35) + 1)
+    split = low + int(np.argmin(profile[low:high]))
+    return [crop[:split], crop[split:]]
+
+
+class PlateRecognizer:
+    def __init__(self, backend: str = "paddle", model_name: Optional[str] = None,
+                 model_path: Optional[str] = None, dict_path: Optional[str] = None, threads: int = 0):
+        self.backend = backend
+        if backend == "onnx":
+            import onnxruntime as ort
+
+            options = ort.SessionOptions()
+            if threads > 0:
+                options.intra_op_num_threads = threads
+            self.session = ort.InferenceSession(model_path, options, providers=["CPUExecutionProvider"])
+            self.input_name = self.session.get_inputs()[0].name
+            with open(dict_path, encoding="utf-8") as f:
+                # index 0 = CTC blank, cuối = khoảng trắng
+                self.charset = [""] + [line.rstrip("\r\n") for line in f] + [" "]
+        else:
+            from paddleocr import TextRecognition
+
+            self.model = TextRecognition(model_name=model_name) if model_name else TextRecognition()
+
+    def predict(self, crops: list) -> list[dict]:
+        """Nhận dạng cả batch: mọi dòng của mọi crop chạy chung 1 lần"""
+        rows, owners = [], []
+        for index, crop in enumerate(crops):
+            for row in split_rows(crop):
+                if row.size > 0:
+                    rows.append(row)
+                    owners.append(index)
+
+        results = [{"rec_texts": [], "rec_scores": [], "char_scores": []} for _ in crops]
+        if not rows:
+            return results
+
+        for owner, (text, char_scores) in zip(owners, self._recognize_rows(rows)):
+            # Chỉ giữ confidence của ký tự A-Z0-9 để khớp với text đã normalize khi vote
+            plate_scores = [score for char, score in zip(text, char_scores) if is_plate_char(char)]
+            if not plate_scores:
+                continue
+            result = results[owner]
+            result["rec_texts"].append(text.strip())
+            result["rec_scores"].append(float(np.mean(plate_scores)))
+            result["char_scores"].extend(plate_scores)
+        return results
+
+    def _recognize_rows(self, rows: list) -> list[tuple[str, list[float]]]:
+        if self.backend == "onnx":
+            return self._recognize_onnx(rows)
+
+        reads = []
+        for res in self.model.predict(input=rows, batch_size=len(rows)):
+            text, score = res.get("rec_text", ""), float(res.get("rec_score", 0.0))
+            reads.append((text, [score] * len(text)))
+        return reads
+
+    def _recognize_onnx(self, rows: list) -> list[tuple[str, list[float]]]:
+        # Resize cao REC_HEIGHT giữ tỉ lệ, pad phải về cùng chiều rộng
+        widths = [
+            min(REC_MAX_WIDTH, max(8, int(np.ceil(REC_HEIGHT * r.shape[1] / max(r.shape[0], 1)))))
+            for r in rows
+        ]
+        batch_width = max(widths)
+        batch = np.zeros((len(rows), 3, REC_HEIGHT, batch_width), dtype=np.float32)
+        for i, (row, width) in enumerate(zip(rows, widths)):
+            if row.ndim == 2:
+                row = cv2.cvtColor(row, cv2.COLOR_GRAY2BGR)
+            image = cv2.resize(row, (width, REC_HEIGHT)).astype(np.float32)
+            batch[i, :, :, :width] = ((image / 255.0 - 0.5) / 0.5).transpose(2, 0, 1)
+
+        probs = self.session.run(None, {self.input_name: batch})[0]  # [B, T, num_classes]
+        return [self._ctc_decode(p) for p in probs]
+
+    def _ctc_decode(self, probs) -> tuple[str, list[float]]:
+        """Greedy CTC: bỏ blank + ký tự lặp liên tiếp, confidence ký tự = xác suất max tại bước đó"""
+        indices = probs.argmax(axis=1)
+        chars, scores = [], []
+        previous = 0
+        for step, index in enumerate(indices):
+            if index != 0 and index != previous and index < len(self.charset):
+                chars.append(self.charset[index])
+                scores.append(float(probs[step, index]))
+            previous = index
+        return "".join(chars), scores
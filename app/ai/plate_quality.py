@@ -0,0 +1,54 @@
+"""
+Plate Quality
+Chấm điểm chất lượng crop biển số để chọn frame tốt nhất trước khi OCR
+score ∈ [0, 1] = tổng có trọng số của: độ nét, kích thước, tỉ lệ khung, confidence của detector
+"""
+
+import math
+import cv2
+
+# Trọng số các thành phần
+WEIGHT_SHARPNESS = 0.4
+WEIGHT_SIZE = 0.25
+WEIGHT_ASPECT = 0.15
+WEIGHT_CONFIDENCE = 0.2
+
+# Laplacian variance >= giá trị này coi như đủ nét
+SHARPNESS_REF = 300.0
+# Diện tích (px) >= giá trị này coi như đủ lớn để OCR
+SIZE_REF = 120 * 40
+# Tỉ lệ rộng/cao của biển VN: 1 dòng (ô tô ~520x110) và 2 dòng (xe máy ~190x140)
+PLATE_ASPECTS = (4.7, 1.4)
+
+
+def sharpness_score(crop) -> float:
+    """Độ nét theo variance của Laplacian trên ảnh xám"""
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    variance = cv2.Laplacian(gray, cv2.CV_64F).var()
+    return min(variance / SHARPNESS_REF, 1.0)
+
+
+def size_score(width: int, height: int) -> float:
+    return min((width * height) / SIZE_REF, 1.0)
+
+
+def aspect_score(width: int, height: int) -> float:
+    """1.0 khi tỉ lệ khớp 1 trong các tỉ lệ biển chuẩn, giảm dần khi lệch"""
+    if width <= 0 or height <= 0:
+        return 0.0
+    ratio = width / height
+    deviation = min(abs(math.log(ratio / ref)) for ref in PLATE_ASPECTS)
+    return math.exp(-2.0 * deviation)
+
+
+def score_plate_crop(crop, confidence: float) -> float:
+    """Điểm chất lượng tổng hợp của 1 crop biển số"""
+    if crop is None or crop.size == 0:
+        return 0.0
+    height, width = crop.shape[:2]
+    return (
+        WEIGHT_SHARPNESS * sharpness_score(crop)
+        + WEIGHT_SIZE * size_score(width, height)
+        + WEIGHT_ASPECT * aspect_score(width, height)
+        + WEIGHT_CONFIDENCE * float(confidence)
+    )
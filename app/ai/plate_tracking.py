@@ -0,0 +1,142 @@
+"""
+Plate Tracking
+Bước track → crop ứng viên → OCR → chốt text dùng chung cho camera live (pipeline.py) và video offline (offline.py)
+Chỉ khác cách chạy OCR:
+- Live: submit_ocr đẩy crop vào OCR worker, kết quả về qua record_read trên thread của worker
+- Offline: submit_ocr gom crop, caller gọi recognize_crops đồng bộ theo batch rồi record_read
+"""
+
+from typing import Callable
+import cv2
+from app.core.config import settings
+from app.ai.yolo import get_model, MIN_PLATE_AREA
+from app.ai.track_state import TrackStateStore
+from app.ai.plate_quality import score_plate_crop
+from app.utils.format_plate import standardize_plate
+from app.utils import validate_plate
+
+
+def preprocess_plate_crop(crop):
+    """Phóng to crop nhỏ (cao tối thiểu 50px) và tăng contrast trước khi OCR"""
+    height, width = crop.shape[:2]
+    if height < 50:
+        scale_factor = 50 / height
+        new_width = int(width * scale_factor)
+        crop = cv2.resize(crop, (new_width, 50))
+
+    # Tăng contrast
+    return cv2.convertScaleAbs(crop, alpha=1.2, beta=10)
+
+
+def is_valid_plate_text(text: str) -> bool:
+    return validate_plate(standardize_plate(text))['valid']
+
+
+class PlateTrackProcessor:
+    """
+    Quản lý OCR theo track trên TrackStateStore
+    submit_ocr(plate_id, crop đã tiền xử lý): gửi OCR cho crop tốt nhất của track
+    on_final(plate_text đã chuẩn hóa + hợp lệ, raw_text, confidence, tracker_id, crop): text đã chốt, gọi đúng 1 lần
+    """
+
+    def __init__(self, track_states: TrackStateStore, submit_ocr: Callable[[str, object], None],
+                 on_final: Callable):
+        self.track_states = track_states
+        self.submit_ocr = submit_ocr
+        self.on_final = on_final
+
+    def process(self, frame, detections) -> list[str]:
+        """
+        detections đã qua ByteTrack: thu thập crop, gửi OCR khi chất lượng chững lại,
+        xử lý track đã mất, xóa state hết hạn
+        Returns: label cho từng detection (để annotate)
+        """
+        class_names = get_model().names
+        labels = []
+
+        for i in range(len(detections)):
+            x1, y1, x2, y2 = map(int, detections.xyxy[i])
+            class_id = detections.class_id[i]
+            confidence = float(detections.confidence[i])
+            class_name = class_names.get(int(class_id), str(class_id))
+            label = f"{class_name} {confidence:.2f}"
+
+            if class_name == 'License_Plate':
+                if (x2 - x1) * (y2 - y1) < MIN_PLATE_AREA:
+                    labels.append("Small plate")
+                    continue
+
+                # ✅ Key theo TRACKER ID của ByteTrack (không có → theo bbox)
+                tracker_id = None
+                if detections.tracker_id is not None:
+                    tracker_id = int(detections.tracker_id[i])
+                    plate_id = f"plate_{tracker_id}"
+                else:
+                    plate_id = f"plate_{x1}_{y1}_{x2}_{y2}"
+
+                state = self.track_states.touch(plate_id)
+                if state.needs_ocr:
+                    # Thu thập crop tốt nhất, OCR khi chất lượng chững lại
+                    crop = frame[max(y1, 0):y2, max(x1, 0):x2]
+                    if crop.size > 0 and self.track_states.add_candidate(
+                        plate_id, crop, score_plate_crop(crop, confidence), confidence, tracker_id,
+                        max_candidates=settings.OCR_CANDIDATES,
+                        plateau_frames=settings.OCR_PLATEAU_FRAMES
+                    ):
+                        self.submit_best(plate_id)
+                label = state.label
+
+            labels.append(label)
+
+        self.flush_lost()
+
+        # Xóa state của các track đã mất
+        self.track_states.evict_expired()
+
+        return labels
+
+    def flush_lost(self) -> bool:
+        """
+        Track kết thúc mà chưa chốt text → OCR crop tốt nhất còn lại, hoặc chốt theo vote
+        Returns: True nếu còn crop được gửi OCR
+        """
+        submitted = False
+        for plate_id, has_candidates in self.track_states.collect_lost(settings.TRACK_LOST_SECONDS):
+            if has_candidates:
+                submitted = self.submit_best(plate_id) or submitted
+            elif self.track_states.finalize(plate_id):
+                self._finalize(plate_id)
+        return submitted
+
+    def submit_best(self, plate_id: str) -> bool:
+        """Tiền xử lý crop tốt nhất của track và gửi OCR"""
+        crop = self.track_states.take_best(plate_id)
+        if crop is None:
+            return False
+        self.submit_ocr(plate_id, preprocess_plate_crop(crop))
+        return True
+
+    def record_read(self, plate_id: str, text: str, score: float, char_scores=None):
+        """Kết quả OCR: scheduler quyết định chốt text hay đọc lại trong budget của track"""
+        state, final = self.track_states.record_read(
+            plate_id, text, score,
+            budget=settings.OCR_BUDGET,
+            accept_score=settings.OCR_ACCEPT_SCORE,
+            lost_seconds=settings.TRACK_LOST_SECONDS,
+            validator=is_valid_plate_text,
+            char_scores=char_scores
+        )
+        if state is not None and final:
+            self._finalize(plate_id)
+
+    def _finalize(self, plate_id: str):
+        """Text của track đã chốt: chuẩn hóa, bỏ nếu sai format, gọi on_final đúng 1 lần"""
+        final = self.track_states.pop_final(plate_id)
+        if final is None:
+            return
+        raw_text, confidence, tracker_id, crop = final
+        plate_text = standardize_plate(raw_text)
+        if not validate_plate(plate_text)['valid']:
+            print(f"[OCR] ✗ Skip invalid plate: {plate_text}")
+            return
+        self.on_final(plate_text, raw_text, confidence, tracker_id, crop)
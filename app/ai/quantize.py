@@ -0,0 +1,285 @@
+"""
+INT8 Quantization + Report
+Tạo bản INT8 của detector (ONNX, static quantization với ảnh calibration)
+và recognizer (ONNX, dynamic quantization), rồi so sánh với FP32 trên 1 thư mục ảnh có nhãn:
+latency, throughput, bộ nhớ (peak RSS) và exact-match theo biển số
+
+Thư mục ảnh: labels.csv (filename,plate) hoặc tên file là biển số (vd. 51F12345.jpg, 51F12345_2.jpg)
+Ảnh có thể là frame đầy đủ (detector cắt biển) hoặc crop biển sẵn (không detect được → dùng cả ảnh)
+
+Chạy: python -m app.ai.quantize --images data/plates --report quantization_report.md
+Dùng bản INT8 lúc chạy: DETECTOR_BACKEND=onnx DETECTOR_PRECISION=int8, OCR_REC_PRECISION=int8
+"""
+
+import csv
+import json
+import multiprocessing as mp
+import os
+import queue
+import resource
+import time
+from typing import Optional
+import cv2
+import numpy as np
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp")
+PRECISIONS = ("fp32", "int8")
+
+
+def quantized_path(path: str) -> str:
+    """best.onnx → best.int8.onnx"""
+    return os.path.splitext(path)[0] + ".int8.onnx"
+
+
+def load_labelled_images(folder: str) -> list[tuple[str, str]]:
+    """[(đường dẫn ảnh, biển số)]"""
+    labels_file = os.path.join(folder, "labels.csv")
+    if os.path.exists(labels_file):
+        with open(labels_file, encoding="utf-8", newline="") as f:
+            return [
+                (os.path.join(folder, row[0]), row[1])
+                for row in csv.reader(f) if len(row) >= 2 and row[0].lower().endswith(IMAGE_EXTENSIONS)
+            ]
+    return [
+        (os.path.join(folder, name), os.path.splitext(name)[0].split("_")[0])
+        for name in sorted(os.listdir(folder)) if name.lower().endswith(IMAGE_EXTENSIONS)
+    ]
+
+
+class _DetectorCalibrationReader:
+    """Đọc ảnh calibration cho quantize_static (cùng letterbox như lúc chạy)"""
+
+    def __init__(self, input_name: str, images: list[str], imgsz: int):
+        self.input_name = input_name
+        self.images = iter(images)
+        self.imgsz = imgsz
+
+    def get_next(self):
+        from app.ai.detector import letterbox
+
+        for path in self.images:
+            frame = cv2.imread(path)
+            if frame is None:
+                continue
+            image, _, _ = letterbox(frame, self.imgsz)
+            tensor = image[..., ::-1].transpose(2, 0, 1)[None]
+            return {self.input_name: np.ascontiguousarray(tensor, dtype=np.float32) / 255.0}
+        return None
+
+
+def quantize_detector(fp32_path: str, calibration_images: list[str], imgsz: int = 640) -> str:
+    """Static INT8 (QDQ, per-channel) cho detector ONNX. Returns: đường dẫn .int8.onnx"""
+    import onnxruntime as ort
+    from onnxruntime.quantization import QuantFormat, QuantType, quantize_static
+
+    output_path = quantized_path(fp32_path)
+    input_name = ort.InferenceSession(fp32_path, providers=["CPUExecutionProvider"]).get_inputs()[0].name
+    started = time.perf_counter()
+    quantize_static(
+        fp32_path, output_path,
+        _DetectorCalibrationReader(input_name, calibration_images, imgsz),
+        quant_format=QuantFormat.QDQ,
+        activation_type=QuantType.QUInt8,
+        weight_type=QuantType.QInt8,
+        per_channel=True,
+    )
+    print(f"[QUANT] Detector INT8 in {time.perf_counter() - started:.1f}s: {output_path}")
+    return output_path
+
+
+def quantize_recognizer(fp32_path: str) -> str:
+    """Dynamic INT8 (weights) cho recognizer ONNX. Returns: đường dẫn .int8.onnx"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    output_path = quantized_path(fp32_path)
+    started = time.perf_counter()
+    quantize_dynamic(fp32_path, output_path, weight_type=QuantType.QInt8)
+    print(f"[QUANT] Recognizer INT8 in {time.perf_counter() - started:.1f}s: {output_path}")
+    return output_path
+
+
+def _best_plate_crop(detector, frame):
+    """Crop biển số confidence cao nhất (None nếu không detect được)"""
+    detections = detector.detect(frame)
+    if len(detections) == 0:
+        return None
+    best = int(np.argmax(detections.confidence))
+    x1, y1, x2, y2 = map(int, detections.xyxy[best])
+    crop = frame[max(y1, 0):y2, max(x1, 0):x2]
+    return crop if crop.size > 0 else None
+
+
+def _evaluate_variant(variant: dict, samples: list[tuple[str, str]], results):
+    """Chạy trong process riêng → peak RSS chỉ tính model của variant này"""
+    from app.ai.detector import create_detector
+    from app.ai.ocr_worker import load_ocr_model, recognize_crops
+    from app.ai.plate_tracking import preprocess_plate_crop
+    from app.ai.plate_ocr import PlateRecognizer
+    from app.ai.text_vote import normalize_read
+    from app.utils.format_plate import standardize_plate
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    detector = create_detector(
+        variant["weights"], backend=variant["backend"], imgsz=variant["imgsz"],
+        threads=variant["threads"], path=variant["detector_path"]
+    )
+    if variant["rec_path"]:
+        ocr = PlateRecognizer(backend="onnx", model_path=variant["rec_path"], dict_path=variant["rec_dict"],
+                              threads=variant["threads"])
+    else:
+        ocr = load_ocr_model()
+    detector.warmup()
+    recognize_crops(ocr, [np.full((48, 160, 3), 255, dtype=np.uint8)])
+
+    detect_ms, ocr_ms, total_ms = [], [], []
+    correct = evaluated = 0
+    for path, label in samples:
+        frame = cv2.imread(path)
+        if frame is None:
+            continue
+        started = time.perf_counter()
+        crop = _best_plate_crop(detector, frame)
+        detected = time.perf_counter()
+        text, _, _ = recognize_crops(ocr, [preprocess_plate_crop(crop if crop is not None else frame)])[0]
+        finished = time.perf_counter()
+
+        detect_ms.append((detected - started) * 1000)
+        ocr_ms.append((finished - detected) * 1000)
+        total_ms.append((finished - started) * 1000)
+        evaluated += 1
+        if text not in ("No text", "Error") and normalize_read(standardize_plate(text)) == normalize_read(label):
+            correct += 1
+
+    rss_peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    def summary(values):
+        return {
+            "mean": round(float(np.mean(values)), 2) if values else 0,
+            "p50": round(float(np.percentile(values, 50)), 2) if values else 0,
+            "p95": round(float(np.percentile(values, 95)), 2) if values else 0,
+        }
+
+    results.put({
+        "variant": variant["name"],
+        "images": evaluated,
+        "exact_match": round(correct / evaluated, 4) if evaluated else 0,
+        "detect_ms": summary(detect_ms),
+        "ocr_ms": summary(ocr_ms),
+        "total_ms": summary(total_ms),
+        "images_per_second": round(1000 / float(np.mean(total_ms)), 2) if total_ms else 0,
+        # ru_maxrss tính bằng KB trên Linux
+        "peak_rss_mb": round(rss_peak / 1024, 1),
+        "model_rss_mb": round((rss_peak - rss_before) / 1024, 1),
+    })
+
+
+def _wait_result(process, results, timeout: float) -> dict:
+    """
+    Chờ kết quả của process đo, không treo nếu process chết (OOM, model hỏng) hoặc chạy quá timeout
+    Raises: RuntimeError
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return results.get(timeout=1.0)
+        except queue.Empty:
+            pass
+        if not process.is_alive():
+            # Kết quả có thể vừa tới ngay trước khi process thoát
+            try:
+                return results.get(timeout=1.0)
+            except queue.Empty:
+                raise RuntimeError(f"measuring process exited with code {process.exitcode} without a result")
+        if time.monotonic() > deadline:
+            process.terminate()
+            raise RuntimeError(f"no result after {timeout:.0f}s")
+
+
+def run_report(variants: list[dict], samples: list[tuple[str, str]], timeout: float = 3600) -> list[dict]:
+    ctx = mp.get_context("spawn")
+    rows = []
+    for variant in variants:
+        results = ctx.Queue()
+        process = ctx.Process(target=_evaluate_variant, args=(variant, samples, results))
+        process.start()
+        try:
+            rows.append(_wait_result(process, results, timeout))
+        except RuntimeError as e:
+            raise SystemExit(f"[QUANT] ✗ {variant['name']}: {e}")
+        finally:
+            process.join(timeout=5)
+        print(f"[QUANT] {variant['name']}: {rows[-1]}")
+    return rows
+
+
+def format_report(rows: list[dict]) -> str:
+    """Bảng markdown, thêm cột so sánh với dòng đầu tiên (FP32)"""
+    lines = [
+        "| Variant | Images | Exact match | Detect ms (p50/p95) | OCR ms (p50/p95) | Total ms (mean) "
+        "| Images/s | Speedup | Peak RSS MB |",
+        "|---|---|---|---|---|---|---|---|---|",
+    ]
+    baseline = rows[0]["total_ms"]["mean"] if rows else 0
+    for row in rows:
+        speedup = baseline / row["total_ms"]["mean"] if row["total_ms"]["mean"] else 0
+        lines.append(
+            f"| {row['variant']} | {row['images']} | {row['exact_match']:.2%} "
+            f"| {row['detect_ms']['p50']}/{row['detect_ms']['p95']} "
+            f"| {row['ocr_ms']['p50']}/{row['ocr_ms']['p95']} "
+            f"| {row['total_ms']['mean']} | {row['images_per_second']} | {speedup:.2f}x "
+            f"| {row['peak_rss_mb']} |"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def main(argv: Optional[list[str]] = None):
+    import argparse
+    from app.core.config import settings
+    from app.ai.detector import export_weights
+    from app.ai.yolo import MODEL_PATH
+
+    parser = argparse.ArgumentParser(description="INT8 quantization + accuracy/speed report")
+    parser.add_argument("--images", required=True, help="Thư mục ảnh biển số có nhãn")
+    parser.add_argument("--calib", type=int, default=100, help="Số ảnh dùng để calibration detector")
+    parser.add_argument("--imgsz", type=int, default=settings.DETECTOR_IMGSZ)
+    parser.add_argument("--threads", type=int, default=settings.DETECTOR_THREADS)
+    parser.add_argument("--rec-onnx", default=settings.OCR_REC_ONNX, help="Recognizer ONNX (trống = OCR engine hiện tại)")
+    parser.add_argument("--rec-dict", default=settings.OCR_REC_DICT)
+    parser.add_argument("--skip-quantize", action="store_true", help="Dùng file .int8.onnx đã có")
+    parser.add_argument("--report", default="quantization_report.md")
+    parser.add_argument("--timeout", type=float, default=3600, help="Thời gian tối đa (giây) đo mỗi variant")
+    args = parser.parse_args(argv)
+
+    samples = load_labelled_images(args.images)
+    if not samples:
+        raise SystemExit(f"No labelled images in {args.images}")
+    print(f"[QUANT] {len(samples)} labelled images")
+
+    detector_fp32 = export_weights(MODEL_PATH, "onnx", args.imgsz)
+    if args.skip_quantize:
+        detector_int8 = quantized_path(detector_fp32)
+        rec_int8 = quantized_path(args.rec_onnx) if args.rec_onnx else None
+    else:
+        detector_int8 = quantize_detector(detector_fp32, [p for p, _ in samples[:args.calib]], args.imgsz)
+        rec_int8 = quantize_recognizer(args.rec_onnx) if args.rec_onnx else None
+
+    base = dict(weights=MODEL_PATH, backend="onnx", imgsz=args.imgsz, threads=args.threads, rec_dict=args.rec_dict)
+    variants = [
+        dict(base, name="fp32", detector_path=detector_fp32, rec_path=args.rec_onnx or None),
+        dict(base, name="int8", detector_path=detector_int8, rec_path=rec_int8),
+    ]
+    if rec_int8:
+        # Tách ảnh hưởng của từng model
+        variants.insert(1, dict(base, name="int8-detector", detector_path=detector_int8, rec_path=args.rec_onnx))
+
+    rows = run_report(variants, samples, timeout=args.timeout)
+    report = format_report(rows)
+    with open(args.report, "w", encoding="utf-8") as f:
+        f.write(f"# Quantization report\n\nImages: {args.images} ({len(samples)})\n\n{report}")
+    with open(os.path.splitext(args.report)[0] + ".json", "w", encoding="utf-8") as f:
+        json.dump(rows, f, indent=2)
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Model Runtime
+Load + warmup model trong FastAPI lifespan và theo dõi trạng thái cho /health/ready
+Pod chỉ ready khi cả detector và OCR đã chạy xong 1 inference warmup
+"""
+
+import threading
+import time
+from typing import Optional
+
+REQUIRED_MODELS = ("detector", "ocr")
+
+
+class ModelReadiness:
+    """Trạng thái load / warmup của từng model (thread-safe)"""
+
+    def __init__(self, required=REQUIRED_MODELS):
+        self.required = tuple(required)
+        self._lock = threading.Lock()
+        self._status = {
+            name: {"loaded": False, "warm": False, "load_ms": None, "warmup_ms": None, "error": None}
+            for name in self.required
+        }
+
+    def mark_loaded(self, name: str, load_ms: Optional[float] = None):
+        with self._lock:
+            self._status[name].update(loaded=True, load_ms=load_ms)
+
+    def mark_warm(self, name: str, warmup_ms: Optional[float] = None):
+        with self._lock:
+            self._status[name].update(loaded=True, warm=True, warmup_ms=warmup_ms, error=None)
+        print(f"[STARTUP] {name} ready" + (f" (warmup {warmup_ms:.0f}ms)" if warmup_ms is not None else ""))
+
+    def mark_error(self, name: str, error: str):
+        with self._lock:
+            self._status[name]["error"] = error
+        print(f"[STARTUP] {name} error: {error}")
+
+    def is_ready(self) -> bool:
+        with self._lock:
+            return all(self._status[name]["warm"] for name in self.required)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {name: dict(status) for name, status in self._status.items()}
+
+
+def _required_models():
+    from app.core.config import settings
+    # RUN_MODE=api không load model → ready ngay
+    return () if settings.RUN_MODE == "api" else REQUIRED_MODELS
+
+
+readiness = ModelReadiness(_required_models())
+
+
+def warmup_detector():
+    """Load + warmup YOLO, ghi thời gian vào readiness"""
+    from app.ai.yolo import get_model, warmup_model
+
+    try:
+        started = time.perf_counter()
+        get_model()
+        readiness.mark_loaded("detector", (time.perf_counter() - started) * 1000)
+        readiness.mark_warm("detector", warmup_model())
+    except Exception as e:
+        readiness.mark_error("detector", str(e))
+        raise
+
+
+def start_models():
+    """
+    Chạy trong background thread của lifespan (không block liveness probe)
+    - CAMERA_WORKERS = 0: warmup detector tại web process, OCR worker tự warmup khi start
+    - CAMERA_WORKERS > 0: mỗi worker process tự warmup rồi báo ready về web process
+    """
+    from app.core.config import settings
+    from app.ai.camera_manager import camera_manager
+
+    started = time.perf_counter()
+    try:
+        if settings.CAMERA_WORKERS <= 0:
+            warmup_detector()
+        camera_manager.load_cameras()
+    except Exception as e:
+        print(f"[STARTUP] Model startup error: {e}")
+        import traceback
+        traceback.print_exc()
+        return
+    print(f"[STARTUP] Models started in {(time.perf_counter() - started) * 1000:.0f}ms")
@@ -0,0 +1,59 @@
+"""
+Text Vote
+Gộp nhiều lần OCR của cùng 1 track thành 1 text bằng vote từng ký tự có trọng số confidence
+Giúp sửa các lỗi nhầm lẫn đơn lẻ như 0/O, 8/B, 1/I
+"""
+
+import re
+from collections import defaultdict
+from typing import Optional, Sequence
+
+
+def normalize_read(text: str) -> str:
+    """Chỉ giữ A-Z0-9 để so sánh / vote (bỏ '-', '.', khoảng trắng)"""
+    return re.sub(r'[^A-Z0-9]', '', (text or "").upper())
+
+
+def reads_agree(a: str, b: str) -> bool:
+    return normalize_read(a) == normalize_read(b)
+
+
+def vote_text(reads: Sequence[tuple]) -> tuple[Optional[str], float]:
+    """
+    reads: [(text, score)] hoặc [(text, score, char_scores)]
+    - Chọn độ dài có tổng trọng số lớn nhất
+    - Vote từng vị trí ký tự, trọng số = confidence của ký tự (hoặc của cả lần đọc)
+    Returns: (text đã vote, agreement ∈ [0, 1] = tỉ lệ trọng số thắng nhỏ nhất giữa các vị trí)
+    """
+    candidates = []
+    for read in reads:
+        text = normalize_read(read[0])
+        if not text:
+            continue
+        score = max(float(read[1]), 1e-3)
+        char_scores = read[2] if len(read) > 2 and read[2] else None
+        if char_scores is None or len(char_scores) != len(text):
+            char_scores = [score] * len(text)
+        candidates.append((text, score, char_scores))
+
+    if not candidates:
+        return None, 0.0
+
+    # Độ dài theo trọng số
+    length_weights = defaultdict(float)
+    for text, score, _ in candidates:
+        length_weights[len(text)] += score
+    length = max(length_weights, key=length_weights.get)
+    same_length = [c for c in candidates if len(c[0]) == length]
+
+    chars = []
+    agreement = 1.0
+    for pos in range(length):
+        weights = defaultdict(float)
+        for text, _, char_scores in same_length:
+            weights[text[pos]] += max(float(char_scores[pos]), 1e-3)
+        best_char = max(weights, key=weights.get)
+        chars.append(best_char)
+        agreement = min(agreement, weights[best_char] / sum(weights.values()))
+
+    return ''.join(chars), agreement
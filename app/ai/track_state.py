@@ -0,0 +1,258 @@
+"""
+Track State Store
+Lưu trạng thái OCR theo track (thay cho dict ocr_cache / ocr_results không giới hạn)
+- Record gọn với __slots__
+- Thread-safe (pipeline thread + OCR callback thread)
+- Evict theo TTL khi track mất (không còn được thấy) và LRU khi vượt max_tracks
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+from app.ai.text_vote import vote_text, reads_agree
+
+# Trạng thái OCR của 1 track
+STATUS_PENDING = "pending"      # Đang chờ OCR
+STATUS_VERIFYING = "verifying"  # Đã có text tạm, các lần đọc chưa thống nhất → đọc lại
+STATUS_DONE = "done"            # Text cuối cùng (không OCR thêm)
+STATUS_NO_TEXT = "no_text"      # Hết budget mà không đọc được gì
+STATUS_ERROR = "error"          # OCR lỗi → được phép thử lại (trong budget)
+
+
+class TrackState:
+    __slots__ = (
+        "text", "status", "best_score", "last_seen", "tracker_id", "candidates", "stale_count",
+        "reads", "attempts", "confidence", "evidence", "submitted",
+    )
+
+    def __init__(self, now: float):
+        self.text: Optional[str] = None
+        self.status: Optional[str] = None
+        self.best_score: float = 0.0  # Điểm chất lượng crop tốt nhất đã thấy (vòng thu thập hiện tại)
+        self.last_seen: float = now
+        self.tracker_id: Optional[int] = None
+        # Top crop theo chất lượng: [(score, crop, detector_confidence)], giảm dần
+        self.candidates: list = []
+        # Số lần liên tiếp chất lượng không cải thiện
+        self.stale_count: int = 0
+        # Các lần OCR đọc được text: [(text, ocr_score, char_scores)]
+        self.reads: list = []
+        self.attempts: int = 0
+        self.confidence: float = 0.0  # Detector confidence cao nhất
+        self.evidence = None  # Crop của lần đọc có score cao nhất
+        self.submitted = None  # Crop đang chờ OCR
+
+    @property
+    def needs_ocr(self) -> bool:
+        """Chưa có text cuối cùng và không có OCR đang chạy → vẫn thu thập crop"""
+        return self.status in (None, STATUS_ERROR, STATUS_VERIFYING)
+
+    @property
+    def label(self) -> str:
+        """Label hiển thị trên frame"""
+        if self.status == STATUS_NO_TEXT:
+            return "No text"
+        if self.text:
+            return self.text
+        if self.status == STATUS_ERROR:
+            return "Error"
+        return "Processing..."
+
+
+class TrackStateStore:
+    """
+    OrderedDict theo thứ tự last_seen (cũ nhất ở đầu)
+    Track mất quá ttl_seconds hoặc vượt max_tracks sẽ bị xóa
+    """
+
+    def __init__(self, max_tracks: int = 1024, ttl_seconds: float = 10.0,
+                 clock: Callable[[], float] = time.monotonic):
+        self.max_tracks = max_tracks
+        self.ttl_seconds = ttl_seconds
+        # Nguồn thời gian (xử lý video offline dùng thời gian của video thay vì đồng hồ thật)
+        self.clock = clock
+        self._states: "OrderedDict[str, TrackState]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._states)
+
+    def touch(self, key: str) -> TrackState:
+        """Lấy (hoặc tạo) state của track và cập nhật last_seen"""
+        now = self.clock()
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                state = TrackState(now)
+                self._states[key] = state
+                self._evict_locked(now)
+            else:
+                state.last_seen = now
+                self._states.move_to_end(key)
+            return state
+
+    def get(self, key: str) -> Optional[TrackState]:
+        with self._lock:
+            return self._states.get(key)
+
+    def set_pending(self, key: str):
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None:
+                state.status = STATUS_PENDING
+
+    def clear_pending(self, key: str):
+        """Hủy trạng thái pending (vd. OCR pool quá tải) để lần sau thử lại"""
+        with self._lock:
+            state = self._states.get(key)
+            if state is not None and state.status == STATUS_PENDING:
+                state.status = STATUS_VERIFYING if state.reads else None
+                state.submitted = None
+
+    def record_read(self, key: str, text: str, score: float, budget: int, accept_score: float,
+                    lost_seconds: float, validator: Callable[[str], bool], char_scores: Optional[list] = None):
+        """
+        Ghi 1 lần OCR và quyết định có cần đọc lại không
+        - Lần đầu đọc được text hợp lệ với score >= accept_score → chốt luôn
+        - Hai lần đọc gần nhất trùng nhau → chốt
+        - Hết budget hoặc track đã mất → chốt theo vote
+        - Ngược lại → VERIFYING: thu thập crop mới cho lần đọc sau
+        char_scores: confidence từng ký tự (nếu OCR engine có) → vote theo ký tự
+        Returns: (state, final) — state None nếu track đã bị evict
+        """
+        now = self.clock()
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                return None, False
+
+            state.attempts += 1
+            if text not in ("Error", "No text"):
+                if state.submitted is not None and all(score >= r[1] for r in state.reads):
+                    state.evidence = state.submitted
+                state.reads.append((text, score, char_scores))
+            state.submitted = None
+
+            voted, _ = vote_text(state.reads)
+            if voted:
+                state.text = voted
+
+            reads = state.reads
+            final = False
+            if len(reads) == 1 and reads[0][1] >= accept_score and validator(reads[0][0]):
+                final = True
+            elif len(reads) >= 2 and reads_agree(reads[-1][0], reads[-2][0]):
+                final = True
+            if state.attempts >= budget or state.last_seen < now - lost_seconds:
+                final = True
+
+            if final:
+                state.status = STATUS_DONE if reads else STATUS_NO_TEXT
+                state.candidates = []
+            elif text == "Error":
+                state.status = STATUS_ERROR  # Giữ candidates để thử lại
+            else:
+                state.status = STATUS_VERIFYING if reads else None
+                state.candidates = []
+                state.best_score = 0.0
+                state.stale_count = 0
+            return state, final
+
+    def finalize(self, key: str) -> bool:
+        """Chốt text theo vote cho track đang VERIFYING (vd. track đã mất, không còn crop mới)"""
+        with self._lock:
+            state = self._states.get(key)
+            if state is None or state.status != STATUS_VERIFYING:
+                return False
+            state.status = STATUS_DONE
+            state.candidates = []
+            return True
+
+    def pop_final(self, key: str):
+        """(text, detector_confidence, tracker_id, evidence_crop) của track đã chốt, giải phóng crop"""
+        with self._lock:
+            state = self._states.get(key)
+            if state is None or state.status != STATUS_DONE:
+                return None
+            evidence, state.evidence = state.evidence, None
+            return state.text, state.confidence, state.tracker_id, evidence
+
+    def add_candidate(self, key: str, crop, score: float, confidence: float, tracker_id: Optional[int],
+                      max_candidates: int = 3, plateau_frames: int = 3, min_gain: float = 0.02) -> bool:
+        """
+        Giữ top max_candidates crop theo điểm chất lượng
+        Returns True khi chất lượng đã chững lại (plateau_frames lần không cải thiện) → nên OCR
+        """
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                return False
+            state.tracker_id = tracker_id
+            state.confidence = max(state.confidence, confidence)
+
+            if score > state.best_score + min_gain:
+                state.best_score = score
+                state.stale_count = 0
+            else:
+                state.stale_count += 1
+
+            candidates = state.candidates
+            if len(candidates) < max_candidates or score > candidates[-1][0]:
+                candidates.append((score, crop.copy(), confidence))
+                candidates.sort(key=lambda c: c[0], reverse=True)
+                del candidates[max_candidates:]
+
+            return state.stale_count >= plateau_frames
+
+    def take_best(self, key: str):
+        """Crop tốt nhất để gửi OCR (giữ lại làm evidence nếu lần đọc này tốt nhất), hoặc None"""
+        with self._lock:
+            state = self._states.get(key)
+            if state is None or not state.candidates:
+                return None
+            crop = state.candidates[0][1]
+            state.submitted = crop
+            return crop
+
+    def collect_lost(self, lost_seconds: float) -> list[tuple[str, bool]]:
+        """
+        Các track đã mất (không thấy > lost_seconds) mà chưa chốt text
+        Returns: [(key, has_candidates)]
+        """
+        deadline = self.clock() - lost_seconds
+        with self._lock:
+            return [
+                (key, bool(state.candidates)) for key, state in self._states.items()
+                if state.needs_ocr and state.last_seen < deadline
+                and (state.candidates or state.status == STATUS_VERIFYING)
+            ]
+
+    def discard(self, key: str):
+        with self._lock:
+            self._states.pop(key, None)
+
+    def evict_expired(self):
+        """Xóa các track không còn được thấy (track loss) quá ttl_seconds"""
+        with self._lock:
+            self._evict_locked(self.clock())
+
+    def _evict_locked(self, now: float):
+        deadline = now - self.ttl_seconds
+        while self._states:
+            key, state = next(iter(self._states.items()))
+            if len(self._states) > self.max_tracks or state.last_seen < deadline:
+                self._states.popitem(last=False)
+                self.evicted += 1
+            else:
+                break
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            return {
+                "tracks": len(self._states),
+                "max_tracks": self.max_tracks,
+                "evicted": self.evicted,
+            }
@@ -1,16 +1,48 @@
-from ultralytics import YOLO
-import supervision as sv
 import os
+import threading
+import time
+from app.core.config import settings
+from app.ai.detector import create_detector, exported_path
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 MODEL_PATH = os.path.join(BASE_DIR, '..', '..', 'model', 'best (2).pt')
 
-model = YOLO(MODEL_PATH)
-
-# Tracker + annotators
-box_annotator = sv.BoxAnnotator(thickness=2)
-label_annotator = sv.LabelAnnotator(text_thickness=2, text_scale=1.2)
-byte_tracker = sv.ByteTrack()
+# Detector được load trong lifespan (get_model), không load lúc import
+# Backend (torch / onnx / openvino) chọn theo DETECTOR_BACKEND
+model = None
+_model_load_lock = threading.Lock()
 
 FRAME_SKIP = 3
 MIN_PLATE_AREA = 1000
+
+
+def get_model():
+    """Load detector 1 lần (thread-safe). Returns: Detector (detect / detect_batch → sv.Detections)"""
+    global model
+    if model is None:
+        with _model_load_lock:
+            if model is None:
+                started = time.perf_counter()
+                path = None
+                if settings.DETECTOR_PRECISION == "int8":
+                    from app.ai.quantize import quantized_path
+                    if settings.DETECTOR_BACKEND != "onnx":
+                        raise ValueError("DETECTOR_PRECISION=int8 requires DETECTOR_BACKEND=onnx")
+                    path = quantized_path(exported_path(MODEL_PATH, "onnx"))
+                model = create_detector(
+                    MODEL_PATH,
+                    backend=settings.DETECTOR_BACKEND,
+                    imgsz=settings.DETECTOR_IMGSZ,
+                    threads=settings.DETECTOR_THREADS,
+                    conf=settings.DETECTOR_CONF,
+                    iou=settings.DETECTOR_IOU,
+                    path=path,
+                )
+                print(f"[MODEL] Detector loaded in {(time.perf_counter() - started) * 1000:.0f}ms "
+                      f"(backend={model.backend}, precision={settings.DETECTOR_PRECISION}, imgsz={model.imgsz}, threads={model.threads or 'auto'})")
+    return model
+
+
+def warmup_model() -> float:
+    """Chạy 1 inference giả để compile graph + cấp phát bộ nhớ. Returns: thời gian (ms)"""
+    return get_model().warmup()
@@ -0,0 +1,81 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.database import get_async_db
+from app.services.detection_service import DetectionService
+from datetime import datetime
+from typing import Optional
+
+# Chỉ đọc DB, không import camera_manager / YOLO → mount cả khi RUN_MODE=api
+router = APIRouter(prefix="/stream", tags=["Detections"])
+
+@router.get("/latest-detection")
+async def get_latest_detection(db: AsyncSession = Depends(get_async_db)):
+    """
+    API để lấy detection cuối cùng (biển số mới nhất được detect)
+    Frontend dùng endpoint này cho Latest Detection panel
+    Không bắt auth vì frontend gửi token qua header (fetch)
+    """
+    try:
+        detection = await DetectionService.get_latest_detection_async(db)
+        if detection:
+            return {
+                "success": True,
+                "detection": detection
+            }
+        else:
+            return {
+                "success": True,
+                "detection": None
+            }
+    except Exception as e:
+        print(f"Error fetching latest detection: {e}")
+        import traceback
+        traceback.print_exc()
+        return {
+            "success": False,
+            "detection": None,
+            "error": str(e)
+        }
+
+@router.get("/detections-history")
+async def get_detections_history(
+    limit: int = Query(50, ge=1, le=1000),
+    search: str = "",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    blacklisted: Optional[bool] = None,
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    API để lấy detection history từ DATABASE
+    Parameters:
+    - limit: số lượng records mỗi trang (default 50)
+    - search: tìm kiếm theo plate_text (optional, bỏ qua '-' và '.')
+    - start / end: khoảng thời gian [start, end) (optional)
+    - blacklisted: chỉ xe blacklist (true) / không blacklist (false)
+    - cursor: next_cursor của trang trước (keyset pagination)
+    
+    Frontend dùng endpoint này cho Recent Detections Table
+    Không bắt auth vì frontend gửi token qua header (fetch)
+    """
+    try:
+        detections, next_cursor = await DetectionService.search_detections_async(
+            db, limit=limit, search=search, start=start, end=end, blacklisted=blacklisted, cursor=cursor
+        )
+        
+        return {
+            "success": True,
+            "detections": detections,
+            "count": len(detections),
+            "next_cursor": next_cursor
+        }
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        print(f"Error fetching detections: {e}")
+        return {
+            "success": False,
+            "detections": [],
+            "error": str(e)
+        }
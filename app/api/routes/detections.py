@@ -1,159 +1,212 @@
-# from fastapi import APIRouter, UploadFile, File, HTTPException
-# from fastapi.responses import JSONResponse
-# import cv2
-# import numpy as np
-# import os
-# import base64
-# from io import BytesIO
-# from PIL import Image
-# import supervision as sv
-# from app.ai.yolo import model, box_annotator, label_annotator, byte_tracker, MIN_PLATE_AREA
-# from app.ai.ocr_worker import load_ocr_model
-# from app.schemas.detection import ProcessImageResponse, DetectOnlyResponse, DetectionResult
-
-# router = APIRouter(prefix="/api/detections", tags=["Detections"])
-# ocr = load_ocr_model()
-
-# @router.post("/process-image")
-# async def process_image(file: UploadFile = File(...)):
-#     """
-#     Nhận hình ảnh, thực hiện detection và OCR trên license plate
-#     """
-#     try:
-#         # Đọc file upload
-#         contents = await file.read()
-#         nparr = np.frombuffer(contents, np.uint8)
-#         frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-#         if frame is None:
-#             raise HTTPException(status_code=400, detail="Invalid image file")
-        
-#         # YOLO detection
-#         result = model(frame)[0]
-#         detections = sv.Detections.from_ultralytics(result)
-#         detections = byte_tracker.update_with_detections(detections)
-        
-#         labels = []
-#         plates_data = []
-        
-#         # Xử lý từng detection
-#         for i in range(len(detections)):
-#             x1, y1, x2, y2 = detections.xyxy[i]
-#             class_id = detections.class_id[i]
-#             confidence = detections.confidence[i]
-#             tracker_id = detections.tracker_id[i]
-            
-#             class_name = model.model.names[class_id]
-#             label = f"{class_name} {confidence:.2f}"
-#             # Nếu là License Plate, thực hiện OCR
-#             if class_name == 'License_Plate':
-#                 x1, y1, x2, y2 = int(x1), int(y1), int(x2), int(y2)
-#                 # Kiểm tra kích thước plate
-#                 plate_area = (x2 - x1) * (y2 - y1)
-#                 if plate_area < MIN_PLATE_AREA:
-#                     label = "Small plate"
-#                     labels.append(label)
-#                     plates_data.append({
-#                         "bbox": [x1, y1, x2, y2],
-#                         "text": "Small plate",
-#                         "confidence": float(confidence)
-#                     })
-#                     continue
-                
-#                 # Crop plate từ frame
-#                 cropped_image = frame[y1:y2, x1:x2]
-                
-#                 # Phóng to ảnh để cải thiện OCR
-#                 if cropped_image.size > 0:
-#                     cropped_image = cv2.resize(
-#                         cropped_image, 
-#                         (cropped_image.shape[1] * 2, cropped_image.shape[0] * 2)
-#                     )
-                    
-#                     # Lưu ảnh tạm
-#                     os.makedirs('crop', exist_ok=True)
-#                     image_path = f'crop/temp_plate_{tracker_id}.png'
-#                     cv2.imwrite(image_path, cropped_image)
-                    
-#                     # Thực hiện OCR
-#                     try:
-#                         result_ocr = ocr.predict(image_path)
-#                         if result_ocr and len(result_ocr) > 0 and 'rec_texts' in result_ocr[0]:
-#                             # Extract text from rec_texts
-#                             rec_texts = result_ocr[0]['rec_texts']
-#                             plate_text = ''.join(rec_texts) if rec_texts else "No text"
-#                             label = plate_text
-#                         else:
-#                             label = "No text"
-#                     except Exception as e:
-#                         label = f"OCR Error: {str(e)}"
-                    
-#                     # Xóa file tạm sau khi OCR xong
-#                     if os.path.exists(image_path):
-#                         os.remove(image_path)
-            
-#             labels.append(label)
-#             plates_data.append({
-#                 "bbox": [x1, y1, x2, y2],
-#                 "text": label,
-#                 "confidence": float(confidence),
-#                 "class": class_name
-#             })
-        
-#         # Annotate frame
-#         annotated_frame = frame.copy()
-#         annotated_frame = box_annotator.annotate(annotated_frame, detections)
-#         annotated_frame = label_annotator.annotate(annotated_frame, detections, labels)
-        
-#         # Encode frame to base64
-#         _, buffer = cv2.imencode('.jpg', annotated_frame)
-#         frame_b64 = base64.b64encode(buffer).decode('utf-8')
-        
-#         return JSONResponse({
-#             "success": True,
-#             "frame": frame_b64,
-#             "detections": plates_data,
-#             "total_detections": len(detections)
-#         })
-    
-#     except Exception as e:
-#         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
-
-
-# @router.post("/detect-only")
-# async def detect_only(file: UploadFile = File(...)):
-#     """
-#     Nhận hình ảnh, chỉ thực hiện detection (không OCR)
-#     """
-#     try:
-#         contents = await file.read()
-#         nparr = np.frombuffer(contents, np.uint8)
-#         frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-        
-#         if frame is None:
-#             raise HTTPException(status_code=400, detail="Invalid image file")
-        
-#         # YOLO detection
-#         result = model(frame)[0]
-#         detections = sv.Detections.from_ultralytics(result)
-        
-#         detections_data = []
-#         for i in range(len(detections)):
-#             x1, y1, x2, y2 = detections.xyxy[i]
-#             class_id = detections.class_id[i]
-#             confidence = detections.confidence[i]
-            
-#             detections_data.append({
-#                 "bbox": [int(x1), int(y1), int(x2), int(y2)],
-#                 "class": model.model.names[class_id],
-#                 "confidence": float(confidence)
-#             })
-        
-#         return JSONResponse({
-#             "success": True,
-#             "detections": detections_data,
-#             "total_detections": len(detections)
-#         })
-    
-#     except Exception as e:
-#         raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+from fastapi import APIRouter, UploadFile, File, HTTPException
+from fastapi.responses import JSONResponse, StreamingResponse
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import base64
+import itertools
+import json
+import shutil
+import tempfile
+import time
+import zipfile
+import cv2
+from app.core.config import settings
+from app.ai.camera_manager import camera_manager
+from app.ai.image_inference import (
+    inference_executor, ExecutorSaturated, decode_image, detect_frame, process_frame, process_frames
+)
+
+router = APIRouter(prefix="/api/detections", tags=["Detections"])
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".bmp", ".webp")
+# Decode ảnh song song (cv2.imdecode nhả GIL)
+_decode_pool = ThreadPoolExecutor(max_workers=settings.BULK_DECODE_WORKERS, thread_name_prefix="image-decode")
+
+
+async def _read_frame(file: UploadFile):
+    contents = await file.read()
+    frame = decode_image(contents)
+    if frame is None:
+        raise HTTPException(status_code=400, detail="Invalid image file")
+    return frame
+
+
+async def _run_inference(fn, *args):
+    """Chạy inference trên executor giới hạn, quá tải → 429 (không block event loop)"""
+    try:
+        future = inference_executor.submit(fn, *args)
+    except ExecutorSaturated as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "1"})
+    return await asyncio.wrap_future(future)
+
+
+async def _wait_inference(fn, *args):
+    """Như _run_inference nhưng chờ khi executor đầy (dùng giữa stream, không trả 429)"""
+    while True:
+        try:
+            future = inference_executor.submit(fn, *args)
+        except ExecutorSaturated:
+            await asyncio.sleep(0.05)
+            continue
+        return await asyncio.wrap_future(future)
+
+
+def _iter_images(spooled: list):
+    """(tên, bytes) của từng ảnh: file ảnh trực tiếp hoặc các ảnh trong file zip"""
+    for name, handle in spooled:
+        handle.seek(0)
+        if name.lower().endswith(".zip"):
+            with zipfile.ZipFile(handle) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir() and info.filename.lower().endswith(IMAGE_EXTENSIONS):
+                        yield info.filename, archive.read(info)
+        else:
+            yield name, handle.read()
+
+
+async def _bulk_stream(spooled: list):
+    """
+    NDJSON: 1 dòng cho mỗi ảnh ngay khi batch của nó xong, dòng cuối là tổng kết
+    Decode batch kế tiếp song song với inference của batch hiện tại
+    """
+    loop = asyncio.get_running_loop()
+    images = _iter_images(spooled)
+    started = time.perf_counter()
+    index = plates = 0
+
+    async def load_batch():
+        chunk = await asyncio.to_thread(lambda: list(itertools.islice(images, settings.BULK_BATCH_SIZE)))
+        frames = await asyncio.gather(*(
+            loop.run_in_executor(_decode_pool, decode_image, data) for _, data in chunk
+        ))
+        return [name for name, _ in chunk], frames
+
+    def line(payload: dict) -> bytes:
+        return (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+
+    next_batch = asyncio.ensure_future(load_batch())
+    try:
+        while True:
+            try:
+                names, frames = await next_batch
+            except (zipfile.BadZipFile, OSError) as e:
+                yield line({"success": False, "error": f"Invalid archive: {e}"})
+                break
+            if not names:
+                break
+            if index + len(names) > settings.BULK_MAX_IMAGES:
+                yield line({"success": False, "error": f"Too many images (max {settings.BULK_MAX_IMAGES})"})
+                break
+            next_batch = asyncio.ensure_future(load_batch())
+
+            valid = []
+            for name, frame in zip(names, frames):
+                if frame is None:
+                    yield line({"index": index, "file": name, "success": False, "error": "Invalid image file"})
+                else:
+                    valid.append((index, name, frame))
+                index += 1
+            if not valid:
+                continue
+
+            try:
+                batch_results = await _wait_inference(process_frames, [f for _, _, f in valid], camera_manager)
+            except Exception as e:
+                for i, name, _ in valid:
+                    yield line({"index": i, "file": name, "success": False, "error": str(e)})
+                continue
+            for (i, name, _), detections in zip(valid, batch_results):
+                plates += sum(1 for d in detections if d.get("valid"))
+                yield line({
+                    "index": i,
+                    "file": name,
+                    "success": True,
+                    "detections": detections,
+                    "total_detections": len(detections)
+                })
+
+        elapsed = time.perf_counter() - started
+        yield line({
+            "done": True,
+            "images": index,
+            "plates": plates,
+            "seconds": round(elapsed, 2),
+            "images_per_second": round(index / elapsed, 2) if elapsed > 0 else 0
+        })
+    finally:
+        # Client ngắt kết nối / dừng sớm → bỏ batch đang decode dở
+        if not next_batch.done():
+            next_batch.cancel()
+        for _, handle in spooled:
+            handle.close()
+
+
+@router.post("/process-image")
+async def process_image(file: UploadFile = File(...)):
+    """
+    Nhận hình ảnh, thực hiện detection và OCR trên license plate
+    Không dùng tracker của camera → ảnh upload không ảnh hưởng stream đang chạy
+    """
+    frame = await _read_frame(file)
+    try:
+        detections, annotated_frame = await _run_inference(process_frame, frame, camera_manager)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+
+    # Encode frame to base64
+    _, buffer = cv2.imencode('.jpg', annotated_frame)
+    frame_b64 = base64.b64encode(buffer).decode('utf-8')
+
+    return JSONResponse({
+        "success": True,
+        "frame": frame_b64,
+        "detections": detections,
+        "total_detections": len(detections)
+    })
+
+
+@router.post("/detect-only")
+async def detect_only(file: UploadFile = File(...)):
+    """
+    Nhận hình ảnh, chỉ thực hiện detection (không OCR)
+    """
+    frame = await _read_frame(file)
+    try:
+        detections = await _run_inference(detect_frame, frame)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing image: {str(e)}")
+
+    return JSONResponse({
+        "success": True,
+        "detections": detections,
+        "total_detections": len(detections)
+    })
+
+
+@router.post("/bulk")
+async def bulk_detect(files: list[UploadFile] = File(...)):
+    """
+    Nhận nhiều ảnh (multipart) và/hoặc file zip chứa ảnh, detect + OCR theo batch
+    Kết quả stream dạng NDJSON: mỗi ảnh 1 dòng ngay khi xử lý xong
+    """
+    if inference_executor.get_stats()["in_flight"] >= inference_executor.max_pending:
+        raise HTTPException(status_code=429, detail="Inference queue full", headers={"Retry-After": "1"})
+
+    # Copy upload ra file tạm riêng: UploadFile có thể bị đóng trước khi stream kết thúc
+    spooled = []
+    for file in files:
+        handle = tempfile.TemporaryFile()
+        await asyncio.to_thread(shutil.copyfileobj, file.file, handle)
+        spooled.append((file.filename or "upload", handle))
+
+    return StreamingResponse(_bulk_stream(spooled), media_type="application/x-ndjson")
+
+
+@router.get("/executor")
+async def executor_stats():
+    """Trạng thái executor inference cho ảnh upload (in_flight, rejected...)"""
+    return inference_executor.get_stats()
@@ -1,7 +1,19 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from app.ai.runtime import readiness
 
 router = APIRouter()
 
 @router.get("/health")
 def health_check():
+    """Liveness: process còn sống (không phụ thuộc model)"""
     return {"status": "ok"}
+
+@router.get("/health/ready")
+def readiness_check():
+    """Readiness: 200 chỉ khi detector + OCR đã load và warmup xong, ngược lại 503"""
+    ready = readiness.is_ready()
+    return JSONResponse(
+        status_code=200 if ready else 503,
+        content={"status": "ready" if ready else "starting", "models": readiness.snapshot()},
+    )
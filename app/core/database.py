@@ -1,15 +1,33 @@
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy.ext.declarative import declarative_base
 from .config import settings
 from typing import Annotated
 from fastapi import Depends
 from sqlalchemy.orm import Session
 
-engine = create_engine(settings.DATABASE_URL)
+_pool_options = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT,
+    pool_recycle=settings.DB_POOL_RECYCLE,
+    pool_pre_ping=True,  # Bỏ connection đã bị DB / firewall đóng
+)
+
+engine = create_engine(settings.DATABASE_URL, **_pool_options)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 Base = declarative_base()
 
+# Engine async (asyncpg): endpoint đọc chạy trên event loop mà không block video stream
+async_engine = create_async_engine(
+    settings.ASYNC_DATABASE_URL,
+    connect_args={"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE,
+                  "statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
+    **_pool_options
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, expire_on_commit=False, autoflush=False)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -17,4 +35,9 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 db_dependency = Annotated[Session, Depends(get_db)]
+async_db_dependency = Annotated[AsyncSession, Depends(get_async_db)]
@@ -0,0 +1,88 @@
+"""
+Import Report
+Kiểm tra thời gian import app và các module nặng (vision stack) đã bị kéo vào process chưa
+
+Chạy: python -m app.core.import_report --mode api --top 20
+(chạy `python -X importtime -c "import main"` trong process con, in top module theo thời gian cumulative)
+"""
+
+import json
+import os
+import subprocess
+import sys
+from typing import Optional
+
+# Module nặng không được import trong RUN_MODE=api
+HEAVY_MODULES = ("ultralytics", "torch", "paddleocr", "paddle", "supervision", "cv2",
+                 "onnxruntime", "openvino", "numpy")
+
+
+def heavy_modules_loaded() -> list[str]:
+    """Module nặng đang có trong sys.modules của process hiện tại"""
+    return [name for name in HEAVY_MODULES if name in sys.modules]
+
+
+def parse_importtime(stderr: str) -> list[tuple[str, int, int]]:
+    """Output của -X importtime → [(module, self_us, cumulative_us)]"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        try:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+            rows.append((name.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    return rows
+
+
+def run_report(mode: str = "full", module: str = "main", top: int = 20) -> dict:
+    env = dict(os.environ, RUN_MODE=mode)
+    code = (
+        f"import time, json; t = time.perf_counter(); import {module}; "
+        "from app.core.import_report import heavy_modules_loaded; "
+        "import resource; "
+        "print(json.dumps({'seconds': time.perf_counter() - t, 'heavy': heavy_modules_loaded(), "
+        "'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        env=env, capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr else "import failed")
+
+    summary = json.loads(result.stdout.strip().splitlines()[-1])
+    rows = parse_importtime(result.stderr)
+    # Chỉ module top-level (không có '.') để tránh đếm trùng
+    top_level = sorted((r for r in rows if "." not in r[0]), key=lambda r: r[2], reverse=True)[:top]
+    return {
+        "mode": mode,
+        "import_seconds": round(summary["seconds"], 3),
+        "max_rss_mb": round(summary["max_rss_kb"] / 1024, 1),
+        "heavy_modules": summary["heavy"],
+        "top_modules": [{"module": n, "cumulative_ms": round(c / 1000, 1)} for n, _, c in top_level],
+    }
+
+
+def main(argv: Optional[list[str]] = None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import-time report for the web app")
+    parser.add_argument("--mode", choices=("api", "full"), default="api")
+    parser.add_argument("--module", default="main")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    report = run_report(args.mode, args.module, args.top)
+    print(f"RUN_MODE={report['mode']}: import {report['import_seconds'] * 1000:.0f}ms, "
+          f"max RSS {report['max_rss_mb']}MB")
+    print(f"Heavy modules: {', '.join(report['heavy_modules']) or 'none'}")
+    for row in report["top_modules"]:
+        print(f"  {row['cumulative_ms']:>9.1f}ms  {row['module']}")
+    if args.mode == "api" and report["heavy_modules"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Search Indexes
+Index cho tìm kiếm / phân trang lịch sử detection (chạy 1 lần khi deploy, không chạy lúc app startup)
+- ix_detections_timestamp_id: keyset pagination (timestamp, id)
+- ix_plates_search_trgm: pg_trgm, tìm chuỗi con bất kỳ trong biển số
+- ix_plates_search_prefix: btree text_pattern_ops khi không có pg_trgm (chỉ tìm theo tiền tố)
+
+CREATE INDEX CONCURRENTLY (autocommit): không khóa ghi detections / plates trong lúc build
+create_all không thêm index vào bảng đã tồn tại nên cần chạy riêng
+
+Chạy: python -m app.core.search_indexes
+"""
+
+from typing import Optional
+from sqlalchemy import text
+
+# Biểu thức phải trùng với DetectionService.plate_search_key: translate(plate_text, '-.', '')
+HISTORY_INDEX = "ix_detections_timestamp_id"
+TRIGRAM_INDEX = "ix_plates_search_trgm"
+PREFIX_INDEX = "ix_plates_search_prefix"
+
+_INDEX_DDL = {
+    HISTORY_INDEX: "ON detections (timestamp DESC, id DESC)",
+    TRIGRAM_INDEX: "ON plates USING gin ((translate(plate_text, '-.', '')) gin_trgm_ops)",
+    PREFIX_INDEX: "ON plates ((translate(plate_text, '-.', '')) text_pattern_ops)",
+}
+
+
+def _index_state(conn, name: str) -> Optional[bool]:
+    """None: chưa có, True: hợp lệ, False: INVALID"""
+    return conn.execute(
+        text("SELECT i.indisvalid FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid WHERE c.relname = :name"),
+        {"name": name}
+    ).scalar()
+
+
+def search_mode(valid_indexes) -> str:
+    """
+    Tên index hợp lệ đang có → cách tìm biển số
+    - "trigram": contains() dùng được index gin_trgm_ops
+    - "prefix": chỉ có text_pattern_ops → phải tìm bằng startswith() (LIKE 'abc%')
+    - "unindexed": chưa chạy CLI, contains() quét toàn bảng
+    """
+    if TRIGRAM_INDEX in valid_indexes:
+        return "trigram"
+    if PREFIX_INDEX in valid_indexes:
+        return "prefix"
+    return "unindexed"
+
+
+SEARCH_INDEXES_SQL = text(
+    "SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid "
+    f"WHERE i.indisvalid AND c.relname IN ('{TRIGRAM_INDEX}', '{PREFIX_INDEX}')"
+)
+
+
+def create_index(conn, name: str):
+    state = _index_state(conn, name)
+    if state:
+        print(f"[DB] Index {name} already exists")
+        return
+    if state is False:
+        print(f"[DB] Dropping invalid index {name}")
+        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {name}"))
+    print(f"[DB] Creating index {name} (concurrently)...")
+    conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} {_INDEX_DDL[name]}"))
+
+
+def ensure_search_indexes(engine) -> str:
+    """
+    Tạo index (idempotent)
+    Returns: chế độ tìm biển số "trigram" | "prefix"
+    """
+    # CONCURRENTLY không chạy được trong transaction → autocommit
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        create_index(conn, HISTORY_INDEX)
+        try:
+            conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+            create_index(conn, TRIGRAM_INDEX)
+            return "trigram"
+        except Exception as e:
+            print(f"[DB] pg_trgm unavailable ({e.__class__.__name__}), plate search will match by prefix only")
+        create_index(conn, PREFIX_INDEX)
+        return "prefix"
+
+
+def main():
+    from app.core.database import engine, Base
+    from app.models.user import User
+    from app.models.plate import Plate
+    from app.models.detection import Detection
+
+    # Index cần bảng đã tồn tại (lần deploy đầu tiên chạy trước app)
+    Base.metadata.create_all(bind=engine, tables=[User.__table__, Plate.__table__, Detection.__table__])
+    mode = ensure_search_indexes(engine)
+    print(f"[DB] Search indexes ready (plate search: {mode})")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 # models/detection.py
 from sqlalchemy import Column, BigInteger, Integer, Float, TIMESTAMP, String, Text, Boolean, ForeignKey, func
+from sqlalchemy.orm import relationship
 from ..core.database import Base
 
 class Detection(Base):
@@ -12,4 +13,8 @@ class Detection(Base):
     timestamp = Column(TIMESTAMP, server_default=func.now(), index=True)
     raw_text = Column(String(50))
     crop_image_path = Column(Text)
-    is_verified = Column(Boolean, default=False)
\ No newline at end of file
+    is_verified = Column(Boolean, default=False)
+
+    # Không back_populates: Plate.detections mặc định sẽ set NULL plate_id khi xóa plate (thay vì CASCADE của DB)
+    # lazy="raise": truy cập plate chưa nạp sẵn (quên join / eager load) báo lỗi thay vì âm thầm query từng dòng
+    plate = relationship("Plate", lazy="raise")
\ No newline at end of file
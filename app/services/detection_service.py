@@ -1,13 +1,19 @@
 # services/detection_service.py
-from sqlalchemy.orm import Session
-from sqlalchemy import func, and_, desc
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func, desc, insert, select, tuple_, literal_column
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from app.models.detection import Detection
 from app.models.plate import Plate
 from app.schemas.detection import DetectionCreate, DetectionResponse
+from app.services.plate_cache import plate_cache, PlateInfo
+from app.core.search_indexes import SEARCH_INDEXES_SQL, search_mode
 from app.utils.format_plate import standardize_plate
 from app.utils import validate_plate
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional, List, Dict
+import base64
+import re
 import threading
 import time
 
@@ -86,7 +92,7 @@ class DetectionService:
     """
     
     @staticmethod
-    def get_or_create_plate(db: Session, plate_text: str) -> Plate:
+    def get_or_create_plate(db: Session, plate_text: str) -> PlateInfo:
         """
         Lấy hoặc tạo mới plate trong DB
         Tự động chuẩn hóa plate_text sang dạng chuẩn
@@ -103,40 +109,28 @@ class DetectionService:
             # Nếu muốn strict reject, bỏ comment ở dưới:
             # raise ValueError(f"Invalid plate format: {validation_result['error']}")
         
-        # Tìm plate trong DB
-        plate = db.query(Plate).filter(Plate.plate_text == plate_text).first()
-        
-        if plate:
-            return plate
-        
-        # Tạo mới nếu chưa có
-        new_plate = Plate(
-            plate_text=plate_text,
-            province=None,  # Có thể parse từ plate_text sau
-            vehicle_type=None,
-            owner_name=None
-        )
-        db.add(new_plate)
+        plate = DetectionService.get_or_create_plates(db, [plate_text])[plate_text]
         db.commit()
-        db.refresh(new_plate)
-        
-        return new_plate
+        return plate
     
     @staticmethod
     def create_detection(
         db: Session,
         detection_data: DetectionCreate,
         user_id: Optional[int] = None,
-        tracker_id: Optional[int] = None
+        tracker_id: Optional[int] = None,
+        camera_id: Optional[str] = None
     ) -> Optional[Detection]:
         """
         Tạo detection mới với anti-spam logic
+        camera_id: tracker_id chỉ unique trong 1 camera → cooldown theo (camera_id, tracker_id)
         
         Returns:
             Detection object nếu được lưu, None nếu skip do cooldown
         """
         # ✅ ANTI-SPAM: Kiểm tra cooldown
-        if tracker_id is not None and not detection_tracker.should_save(tracker_id):
+        tracker_key = (camera_id, tracker_id) if camera_id is not None else tracker_id
+        if tracker_id is not None and not detection_tracker.should_save(tracker_key):
             print(f"[DETECTION] Skip saving tracker_id={tracker_id} (cooldown)")
             return None
         
@@ -144,7 +138,7 @@ class DetectionService:
         plate = DetectionService.get_or_create_plate(db, detection_data.plate_text)
         
         # Kiểm tra plate có trong DB không → auto verify
-        is_verified = plate.owner_name is not None or plate.province is not None
+        is_verified = plate.is_verified
         
         # Tạo detection
         detection = Detection(
@@ -165,70 +159,176 @@ class DetectionService:
         return detection
     
     @staticmethod
-    def get_recent_detections(
-        db: Session,
-        limit: int = 50,
-        verified_only: bool = False
-    ) -> List[DetectionResponse]:
+    def get_or_create_plates(db: Session, plate_texts) -> Dict[str, PlateInfo]:
         """
-        Lấy danh sách detections gần nhất
+        Lấy / tạo nhiều plate: cache trước, plate chưa có trong cache đi qua
+        1 câu INSERT ... ON CONFLICT DO NOTHING RETURNING (không race trên unique constraint),
+        plate đã tồn tại (conflict) lấy bằng 1 SELECT ... IN
+        Không commit (caller commit cùng transaction với detections)
         """
-        query = db.query(Detection).join(Plate)
-        
-        if verified_only:
-            query = query.filter(Detection.is_verified == True)
-        
-        detections = query.order_by(desc(Detection.timestamp)).limit(limit).all()
-        
-        # Convert to response schema
-        results = []
-        for det in detections:
-            plate = det.plate if hasattr(det, 'plate') else db.query(Plate).filter(Plate.id == det.plate_id).first()
-            
-            results.append(DetectionResponse(
-                id=det.id,
-                plate_id=det.plate_id,
-                user_id=det.user_id,
-                confidence=det.confidence,
-                timestamp=det.timestamp,
-                raw_text=det.raw_text,
-                crop_image_path=det.crop_image_path,
-                is_verified=det.is_verified,
-                plate_text=plate.plate_text if plate else "Unknown",
-                plate_province=plate.province if plate else None,
-                plate_owner=plate.owner_name if plate else None,
-                is_blacklisted=plate.is_blacklisted if plate else False,
-                blacklist_reason=plate.blacklist_reason if plate else None
-            ))
-        
-        return results
+        plates = {}
+        missing = []
+        for text in {standardize_plate(text) for text in plate_texts}:
+            cached = plate_cache.get(text)
+            if cached is not None:
+                plates[text] = cached
+            else:
+                missing.append(text)
+        if not missing:
+            return plates
+
+        columns = (Plate.id, Plate.plate_text, Plate.is_blacklisted, Plate.owner_name, Plate.province)
+        stmt = (
+            pg_insert(Plate)
+            .values([{"plate_text": text, "is_blacklisted": False} for text in sorted(missing)])
+            .on_conflict_do_nothing(index_elements=[Plate.plate_text])
+            .returning(*columns)
+        )
+        rows = list(db.execute(stmt))
+        existing = set(missing) - {row.plate_text for row in rows}
+        if existing:
+            rows.extend(db.query(*columns).filter(Plate.plate_text.in_(existing)).all())
+
+        for row in rows:
+            info = PlateInfo.from_row(row)
+            plate_cache.put(info)
+            plates[info.plate_text] = info
+        return plates
+
+    @staticmethod
+    def bulk_create_detections(db: Session, rows: List[dict], chunk_size: int = 1000) -> int:
+        """
+        Lưu nhiều detection trong 1 transaction: không cooldown, insert nhiều dòng mỗi câu lệnh
+        rows: [{plate_text, confidence, raw_text?, crop_image_path?, timestamp?}]
+        Returns: số detection đã lưu
+        """
+        if not rows:
+            return 0
+        plates = DetectionService.get_or_create_plates(db, [row["plate_text"] for row in rows])
+
+        mappings = []
+        for row in rows:
+            plate = plates[standardize_plate(row["plate_text"])]
+            mapping = {
+                "plate_id": plate.id,
+                "confidence": row["confidence"],
+                "raw_text": row.get("raw_text") or row["plate_text"],
+                "crop_image_path": row.get("crop_image_path"),
+                "is_verified": plate.is_verified,
+                "timestamp": row.get("timestamp") or datetime.now(),
+            }
+            mappings.append(mapping)
+
+        for start in range(0, len(mappings), chunk_size):
+            db.execute(insert(Detection), mappings[start:start + chunk_size])
+        db.commit()
+
+        print(f"[DETECTION] Bulk saved {len(mappings)} detections ({len(plates)} plates)")
+        return len(mappings)
+    
+    # Khóa tìm kiếm: plate_text bỏ '-' và '.' (gõ "51H1234" vẫn khớp "51-H1234.56")
+    # Tham số viết literal để khớp index biểu thức ix_plates_search_* (xem app/core/search_indexes.py)
+    plate_search_key = func.translate(Plate.plate_text, literal_column("'-.'"), literal_column("''"))
+    
+    # Chế độ tìm biển số theo index đang có (cache, kiểm tra lại định kỳ để nhận index tạo sau khi deploy)
+    _search_mode: Optional[str] = None
+    _search_mode_checked_at = 0.0
+    SEARCH_MODE_TTL = 300
     
     @staticmethod
-    def get_latest_detection(db: Session) -> Optional[DetectionResponse]:
+    async def get_search_mode_async(db: AsyncSession) -> str:
         """
-        Lấy detection mới nhất (cái cuối cùng được detect)
+        "trigram" | "prefix" | "unindexed" (xem search_indexes.search_mode)
+        Không phải PostgreSQL (test SQLite) → "unindexed"
         """
-        detection = (
-            db.query(Detection)
-            .join(Plate)
-            .order_by(desc(Detection.timestamp))
-            .first()
-        )
-        
-        if not detection:
-            return None
+        now = time.monotonic()
+        if DetectionService._search_mode is not None and \
+                now - DetectionService._search_mode_checked_at < DetectionService.SEARCH_MODE_TTL:
+            return DetectionService._search_mode
         
-        plate = detection.plate if hasattr(detection, 'plate') else db.query(Plate).filter(Plate.id == detection.plate_id).first()
+        if db.get_bind().dialect.name == "postgresql":
+            result = await db.execute(SEARCH_INDEXES_SQL)
+            mode = search_mode(set(result.scalars().all()))
+        else:
+            mode = "unindexed"
         
+        if mode != DetectionService._search_mode:
+            if mode == "prefix":
+                print("[DB] Plate search uses prefix index: search matches plate prefix only")
+            elif mode == "unindexed":
+                print("[DB] ⚠ Plate search is unindexed (full scan), run: python -m app.core.search_indexes")
+        DetectionService._search_mode = mode
+        DetectionService._search_mode_checked_at = now
+        return mode
+    
+    @staticmethod
+    def _recent_stmt(
+        limit: int,
+        verified_only: bool = False,
+        blacklisted: Optional[bool] = None,
+        search: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        before: Optional[tuple] = None,
+        prefix_search: bool = False
+    ):
+        """
+        SELECT detections JOIN plates: Detection.plate nạp luôn từ join (contains_eager)
+        → N dòng = 1 query, không query plates theo từng dòng
+        Lọc trong SQL, sắp xếp (timestamp, id) giảm dần
+        before: cursor (timestamp, id) của dòng cuối trang trước → keyset pagination
+        prefix_search: chỉ có index text_pattern_ops → tìm theo tiền tố (index không dùng được cho '%abc%')
+        """
+        stmt = select(Detection).join(Detection.plate).options(contains_eager(Detection.plate))
+        if verified_only:
+            stmt = stmt.where(Detection.is_verified == True)
+        if blacklisted is not None:
+            stmt = stmt.where(Plate.is_blacklisted == blacklisted)
+        if search:
+            # search đã normalize_search (chỉ A-Z0-9, không cần escape) → bind cả pattern 'abc%'
+            # để planner thấy tiền tố hằng (startswith() sinh :p || '%' không dùng được index)
+            pattern = f"{search}%" if prefix_search else f"%{search}%"
+            stmt = stmt.where(DetectionService.plate_search_key.like(pattern))
+        if start is not None:
+            stmt = stmt.where(Detection.timestamp >= start)
+        if end is not None:
+            stmt = stmt.where(Detection.timestamp < end)
+        if before is not None:
+            stmt = stmt.where(tuple_(Detection.timestamp, Detection.id) < tuple_(*before))
+        return stmt.order_by(desc(Detection.timestamp), desc(Detection.id)).limit(limit)
+    
+    @staticmethod
+    def normalize_search(search: Optional[str]) -> str:
+        """Text tìm kiếm → chữ hoa + số (bỏ '-', '.', khoảng trắng)"""
+        return re.sub(r"[^A-Z0-9]", "", (search or "").upper())
+    
+    @staticmethod
+    def encode_cursor(detection: DetectionResponse) -> str:
+        raw = f"{detection.timestamp.isoformat()}|{detection.id}"
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+    
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple:
+        """Cursor → (timestamp, id), ValueError nếu không hợp lệ"""
+        try:
+            raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+            timestamp, detection_id = raw.split("|")
+            return datetime.fromisoformat(timestamp), int(detection_id)
+        except Exception:
+            raise ValueError("Invalid cursor")
+    
+    @staticmethod
+    def _to_response(det: Detection) -> DetectionResponse:
+        plate = det.plate
         return DetectionResponse(
-            id=detection.id,
-            plate_id=detection.plate_id,
-            user_id=detection.user_id,
-            confidence=detection.confidence,
-            timestamp=detection.timestamp,
-            raw_text=detection.raw_text,
-            crop_image_path=detection.crop_image_path,
-            is_verified=detection.is_verified,
+            id=det.id,
+            plate_id=det.plate_id,
+            user_id=det.user_id,
+            confidence=det.confidence,
+            timestamp=det.timestamp,
+            raw_text=det.raw_text,
+            crop_image_path=det.crop_image_path,
+            is_verified=det.is_verified,
             plate_text=plate.plate_text if plate else "Unknown",
             plate_province=plate.province if plate else None,
             plate_owner=plate.owner_name if plate else None,
@@ -236,21 +336,86 @@ class DetectionService:
             blacklist_reason=plate.blacklist_reason if plate else None
         )
     
+    @staticmethod
+    def get_recent_detections(
+        db: Session,
+        limit: int = 50,
+        verified_only: bool = False
+    ) -> List[DetectionResponse]:
+        """
+        Lấy danh sách detections gần nhất
+        """
+        detections = db.execute(DetectionService._recent_stmt(limit, verified_only)).scalars().all()
+        return [DetectionService._to_response(det) for det in detections]
+    
+    @staticmethod
+    def get_latest_detection(db: Session) -> Optional[DetectionResponse]:
+        """
+        Lấy detection mới nhất (cái cuối cùng được detect)
+        """
+        detections = DetectionService.get_recent_detections(db, limit=1)
+        return detections[0] if detections else None
+    
+    @staticmethod
+    async def get_recent_detections_async(
+        db: AsyncSession,
+        limit: int = 50,
+        verified_only: bool = False
+    ) -> List[DetectionResponse]:
+        """
+        Như get_recent_detections nhưng chạy trên engine async (không block event loop)
+        """
+        result = await db.execute(DetectionService._recent_stmt(limit, verified_only))
+        return [DetectionService._to_response(det) for det in result.scalars().all()]
+    
+    @staticmethod
+    async def get_latest_detection_async(db: AsyncSession) -> Optional[DetectionResponse]:
+        """
+        Như get_latest_detection nhưng chạy trên engine async
+        """
+        detections = await DetectionService.get_recent_detections_async(db, limit=1)
+        return detections[0] if detections else None
+    
+    @staticmethod
+    async def search_detections_async(
+        db: AsyncSession,
+        limit: int = 50,
+        search: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        blacklisted: Optional[bool] = None,
+        cursor: Optional[str] = None
+    ) -> tuple[List[DetectionResponse], Optional[str]]:
+        """
+        Lịch sử detection: lọc biển số / thời gian / blacklist trong SQL, phân trang theo cursor
+        Returns: (detections, next_cursor hoặc None nếu hết)
+        """
+        before = DetectionService.decode_cursor(cursor) if cursor else None
+        search = DetectionService.normalize_search(search)
+        prefix_search = bool(search) and await DetectionService.get_search_mode_async(db) == "prefix"
+        stmt = DetectionService._recent_stmt(
+            limit + 1,  # Lấy dư 1 dòng để biết còn trang sau
+            blacklisted=blacklisted,
+            search=search,
+            start=start,
+            end=end,
+            before=before,
+            prefix_search=prefix_search
+        )
+        result = await db.execute(stmt)
+        detections = [DetectionService._to_response(det) for det in result.scalars().all()]
+        if len(detections) <= limit:
+            return detections, None
+        detections = detections[:limit]
+        return detections, DetectionService.encode_cursor(detections[-1])
+    
     @staticmethod
     def get_blacklisted_detections(db: Session, limit: int = 20) -> List[DetectionResponse]:
         """
         Lấy danh sách xe blacklist được detect
         """
-        detections = (
-            db.query(Detection)
-            .join(Plate)
-            .filter(Plate.is_blacklisted == True)
-            .order_by(desc(Detection.timestamp))
-            .limit(limit)
-            .all()
-        )
-        
-        return [DetectionResponse.from_orm(d) for d in detections]
+        detections = db.execute(DetectionService._recent_stmt(limit, blacklisted=True)).scalars().all()
+        return [DetectionService._to_response(det) for det in detections]
     
     @staticmethod
     def get_detection_stats(db: Session) -> dict:
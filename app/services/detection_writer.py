@@ -0,0 +1,190 @@
+"""
+Detection Writer
+1 thread ghi DB dùng chung thay cho 1 thread + 1 session cho mỗi lần lưu
+- Hàng đợi giới hạn: submit() không block camera / OCR, đầy → bỏ detection và đếm dropped
+- Gom detection thành batch: 1 session + 1 transaction + insert nhiều dòng mỗi batch
+- Timestamp lấy lúc detect (không phải lúc ghi), đo độ trễ ghi (write lag)
+- stop() ghi nốt các detection còn trong hàng đợi trước khi thoát
+- Batch lỗi → ghi lại từng dòng, chỉ bỏ (và xóa ảnh crop của) dòng lỗi
+"""
+
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Optional
+from app.core.database import SessionLocal
+from app.services.detection_service import DetectionService
+from app.services.plate_cache import plate_cache
+
+
+class DetectionWriter:
+    def __init__(self, max_queue: int = 1000, batch_size: int = 100, flush_interval: float = 0.5,
+                 save_crop: Optional[Callable] = None):
+        """
+        save_crop(crop, camera_id, tracker_id) → đường dẫn file | None
+        (ghi ảnh bằng chứng trên thread writer, ngoài hot loop)
+        """
+        self.queue = queue.Queue(maxsize=max(1, max_queue))
+        self.batch_size = max(1, batch_size)
+        self.flush_interval = flush_interval
+        self.save_crop = save_crop
+        self.running = False
+        self.thread = None
+        self._stats_lock = threading.Lock()
+        self.stats = {
+            "written": 0,
+            "batches": 0,
+            "dropped": 0,
+            "errors": 0,
+            "last_batch_size": 0,
+            "max_lag_ms": 0.0,
+            "total_lag_ms": 0.0,
+        }
+
+    def start(self):
+        if self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._run, daemon=True, name="detection-writer")
+        self.thread.start()
+        print(f"[DB] Detection writer started (batch={self.batch_size}, queue={self.queue.maxsize})")
+
+    def stop(self, timeout: float = 10.0):
+        """Dừng nhận detection mới, flush hàng đợi rồi thoát"""
+        if not self.running:
+            return
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=timeout)
+        print(f"[DB] Detection writer stopped ({self.stats['written']} written, "
+              f"{self.queue.qsize()} left in queue)")
+
+    def submit(self, plate_text: str, confidence: float, raw_text: Optional[str] = None,
+               camera_id: Optional[str] = None, tracker_id: Optional[int] = None, crop=None) -> bool:
+        """
+        Đưa detection vào hàng đợi (không block)
+        Returns: False nếu writer chưa chạy hoặc hàng đợi đầy (detection bị bỏ)
+        """
+        item = {
+            "plate_text": plate_text,
+            "confidence": confidence,
+            "raw_text": raw_text,
+            "camera_id": camera_id,
+            "tracker_id": tracker_id,
+            "crop": crop,
+            "timestamp": datetime.now(),
+            "queued_at": time.monotonic(),
+        }
+        if self.running:
+            try:
+                self.queue.put_nowait(item)
+                return True
+            except queue.Full:
+                pass
+        with self._stats_lock:
+            self.stats["dropped"] += 1
+        print(f"[DB] ✗ Writer queue full, dropped detection: {plate_text}")
+        return False
+
+    def _collect(self) -> list:
+        """Chờ item đầu tiên, gom thêm tới batch_size hoặc hết flush_interval"""
+        try:
+            batch = [self.queue.get(timeout=0.1)]
+        except queue.Empty:
+            return []
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.running:
+                break
+            try:
+                batch.append(self.queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while self.running or not self.queue.empty():
+            batch = self._collect()
+            if batch:
+                self._write(batch)
+
+    def _write(self, batch: list):
+        rows = []
+        for item in batch:
+            crop_path = None
+            if self.save_crop is not None and item["crop"] is not None:
+                crop_path = self.save_crop(item["crop"], item["camera_id"], item["tracker_id"])
+            rows.append({
+                "plate_text": item["plate_text"],
+                "confidence": item["confidence"],
+                "raw_text": item["raw_text"],
+                "crop_image_path": crop_path,
+                "timestamp": item["timestamp"],
+            })
+
+        error = self._insert(rows)
+        if error is None:
+            written = batch
+        else:
+            print(f"[DB] ✗ Error writing batch of {len(rows)} detections, retrying row by row: {error}")
+            # Plate id trong cache có thể đã cũ (plate bị xóa ở process khác) hoặc thuộc transaction
+            # vừa rollback → xóa cache, thử lại từng dòng: 1 dòng lỗi không làm mất cả batch
+            plate_cache.clear()
+            written = []
+            for item, row in zip(batch, rows):
+                error = self._insert([row])
+                if error is None:
+                    written.append(item)
+                    continue
+                with self._stats_lock:
+                    self.stats["errors"] += 1
+                print(f"[DB] ✗ Error writing detection {row['plate_text']!r}: {error}")
+                self._discard_crop(row["crop_image_path"])
+
+        if not written:
+            return
+        now = time.monotonic()
+        lags = [(now - item["queued_at"]) * 1000 for item in written]
+        with self._stats_lock:
+            self.stats["written"] += len(written)
+            self.stats["batches"] += 1
+            self.stats["last_batch_size"] = len(written)
+            self.stats["total_lag_ms"] += sum(lags)
+            self.stats["max_lag_ms"] = max(self.stats["max_lag_ms"], max(lags))
+
+    @staticmethod
+    def _insert(rows: list) -> Optional[Exception]:
+        """1 session + 1 transaction. Returns: None nếu đã commit, ngược lại exception"""
+        db = SessionLocal()
+        try:
+            DetectionService.bulk_create_detections(db, rows)
+            return None
+        except Exception as e:
+            db.rollback()
+            return e
+        finally:
+            db.close()
+
+    @staticmethod
+    def _discard_crop(path: Optional[str]):
+        """Detection không lưu được → xóa ảnh bằng chứng đã ghi (không để file mồ côi)"""
+        if path is None:
+            return
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def get_stats(self) -> dict:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        total_lag = stats.pop("total_lag_ms")
+        stats["avg_lag_ms"] = round(total_lag / stats["written"], 1) if stats["written"] else 0.0
+        stats["max_lag_ms"] = round(stats["max_lag_ms"], 1)
+        stats["queue_size"] = self.queue.qsize()
+        stats["running"] = self.running
+        stats["plate_cache"] = plate_cache.get_stats()
+        return stats
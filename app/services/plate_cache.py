@@ -0,0 +1,90 @@
+"""
+Plate Cache
+LRU cache plate_text (đã chuẩn hóa) → id + cờ của plate
+- Xe quay lại không cần query bảng plates khi lưu detection
+- update_plate / delete_plate xóa entry tương ứng
+- TTL: camera worker process có cache riêng, không nhận invalidate từ web process → entry tự hết hạn
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+from app.core.config import settings
+
+
+class PlateInfo(NamedTuple):
+    id: int
+    plate_text: str
+    is_blacklisted: bool
+    is_verified: bool  # Plate đã có thông tin (owner / province) → detection auto verify
+
+    @classmethod
+    def from_row(cls, row) -> "PlateInfo":
+        """Row / Plate object có id, plate_text, is_blacklisted, owner_name, province"""
+        return cls(
+            id=row.id,
+            plate_text=row.plate_text,
+            is_blacklisted=bool(row.is_blacklisted),
+            is_verified=row.owner_name is not None or row.province is not None
+        )
+
+
+class PlateCache:
+    def __init__(self, max_size: int = 10000, ttl_seconds: float = 300, clock=time.monotonic):
+        self.max_size = max(0, max_size)
+        self.ttl_seconds = ttl_seconds
+        self.clock = clock
+        self._entries: "OrderedDict[str, tuple[PlateInfo, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, plate_text: str) -> Optional[PlateInfo]:
+        with self._lock:
+            entry = self._entries.get(plate_text)
+            if entry is not None and (self.ttl_seconds <= 0 or self.clock() - entry[1] < self.ttl_seconds):
+                self._entries.move_to_end(plate_text)
+                self.hits += 1
+                return entry[0]
+            if entry is not None:
+                del self._entries[plate_text]
+            self.misses += 1
+            return None
+
+    def put(self, info: PlateInfo):
+        if self.max_size == 0:
+            return
+        with self._lock:
+            self._entries[info.plate_text] = (info, self.clock())
+            self._entries.move_to_end(info.plate_text)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, plate_text: Optional[str] = None, plate_id: Optional[int] = None):
+        """Xóa entry theo plate_text và / hoặc id"""
+        with self._lock:
+            if plate_text is not None:
+                self._entries.pop(plate_text, None)
+            if plate_id is not None:
+                for text in [t for t, (info, _) in self._entries.items() if info.id == plate_id]:
+                    del self._entries[text]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_stats(self) -> dict:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else 0.0,
+            }
+
+
+# Global plate cache
+plate_cache = PlateCache(max_size=settings.PLATE_CACHE_SIZE, ttl_seconds=settings.PLATE_CACHE_TTL)
@@ -1,6 +1,9 @@
+from sqlalchemy import select
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from app.models.plate import Plate
 from app.schemas.plate import PlateCreate, PlateUpdate
+from app.services.plate_cache import plate_cache
 
 def get_plate_by_text(db: Session, plate_text: str):
     return db.query(Plate).filter(Plate.plate_text == plate_text).first()
@@ -8,6 +11,10 @@ def get_plate_by_text(db: Session, plate_text: str):
 def get_all_plates(db: Session):
     return db.query(Plate).all()
 
+async def get_all_plates_async(db: AsyncSession):
+    result = await db.execute(select(Plate))
+    return result.scalars().all()
+
 def create_plate(db: Session, plate_in: PlateCreate):
     plate = Plate(**plate_in.dict())
     db.add(plate)
@@ -20,10 +27,13 @@ def update_plate(db: Session, plate_id: int, plate_in: PlateUpdate):
     if not plate:
         return None
 
+    old_text = plate.plate_text
     for key, value in plate_in.dict(exclude_unset=True).items():
         setattr(plate, key, value)
     
     db.commit()
+    # Cờ / plate_text đã đổi → bỏ entry cũ trong cache (detection sau sẽ đọc lại từ DB)
+    plate_cache.invalidate(old_text, plate_id)
     db.refresh(plate)
     return plate
 
@@ -32,6 +42,8 @@ def delete_plate(db: Session, plate_id: int):
     if not plate:
         return False
 
+    plate_text = plate.plate_text
     db.delete(plate)
     db.commit()
+    plate_cache.invalidate(plate_text, plate_id)
     return True
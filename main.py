@@ -1,46 +1,61 @@
+import time
+_import_started = time.perf_counter()
+
 from fastapi import FastAPI, Request, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from app.api.routes import auth, plates, ws_detection, detections
-from app.api.dependencies import get_active_user
-from app.core.database import engine, Base
+from app.api.routes import auth, plates, health, detection_history
+from app.core.config import settings
+from app.core.database import engine, async_engine, Base
+from app.core.import_report import heavy_modules_loaded
+from app.models import detection  # noqa: F401 - RUN_MODE=api không import route detection → vẫn tạo bảng detections
 import asyncio
-import os
-from app.services.plate_services import get_all_plates
-from app.core.database import get_db
-
-print("[STARTUP] Initializing application...")
-
-# Create tables on startup
-print("[STARTUP] Creating database tables...")
-try:
-    Base.metadata.create_all(bind=engine)
-    print("[STARTUP] Database tables created successfully!")
-except Exception as e:
-    print(f"[STARTUP] Database creation error: {e}")
-
-# # Warmup YOLO model
-# print("[STARTUP] Warming up YOLO model...")
-# try:
-#     import numpy as np
-#     from app.ai.yolo import model
-#     dummy_frame = np.ones((640, 640, 3), dtype=np.uint8) * 255
-#     _ = model(dummy_frame)
-#     print("[STARTUP] YOLO model warmup completed!")
-# except Exception as e:
-#     print(f"[STARTUP] YOLO warmup error (non-critical): {e}")
-
-# # Import OCR to trigger warmup
-# print("[STARTUP] Warming up OCR model...")
-# try:
-#     from app.ai.ocr_worker import load_ocr_model
-#     ocr_model = load_ocr_model()
-#     print("[STARTUP] OCR model warmup completed!")
-# except Exception as e:
-#     print(f"[STARTUP] OCR warmup error (non-critical): {e}")
-
-app = FastAPI(title="ANPR-Webcam Backend")
+from contextlib import asynccontextmanager
+from app.services.plate_services import get_all_plates_async
+from app.core.database import get_async_db
+
+# RUN_MODE=api: chỉ phục vụ API (auth, plates...), không import YOLO / OCR / OpenCV
+VISION_ENABLED = settings.RUN_MODE != "api"
+if VISION_ENABLED:
+    from app.api.routes import ws_detection, detections
+
+print(f"[STARTUP] Initializing application (RUN_MODE={settings.RUN_MODE})...")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Create tables on startup
+    # Index tìm kiếm lịch sử tạo riêng khi deploy: python -m app.core.search_indexes
+    print("[STARTUP] Creating database tables...")
+    try:
+        Base.metadata.create_all(bind=engine)
+        print("[STARTUP] Database tables created successfully!")
+    except Exception as e:
+        print(f"[STARTUP] Database creation error: {e}")
+
+    # Load + warmup YOLO / OCR trong background thread
+    # → /health trả lời ngay, /health/ready chỉ 200 khi model đã warmup xong
+    startup_task = None
+    if VISION_ENABLED:
+        from app.ai.runtime import start_models
+        startup_task = asyncio.create_task(asyncio.to_thread(start_models))
+    yield
+
+    if startup_task is not None:
+        from app.ai.camera_manager import camera_manager
+        from app.ai.image_inference import inference_executor
+
+        print("[SHUTDOWN] Stopping cameras and OCR workers...")
+        if not startup_task.done():
+            await startup_task
+        camera_manager.cleanup()
+        inference_executor.shutdown()
+
+    await async_engine.dispose()
+
+
+app = FastAPI(title="ANPR-Webcam Backend", lifespan=lifespan)
 
 # Mount static files
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
@@ -58,10 +73,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.include_router(health.router)
 app.include_router(auth.router)
 app.include_router(plates.router)
-app.include_router(ws_detection.router)
-# app.include_router(detections.router)
+app.include_router(detection_history.router)
+if VISION_ENABLED:
+    app.include_router(ws_detection.router)
+    app.include_router(detections.router)
+
+print(f"[STARTUP] App imported in {(time.perf_counter() - _import_started) * 1000:.0f}ms, "
+      f"vision modules loaded: {heavy_modules_loaded() or 'none'}")
 
 # HTML Routes for Server-Side Rendering
 # Lưu ý: Auth check được làm ở client (auth.js) + API calls
@@ -85,8 +106,8 @@ def dashboard(request: Request):
 # def plates_page(request: Request):
 #     return templates.TemplateResponse("plates.html", {"request": request})
 @app.get("/plates")
-async def plates_page(request: Request, db=Depends(get_db)):
-    plates = get_all_plates(db)  # lấy dữ liệu từ DB ngay ở server
+async def plates_page(request: Request, db=Depends(get_async_db)):
+    plates = await get_all_plates_async(db)  # lấy dữ liệu từ DB ngay ở server (engine async)
     return templates.TemplateResponse(
         "plates.html",
         {
@@ -0,0 +1,4 @@
+import os
+
+# Settings bắt buộc SECRET_KEY (thường lấy từ .env)
+os.environ.setdefault("SECRET_KEY", "test-secret-key")
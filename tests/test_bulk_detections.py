@@ -0,0 +1,99 @@
+"""
+Bulk detect: đọc ảnh từ upload + zip, stream NDJSON từng ảnh, ảnh lỗi / zip lỗi / vượt giới hạn
+process_frames được thay bằng hàm giả (không cần model)
+"""
+
+import asyncio
+import io
+import json
+import tempfile
+import zipfile
+
+import cv2
+import numpy as np
+import pytest
+
+from app.api.routes import detections
+from app.core.config import settings
+
+
+def _jpeg():
+    return cv2.imencode(".jpg", np.full((16, 16, 3), 128, np.uint8))[1].tobytes()
+
+
+def _spool(name, data):
+    handle = tempfile.TemporaryFile()
+    handle.write(data)
+    return name, handle
+
+
+def _zip(files):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as archive:
+        for name, data in files.items():
+            archive.writestr(name, data)
+    return buffer.getvalue()
+
+
+def _run(spooled):
+    async def collect():
+        return [json.loads(chunk) async for chunk in detections._bulk_stream(spooled)]
+    return asyncio.run(collect())
+
+
+@pytest.fixture
+def fake_process(monkeypatch):
+    batches = []
+
+    def process_frames(frames, camera_manager):
+        batches.append(len(frames))
+        return [[{"plate_text": "51F12345", "valid": True}] for _ in frames]
+
+    monkeypatch.setattr(detections, "process_frames", process_frames)
+    monkeypatch.setattr(settings, "BULK_BATCH_SIZE", 2)
+    monkeypatch.setattr(settings, "BULK_MAX_IMAGES", 10)
+    return batches
+
+
+def test_iter_images_reads_plain_files_and_zip_members():
+    archive = _zip({"a.jpg": b"A", "dir/b.PNG": b"B", "notes.txt": b"x", "dir/": b""})
+    spooled = [_spool("one.jpg", b"1"), _spool("batch.zip", archive)]
+
+    assert list(detections._iter_images(spooled)) == [("one.jpg", b"1"), ("a.jpg", b"A"), ("dir/b.PNG", b"B")]
+
+
+def test_stream_batches_and_reports_invalid_images(fake_process):
+    archive = _zip({"a.jpg": _jpeg(), "b.jpg": b"not an image", "c.jpg": _jpeg()})
+    spooled = [_spool("one.jpg", _jpeg()), _spool("batch.zip", archive)]
+
+    lines = _run(spooled)
+
+    assert [line.get("file") for line in lines[:-1]] == ["one.jpg", "a.jpg", "b.jpg", "c.jpg"]
+    assert [line["success"] for line in lines[:-1]] == [True, True, False, True]
+    assert lines[2]["error"] == "Invalid image file"
+    assert fake_process == [2, 1]  # Batch 2 ảnh: ảnh lỗi không vào inference
+    assert lines[-1]["done"] and lines[-1]["images"] == 4 and lines[-1]["plates"] == 3
+    assert all(handle.closed for _, handle in spooled)
+
+
+def test_bad_archive_and_too_many_images(fake_process, monkeypatch):
+    lines = _run([_spool("broken.zip", b"not a zip")])
+    assert lines[0]["success"] is False and lines[0]["error"].startswith("Invalid archive")
+    assert lines[-1]["done"] and lines[-1]["images"] == 0
+
+    monkeypatch.setattr(settings, "BULK_MAX_IMAGES", 3)
+    lines = _run([_spool(f"{i}.jpg", _jpeg()) for i in range(5)])
+    assert [line.get("index") for line in lines[:2]] == [0, 1]
+    assert lines[2] == {"success": False, "error": "Too many images (max 3)"}
+    assert lines[-1]["images"] == 2
+
+
+def test_inference_error_is_reported_per_image(monkeypatch):
+    def process_frames(frames, camera_manager):
+        raise RuntimeError("detector stopped")
+
+    monkeypatch.setattr(detections, "process_frames", process_frames)
+    lines = _run([_spool("one.jpg", _jpeg())])
+
+    assert lines[0] == {"index": 0, "file": "one.jpg", "success": False, "error": "detector stopped"}
+    assert lines[-1]["plates"] == 0
@@ -0,0 +1,80 @@
+"""
+Detect interval thích ứng (chuyển động + CPU) và dự đoán bbox giữa 2 lần detect
+"""
+
+import numpy as np
+import pytest
+import supervision as sv
+
+from app.ai.cadence import DetectionCadence, MotionPredictor
+
+
+def _cadence(**kwargs):
+    options = dict(base_interval=3, min_interval=1, max_interval=15, motion_threshold=0.05, cpu_budget=0.7)
+    options.update(kwargs)
+    return DetectionCadence(**options)
+
+
+def test_moving_vehicle_detects_every_frame():
+    cadence = _cadence()
+    cadence.update(num_detections=1, speed=0.2, detect_seconds=0.001)
+    assert cadence.interval == 1
+
+
+def test_parked_vehicle_uses_base_interval():
+    cadence = _cadence()
+    cadence.update(num_detections=1, speed=0.01, detect_seconds=0.001)
+    assert cadence.interval == 3
+
+
+def test_empty_lane_backs_off_to_max_then_recovers():
+    cadence = _cadence()
+    intervals = []
+    for _ in range(4):
+        cadence.update(num_detections=0, speed=0.0, detect_seconds=0.001)
+        intervals.append(cadence.interval)
+    assert intervals == [6, 12, 15, 15]
+
+    # Xe xuất hiện → detect dày lại ngay
+    cadence.update(num_detections=1, speed=0.3, detect_seconds=0.001)
+    assert cadence.interval == 1
+
+
+def test_cpu_budget_caps_detect_rate():
+    cadence = _cadence()
+    for frame in range(20):
+        cadence.on_frame(frame / 25)  # Nguồn 25 fps
+    assert cadence.fps == pytest.approx(25)
+
+    # Detect 100ms: mỗi frame sẽ tốn 2.5 core → interval ≥ ceil(0.1 * 25 / 0.7) = 4
+    cadence.update(num_detections=1, speed=0.3, detect_seconds=0.1)
+    assert cadence.interval == 4
+
+
+def _tracked(xyxy, tracker_ids):
+    return sv.Detections(
+        xyxy=np.array(xyxy, dtype=np.float32),
+        confidence=np.full(len(xyxy), 0.9), class_id=np.zeros(len(xyxy), dtype=int),
+        tracker_id=np.array(tracker_ids)
+    )
+
+
+def test_predictor_extrapolates_velocity():
+    predictor = MotionPredictor()
+    predictor.update(_tracked([[0, 0, 10, 10]], [1]), now=0.0)
+    detections = _tracked([[10, 0, 20, 10]], [1])
+    predictor.update(detections, now=1.0)
+
+    predicted = predictor.predict(detections, now=1.5)
+    # Vận tốc EMA: 0.5 * 10px/s → sau 0.5s lệch thêm 2.5px
+    assert predicted.xyxy[0].tolist() == pytest.approx([12.5, 0, 22.5, 10])
+    assert detections.xyxy[0].tolist() == [10, 0, 20, 10]  # Không sửa detections gốc
+    assert predictor.max_speed(frame_width=100) == pytest.approx(0.05)
+
+
+def test_predictor_forgets_old_tracks():
+    predictor = MotionPredictor(max_age=2.0)
+    predictor.update(_tracked([[0, 0, 10, 10]], [1]), now=0.0)
+    predictor.update(_tracked([[0, 0, 10, 10]], [2]), now=3.0)
+    assert predictor.max_speed(100) == 0.0
+    assert set(predictor._tracks) == {2}
@@ -0,0 +1,169 @@
+"""
+Regression: danh sách detection (kèm thông tin plate) phải lấy trong đúng 1 câu SQL
+Trước đây mỗi dòng detection bắn thêm 1 SELECT plates (N+1 query)
+Chạy trên SQLite in-memory (sync + aiosqlite), không cần PostgreSQL
+"""
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app.core.database import Base
+from app.models.detection import Detection
+from app.models.plate import Plate
+from app.models.user import User  # noqa: F401 - bảng users cho FK detections.user_id
+from app.services.detection_service import DetectionService
+
+ROWS = 25
+PLATES = 5
+
+
+def _seed(session):
+    now = datetime(2026, 1, 1, 12, 0, 0)
+    plates = [
+        Plate(id=i + 1, plate_text=f"51-H1234.{i:02d}", owner_name="Owner" if i % 2 else None,
+              is_blacklisted=(i == 0), blacklist_reason="Stolen" if i == 0 else None)
+        for i in range(PLATES)
+    ]
+    session.add_all(plates)
+    session.add_all(
+        Detection(id=i + 1, plate_id=plates[i % PLATES].id, confidence=0.9,
+                  timestamp=now - timedelta(seconds=i), raw_text="raw", is_verified=False)
+        for i in range(ROWS)
+    )
+    session.commit()
+
+
+def _add_translate(engine):
+    """SQLite không có translate() của PostgreSQL (dùng trong plate_search_key)"""
+    def translate(value, chars, replacement):
+        table = {ord(c): (replacement[i] if i < len(replacement) else None) for i, c in enumerate(chars)}
+        return value.translate(table) if value is not None else None
+
+    @event.listens_for(engine, "connect")
+    def _on_connect(dbapi_conn, record):
+        dbapi_conn.create_function("translate", 3, translate)
+
+
+class _QueryCounter:
+    def __init__(self, engine):
+        self.statements = []
+        event.listen(engine, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+@pytest.fixture
+def sync_session():
+    engine = create_engine("sqlite://", poolclass=StaticPool, connect_args={"check_same_thread": False})
+    _add_translate(engine)
+    Base.metadata.create_all(engine)
+    session = sessionmaker(bind=engine)()
+    _seed(session)
+    session.expunge_all()  # Bỏ object đã seed khỏi identity map → plate phải lấy từ query
+    yield engine, session
+    session.close()
+    engine.dispose()
+
+
+def test_recent_detections_single_query(sync_session):
+    engine, session = sync_session
+    counter = _QueryCounter(engine)
+
+    results = DetectionService.get_recent_detections(session, limit=ROWS)
+
+    assert len(counter.statements) == 1
+    assert len(results) == ROWS
+    # Plate lấy từ join (contains_eager), lazy="raise" không bị chạm tới
+    assert results[0].plate_text == "51-H1234.00"
+    assert results[0].is_blacklisted and results[0].blacklist_reason == "Stolen"
+    assert {r.plate_text for r in results} == {f"51-H1234.{i:02d}" for i in range(PLATES)}
+    assert [r.timestamp for r in results] == sorted((r.timestamp for r in results), reverse=True)
+
+
+def test_latest_and_blacklisted_single_query(sync_session):
+    engine, session = sync_session
+    counter = _QueryCounter(engine)
+
+    latest = DetectionService.get_latest_detection(session)
+    blacklisted = DetectionService.get_blacklisted_detections(session, limit=ROWS)
+
+    assert len(counter.statements) == 2
+    assert latest.id == 1
+    assert blacklisted and all(d.is_blacklisted for d in blacklisted)
+
+
+def test_plate_not_lazy_loaded(sync_session):
+    _, session = sync_session
+    detection = session.get(Detection, 1)
+
+    # Quên eager load → lỗi ngay thay vì âm thầm query plates theo từng dòng
+    with pytest.raises(InvalidRequestError):
+        detection.plate
+
+
+def test_recent_detections_async_single_query():
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            session_factory = async_sessionmaker(engine, expire_on_commit=False)
+            async with session_factory() as session:
+                await session.run_sync(_seed)
+            counter = _QueryCounter(engine.sync_engine)
+            async with session_factory() as session:
+                results = await DetectionService.get_recent_detections_async(session, limit=ROWS)
+            return counter.statements, results
+        finally:
+            await engine.dispose()  # Đóng thread của aiosqlite (không thì process treo khi test fail)
+
+    statements, results = asyncio.run(run())
+
+    assert len(statements) == 1
+    assert len(results) == ROWS
+    assert all(r.plate_text.startswith("51-H1234.") for r in results)
+
+
+def test_plate_search_prefix_and_contains(sync_session):
+    _, session = sync_session
+
+    def search(text, prefix_search):
+        stmt = DetectionService._recent_stmt(ROWS, search=text, prefix_search=prefix_search)
+        return {d.plate.plate_text for d in session.execute(stmt).scalars().all()}
+
+    # "51H1234" khớp "51-H1234.xx" (bỏ '-' và '.')
+    assert len(search("51H1234", prefix_search=True)) == PLATES
+    assert search("123401", prefix_search=False) == {"51-H1234.01"}
+    # Chỉ có index tiền tố → không tìm chuỗi con giữa biển số
+    assert search("123401", prefix_search=True) == set()
+
+
+def test_search_detections_async_unindexed_uses_contains():
+    async def run():
+        engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+        _add_translate(engine.sync_engine)
+        try:
+            async with engine.begin() as conn:
+                await conn.run_sync(Base.metadata.create_all)
+            session_factory = async_sessionmaker(engine, expire_on_commit=False)
+            async with session_factory() as session:
+                await session.run_sync(_seed)
+            async with session_factory() as session:
+                mode = await DetectionService.get_search_mode_async(session)
+                results, _ = await DetectionService.search_detections_async(session, limit=ROWS, search="1234.01")
+            return mode, results
+        finally:
+            await engine.dispose()
+
+    mode, results = asyncio.run(run())
+
+    assert mode == "unindexed"
+    assert results and {r.plate_text for r in results} == {"51-H1234.01"}
@@ -0,0 +1,96 @@
+"""
+DetectionWriter: gom batch, batch lỗi → ghi lại từng dòng, dòng lỗi bị bỏ và xóa ảnh crop
+DB thay bằng fake bulk_create_detections (câu upsert plate chỉ chạy trên PostgreSQL)
+"""
+
+import os
+
+import pytest
+
+from app.services import detection_writer as writer_module
+from app.services.detection_writer import DetectionWriter
+
+
+class _FakeSession:
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def inserts(monkeypatch):
+    """Mỗi lần insert: danh sách plate_text; batch chứa plate "BAD" → lỗi như constraint error"""
+    calls = []
+
+    def bulk_create_detections(db, rows):
+        calls.append([row["plate_text"] for row in rows])
+        if any(row["plate_text"] == "BAD" for row in rows):
+            raise ValueError("value too long for type character varying(50)")
+        return len(rows)
+
+    monkeypatch.setattr(writer_module, "SessionLocal", _FakeSession)
+    monkeypatch.setattr(writer_module.DetectionService, "bulk_create_detections", bulk_create_detections)
+    return calls
+
+
+def _crop_saver(directory):
+    def save_crop(crop, camera_id, tracker_id):
+        path = os.path.join(directory, f"{camera_id}_{tracker_id}.jpg")
+        with open(path, "wb") as f:
+            f.write(b"jpg")
+        return path
+    return save_crop
+
+
+def test_batches_by_size(inserts):
+    writer = DetectionWriter(batch_size=3, flush_interval=0.05)
+    writer.running = True  # Nhận detection, chưa chạy thread
+    for i in range(7):
+        assert writer.submit(f"51H{i}", 0.9)
+
+    while not writer.queue.empty():
+        writer._write(writer._collect())
+
+    assert [len(call) for call in inserts] == [3, 3, 1]
+    stats = writer.get_stats()
+    assert stats["written"] == 7 and stats["batches"] == 3 and stats["errors"] == 0
+
+
+def test_bad_row_does_not_drop_batch(inserts, tmp_path):
+    writer = DetectionWriter(batch_size=10, save_crop=_crop_saver(tmp_path))
+    writer.running = True
+    for tracker_id, text in enumerate(["51H1", "BAD", "51H2"]):
+        writer.submit(text, 0.9, camera_id="cam", tracker_id=tracker_id, crop=object())
+
+    writer._write(writer._collect())
+
+    # Batch lỗi → thử lại từng dòng
+    assert inserts == [["51H1", "BAD", "51H2"], ["51H1"], ["BAD"], ["51H2"]]
+    stats = writer.get_stats()
+    assert stats["written"] == 2 and stats["errors"] == 1
+    # Ảnh crop của dòng lỗi bị xóa, của dòng đã lưu vẫn còn
+    assert sorted(os.listdir(tmp_path)) == ["cam_0.jpg", "cam_2.jpg"]
+
+
+def test_drops_when_queue_full(inserts):
+    writer = DetectionWriter(max_queue=2)
+    assert not writer.submit("51H0", 0.9)  # Chưa start
+
+    writer.running = True
+    assert writer.submit("51H1", 0.9)
+    assert writer.submit("51H2", 0.9)
+    assert not writer.submit("51H3", 0.9)
+    assert writer.get_stats()["dropped"] == 2
+
+
+def test_stop_flushes_queue(inserts):
+    writer = DetectionWriter(batch_size=2, flush_interval=0.01)
+    writer.start()
+    for i in range(5):
+        writer.submit(f"51H{i}", 0.9)
+    writer.stop()
+
+    assert sum(len(call) for call in inserts) == 5
+    assert writer.get_stats()["written"] == 5
@@ -0,0 +1,76 @@
+"""
+Pre / post-process của detector ONNX / OpenVINO: letterbox, đổi toạ độ về frame gốc, NMS theo class
+Không cần model: output [B, 4 + num_classes, N] dựng bằng tay
+"""
+
+import numpy as np
+import pytest
+
+from app.ai.detector import _ExportedDetector, letterbox
+
+IMGSZ = 64
+
+
+@pytest.fixture
+def detector():
+    detector = _ExportedDetector(imgsz=IMGSZ, conf=0.25, iou=0.45)
+    detector.names = {0: "License_Plate", 1: "Car"}
+    return detector
+
+
+def test_letterbox_keeps_aspect_and_pads():
+    frame = np.zeros((50, 100, 3), np.uint8)  # Rộng gấp đôi cao
+    image, ratio, (pad_x, pad_y) = letterbox(frame, IMGSZ)
+
+    assert image.shape == (IMGSZ, IMGSZ, 3)
+    assert ratio == pytest.approx(0.64)
+    assert (pad_x, pad_y) == (0, 16)
+    assert (image[:16] == 114).all() and (image[-16:] == 114).all()
+    assert (image[16:48] == 0).all()
+
+
+def _output(boxes):
+    """boxes: [(x1, y1, x2, y2, class_id, score)] trong toạ độ letterbox → [1, 4 + 2, N]"""
+    predictions = np.zeros((len(boxes), 6), np.float32)
+    for i, (x1, y1, x2, y2, class_id, score) in enumerate(boxes):
+        predictions[i, :4] = [(x1 + x2) / 2, (y1 + y2) / 2, x2 - x1, y2 - y1]
+        predictions[i, 4 + class_id] = score
+    return predictions.T[None]
+
+
+def test_boxes_map_back_to_frame(detector):
+    frame = np.zeros((50, 100, 3), np.uint8)
+    tensor, transforms = detector._preprocess([frame])
+    assert tensor.shape == (1, 3, IMGSZ, IMGSZ) and tensor.dtype == np.float32
+
+    # Box (10, 10) - (60, 30) của frame gốc → letterbox: * 0.64, y + 16
+    output = _output([(6.4, 22.4, 38.4, 35.2, 0, 0.9)])
+    detections = detector._postprocess(output, transforms)[0]
+
+    assert detections.xyxy[0].tolist() == pytest.approx([10, 10, 60, 30], abs=1e-3)
+    assert detections.class_id.tolist() == [0]
+    assert detections.data["class_name"].tolist() == ["License_Plate"]
+
+
+def test_nms_per_class_and_confidence_threshold(detector):
+    transforms = [(1.0, (0, 0), (IMGSZ, IMGSZ))]
+    output = _output([
+        (10, 10, 40, 20, 0, 0.9),
+        (11, 10, 41, 20, 0, 0.7),   # Trùng box trên, cùng class → bị NMS bỏ
+        (10, 10, 40, 20, 1, 0.6),   # Trùng vị trí nhưng khác class → giữ
+        (50, 50, 60, 60, 0, 0.1),   # Dưới conf
+    ])
+    detections = detector._postprocess(output, transforms)[0]
+
+    kept = sorted(zip(detections.class_id.tolist(), detections.confidence.tolist()))
+    assert [class_id for class_id, _ in kept] == [0, 1]
+    assert [score for _, score in kept] == pytest.approx([0.9, 0.6])
+
+
+def test_clips_to_frame_and_handles_empty(detector):
+    transforms = [(1.0, (0, 0), (40, 40)), (1.0, (0, 0), (40, 40))]
+    output = np.concatenate([_output([(30, 30, 50, 50, 0, 0.8)]), _output([(0, 0, 5, 5, 0, 0.05)])])
+    clipped, empty = detector._postprocess(output, transforms)
+
+    assert clipped.xyxy[0].tolist() == [30, 30, 40, 40]
+    assert len(empty) == 0
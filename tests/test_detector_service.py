@@ -0,0 +1,106 @@
+"""
+BatchedDetector: gom frame của nhiều camera thành 1 batch, không để pipeline block mãi
+"""
+
+import threading
+import time
+
+import numpy as np
+import pytest
+import supervision as sv
+
+from app.ai.detector_service import BatchedDetector
+
+
+class _FakeDetector:
+    names = {0: "License_Plate"}
+
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.batch_sizes = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def detect_batch(self, frames):
+        self.release.wait()
+        time.sleep(self.delay)
+        self.batch_sizes.append(len(frames))
+        return [
+            sv.Detections(xyxy=np.array([[0, 0, frame, frame]], dtype=np.float32),
+                          confidence=np.array([0.9]), class_id=np.array([0]))
+            for frame in frames
+        ]
+
+
+@pytest.fixture
+def service():
+    services = []
+
+    def make(detector, **kwargs):
+        service = BatchedDetector(detector, **kwargs)
+        service.start()
+        services.append(service)
+        return service
+
+    yield make
+    for service in services:
+        service.stop()
+
+
+def test_batches_frames_from_cameras(service):
+    detector = _FakeDetector()
+    batched = service(detector, max_batch=4, max_wait_ms=200)
+    for camera in range(3):
+        batched._last_seen[f"cam{camera}"] = time.monotonic()
+
+    results = {}
+
+    def run(camera):
+        results[camera] = batched.detect(f"cam{camera}", camera + 10)
+
+    threads = [threading.Thread(target=run, args=(camera,)) for camera in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=2)
+
+    # Mỗi camera nhận đúng kết quả của frame mình gửi
+    assert {camera: int(r.xyxy[0][2]) for camera, r in results.items()} == {0: 10, 1: 11, 2: 12}
+    assert sum(detector.batch_sizes) == 3 and max(detector.batch_sizes) > 1
+
+
+def test_timeout_skips_frame(service):
+    detector = _FakeDetector(delay=0.5)
+    batched = service(detector, max_wait_ms=1, infer_timeout=0.05)
+
+    started = time.monotonic()
+    detections = batched.detect("cam0", 1)
+
+    assert len(detections) == 0
+    assert time.monotonic() - started < 0.4
+    assert batched.get_stats()["timeouts"] == 1
+
+
+def test_stop_fails_waiting_pipeline(service):
+    detector = _FakeDetector()
+    detector.release.clear()  # Batch đầu tiên treo trong detect_batch
+    batched = service(detector, max_wait_ms=1, infer_timeout=30)
+    errors = []
+
+    def run():
+        try:
+            batched.detect("cam0", 1)
+        except RuntimeError as e:
+            errors.append(e)
+
+    waiter = threading.Thread(target=run)
+    waiter.start()
+    time.sleep(0.1)
+    batched.stop()
+    waiter.join(timeout=1)
+    detector.release.set()
+
+    assert not waiter.is_alive()
+    assert errors and "stopped" in str(errors[0])
+    with pytest.raises(RuntimeError):
+        batched.detect("cam0", 2)
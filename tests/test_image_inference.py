@@ -0,0 +1,74 @@
+"""
+Ảnh upload: executor giới hạn (đầy → 429), OCR đồng bộ có 1 deadline cho cả request
+"""
+
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from app.ai.camera_manager import CameraManager
+from app.ai.image_inference import BoundedExecutor, ExecutorSaturated
+from app.api.routes import detections as detection_routes
+
+
+@pytest.fixture
+def executor():
+    executor = BoundedExecutor(max_workers=1, max_queue=1)
+    yield executor
+    executor.shutdown()
+
+
+def test_executor_rejects_when_saturated(executor):
+    release = threading.Event()
+    running = executor.submit(release.wait)
+    queued = executor.submit(lambda: "queued")
+
+    with pytest.raises(ExecutorSaturated):
+        executor.submit(lambda: "rejected")
+    assert executor.get_stats()["rejected"] == 1
+
+    release.set()
+    running.result(timeout=1)
+    assert queued.result(timeout=1) == "queued"
+    # Job xong trả slot → nhận job mới
+    assert executor.submit(lambda: "again").result(timeout=1) == "again"
+
+
+def test_saturated_executor_returns_429(executor, monkeypatch):
+    release = threading.Event()
+    executor.submit(release.wait)
+    executor.submit(release.wait)
+    monkeypatch.setattr(detection_routes, "inference_executor", executor)
+
+    try:
+        with pytest.raises(HTTPException) as error:
+            asyncio.run(detection_routes._run_inference(lambda: None))
+    finally:
+        release.set()
+
+    assert error.value.status_code == 429
+    assert error.value.headers["Retry-After"] == "1"
+
+
+class _SilentOCR:
+    """OCR worker nhận crop nhưng không bao giờ trả kết quả"""
+
+    def submit(self, key, crop) -> bool:
+        return True
+
+
+def test_recognize_shares_one_deadline():
+    manager = CameraManager()
+    manager.running = True  # Không start OCR thật
+    manager.ocr_worker = _SilentOCR()
+
+    started = time.monotonic()
+    reads = manager.recognize([object()] * 5, timeout=0.2)
+    elapsed = time.monotonic() - started
+
+    assert reads == [("Error", 0.0)] * 5
+    # 1 deadline cho cả request, không phải 5 × timeout
+    assert elapsed < 0.5
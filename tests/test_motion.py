@@ -0,0 +1,54 @@
+"""
+Motion gate: cảnh tĩnh → bỏ detect sau hold_seconds, chuyển động trong ROI → detect lại ngay
+"""
+
+import numpy as np
+
+from app.ai.motion import MotionGate
+
+
+def _frame(box=None, width=320, height=180):
+    """Nền xám; box = [x1, y1, x2, y2] pixel vẽ khối trắng (xe giả)"""
+    frame = np.full((height, width, 3), 80, np.uint8)
+    if box:
+        x1, y1, x2, y2 = box
+        frame[y1:y2, x1:x2] = 255
+    return frame
+
+
+def test_first_frame_is_active_and_static_scene_goes_idle_after_hold():
+    gate = MotionGate(hold_seconds=2.0)
+    assert gate.update(_frame(), now=0.0)  # Chưa có background → detect
+
+    assert gate.update(_frame(), now=1.0)  # Vẫn trong hold
+    assert not gate.update(_frame(), now=2.5)
+    assert gate.motion_ratio == 0.0
+    assert gate.get_stats() == {"motion_active": False, "motion_ratio": 0.0}
+
+
+def test_motion_wakes_gate_and_holds():
+    gate = MotionGate(hold_seconds=2.0)
+    gate.update(_frame(), now=0.0)
+    assert not gate.update(_frame(), now=5.0)
+
+    assert gate.update(_frame([100, 60, 160, 120]), now=6.0)
+    assert gate.motion_ratio > gate.min_area
+    # Xe đi khỏi: frame tĩnh nhưng vẫn còn trong hold
+    assert gate.update(_frame(), now=7.5)
+
+
+def test_motion_outside_roi_is_ignored():
+    gate = MotionGate(roi=[0.5, 0.0, 1.0, 1.0], hold_seconds=0.0)
+    gate.update(_frame(), now=0.0)
+
+    assert not gate.update(_frame([10, 60, 100, 120]), now=1.0)  # Nửa trái
+    assert gate.update(_frame([200, 60, 300, 120]), now=2.0)     # Nửa phải
+
+
+def test_tiny_change_below_min_area_and_resolution_change():
+    gate = MotionGate(hold_seconds=0.0, min_area=0.01)
+    gate.update(_frame(), now=0.0)
+    assert not gate.update(_frame([100, 60, 104, 64]), now=1.0)  # Nhiễu vài pixel
+
+    # Camera đổi độ phân giải → reset background, detect ngay
+    assert gate.update(_frame(width=640, height=480), now=2.0)
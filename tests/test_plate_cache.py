@@ -0,0 +1,111 @@
+"""
+Cache plate_text → PlateInfo: LRU, TTL, invalidate khi sửa / xóa plate
+Upsert get_or_create_plates chạy trên SQLite in-memory (ON CONFLICT DO NOTHING RETURNING)
+"""
+
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+
+from app.core.database import Base
+from app.models.plate import Plate
+from app.models.user import User  # noqa: F401 - bảng users cho FK detections.user_id
+from app.models.detection import Detection  # noqa: F401 - bảng detections trong create_all
+from app.schemas.plate import PlateUpdate
+from app.services import plate_services
+from app.services.detection_service import DetectionService
+from app.services.plate_cache import PlateCache, PlateInfo, plate_cache
+
+
+def _info(plate_id, text):
+    return PlateInfo(id=plate_id, plate_text=text, is_blacklisted=False, is_verified=False)
+
+
+def test_lru_evicts_least_recently_used():
+    cache = PlateCache(max_size=2)
+    cache.put(_info(1, "A"))
+    cache.put(_info(2, "B"))
+    cache.get("A")  # A mới dùng → B bị đẩy ra
+    cache.put(_info(3, "C"))
+
+    assert cache.get("B") is None
+    assert cache.get("A").id == 1 and cache.get("C").id == 3
+    assert cache.get_stats() == {"size": 2, "max_size": 2, "hits": 3, "misses": 1, "hit_rate": 0.75}
+
+
+def test_ttl_expires_entries():
+    now = [0.0]
+    cache = PlateCache(ttl_seconds=10, clock=lambda: now[0])
+    cache.put(_info(1, "A"))
+
+    now[0] = 9.9
+    assert cache.get("A") is not None
+    now[0] = 10.0
+    assert cache.get("A") is None
+    assert cache.get_stats()["size"] == 0
+
+    forever = PlateCache(ttl_seconds=0, clock=lambda: now[0])
+    forever.put(_info(1, "A"))
+    now[0] = 1e9
+    assert forever.get("A") is not None
+
+
+def test_invalidate_by_text_or_id_and_disabled_cache():
+    cache = PlateCache()
+    cache.put(_info(1, "A"))
+    cache.put(_info(2, "B"))
+    cache.invalidate(plate_text="A")
+    cache.invalidate(plate_id=2)
+    assert cache.get_stats()["size"] == 0
+
+    disabled = PlateCache(max_size=0)
+    disabled.put(_info(1, "A"))
+    assert disabled.get("A") is None
+
+
+def test_from_row_sets_verified_from_owner_or_province():
+    row = SimpleNamespace(id=1, plate_text="A", is_blacklisted=None, owner_name=None, province="Hà Nội")
+    assert PlateInfo.from_row(row) == PlateInfo(1, "A", False, True)
+    assert not PlateInfo.from_row(SimpleNamespace(**{**vars(row), "province": None})).is_verified
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(engine)
+    session = sessionmaker(engine)()
+    session.statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: session.statements.append(args[2]))
+    plate_cache.clear()
+    yield session
+    session.close()
+    plate_cache.clear()
+
+
+def test_upsert_creates_once_then_serves_from_cache(db):
+    db.add(Plate(plate_text="30-A123.45", owner_name="Owner", is_blacklisted=True))
+    db.commit()
+
+    plates = DetectionService.get_or_create_plates(db, ["30-A123.45", "51-F123.45", "51-F123.45"])
+    db.commit()
+    assert plates["30-A123.45"].is_blacklisted and plates["30-A123.45"].is_verified  # Conflict → SELECT
+    assert db.query(Plate).count() == 2
+
+    db.statements.clear()
+    again = DetectionService.get_or_create_plates(db, ["51-F123.45", "30-A123.45"])
+    assert again == plates and db.statements == []
+
+
+def test_update_and_delete_invalidate_cache(db):
+    plate = DetectionService.get_or_create_plate(db, "51-F123.45")
+    plate_services.update_plate(db, plate.id, PlateUpdate(is_blacklisted=True))
+    assert plate_cache.get("51-F123.45") is None
+    assert DetectionService.get_or_create_plate(db, "51-F123.45").is_blacklisted
+
+    plate_services.delete_plate(db, plate.id)
+    assert plate_cache.get("51-F123.45") is None
+    # Tạo lại plate mới (không còn cờ blacklist của plate đã xóa)
+    assert not DetectionService.get_or_create_plate(db, "51-F123.45").is_blacklisted
+    assert db.query(Plate).count() == 1
@@ -0,0 +1,71 @@
+"""
+OCR chỉ recognition: tách biển 2 dòng, CTC greedy decode, gộp kết quả từng dòng về crop
+Không load model: dựng PlateRecognizer rỗng, thay phần nhận dạng bằng kết quả cố định
+"""
+
+import numpy as np
+import pytest
+
+from app.ai.plate_ocr import PlateRecognizer, split_rows
+
+
+def _two_row_plate(width=140, height=100, gap=(46, 54)):
+    """Biển 2 dòng giả: 2 dải chữ đen, hàng trắng ở giữa"""
+    crop = np.full((height, width, 3), 255, np.uint8)
+    crop[10:gap[0], 10:-10:12] = 0
+    crop[gap[1]:90, 10:-10:12] = 0
+    return crop
+
+
+def test_one_row_plate_is_not_split():
+    crop = np.full((52, 240, 3), 255, np.uint8)
+    rows = split_rows(crop)
+    assert len(rows) == 1 and rows[0] is crop
+
+
+def test_two_row_plate_splits_in_blank_gap():
+    top, bottom = split_rows(_two_row_plate())
+    assert 46 <= top.shape[0] <= 54
+    assert top.shape[0] + bottom.shape[0] == 100
+    assert split_rows(np.zeros((0, 10, 3), np.uint8))[0].shape == (0, 10, 3)
+
+
+def _recognizer(charset="0123456789ABCDEFGHKLMNPSTUVXYZ-."):
+    recognizer = PlateRecognizer.__new__(PlateRecognizer)
+    recognizer.backend = "onnx"
+    recognizer.charset = [""] + list(charset) + [" "]
+    return recognizer
+
+
+def _probs(recognizer, steps):
+    """steps: ký tự (hoặc "" = blank) + xác suất tại mỗi bước thời gian → [T, num_classes]"""
+    probs = np.full((len(steps), len(recognizer.charset)), 0.01, np.float32)
+    for t, (char, prob) in enumerate(steps):
+        probs[t, recognizer.charset.index(char)] = prob
+    return probs
+
+
+def test_ctc_collapses_repeats_and_blanks():
+    recognizer = _recognizer()
+    text, scores = recognizer._ctc_decode(_probs(recognizer, [
+        ("5", 0.9), ("5", 0.8), ("", 0.9), ("5", 0.7), ("1", 0.6), ("", 0.9)
+    ]))
+    assert text == "551"
+    assert scores == pytest.approx([0.9, 0.7, 0.6])
+
+
+def test_rows_merge_back_per_crop_and_ignore_separators():
+    recognizer = _recognizer()
+    reads = iter([("51F-1", [0.9, 0.8, 0.7, 0.1, 0.6]), ("123.45", [0.9] * 6), ("30A", [0.5, 0.5, 0.5])])
+    recognizer._recognize_rows = lambda rows: [next(reads) for _ in rows]
+
+    blank = np.full((40, 10, 3), 255, np.uint8)
+    results = recognizer.predict([_two_row_plate(), np.full((52, 240, 3), 255, np.uint8), blank[:0]])
+
+    two_row, one_row, empty = results
+    assert two_row["rec_texts"] == ["51F-1", "123.45"]
+    # Confidence của '-' và '.' không tính vào điểm
+    assert two_row["char_scores"] == pytest.approx([0.9, 0.8, 0.7, 0.6] + [0.9] * 5)
+    assert two_row["rec_scores"] == pytest.approx([0.75, 0.9])
+    assert one_row["rec_texts"] == ["30A"]
+    assert empty == {"rec_texts": [], "rec_scores": [], "char_scores": []}
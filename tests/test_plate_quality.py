@@ -0,0 +1,51 @@
+"""
+Chọn crop tốt nhất của track trước khi OCR: điểm chất lượng + top candidates + plateau
+"""
+
+import cv2
+import numpy as np
+
+from app.ai.plate_quality import aspect_score, score_plate_crop
+from app.ai.track_state import TrackStateStore
+
+
+def _plate(width=240, height=52, blur=0):
+    """Crop giả: chữ đen trên nền trắng (có cạnh → Laplacian variance cao)"""
+    crop = np.full((height, width, 3), 255, np.uint8)
+    cv2.putText(crop, "51F12345", (5, height - 12), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (0, 0, 0), 3)
+    if blur:
+        crop = cv2.GaussianBlur(crop, (blur, blur), 0)
+    return crop
+
+
+def test_sharp_crop_scores_higher_than_blurred():
+    assert score_plate_crop(_plate(), 0.8) > score_plate_crop(_plate(blur=15), 0.8)
+
+
+def test_bigger_crop_and_confidence_score_higher():
+    assert score_plate_crop(_plate(240, 52), 0.8) > score_plate_crop(_plate(60, 13), 0.8)
+    assert score_plate_crop(_plate(), 0.9) > score_plate_crop(_plate(), 0.3)
+
+
+def test_aspect_matches_one_and_two_row_plates():
+    assert aspect_score(470, 100) > 0.99  # 1 dòng
+    assert aspect_score(140, 100) > 0.99  # 2 dòng
+    assert aspect_score(100, 400) < 0.1
+    assert score_plate_crop(np.zeros((0, 0, 3), np.uint8), 0.9) == 0.0
+
+
+def test_keeps_top_candidates_and_waits_for_plateau():
+    store = TrackStateStore()
+    store.touch("plate_1")
+    crops = {score: np.full((4, 4), int(score * 100), np.uint8) for score in (0.3, 0.5, 0.9, 0.4, 0.45, 0.41)}
+
+    ready = [
+        store.add_candidate("plate_1", crop, score, 0.8, tracker_id=1, max_candidates=2, plateau_frames=3)
+        for score, crop in crops.items()
+    ]
+
+    # Chất lượng tăng tới 0.9 rồi chững 3 frame → mới OCR
+    assert ready == [False, False, False, False, False, True]
+    state = store.get("plate_1")
+    assert [c[0] for c in state.candidates] == [0.9, 0.5]
+    assert (store.take_best("plate_1") == crops[0.9]).all()
@@ -0,0 +1,61 @@
+"""
+Readiness: /health/ready chỉ 200 khi mọi model đã warmup, route camera trả 503 khi camera chưa load
+"""
+
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from app.ai.runtime import ModelReadiness
+from app.api.routes import health, ws_detection
+
+
+def test_ready_only_when_all_models_warm():
+    readiness = ModelReadiness(("detector", "ocr"))
+    readiness.mark_loaded("detector", 120.0)
+    assert not readiness.is_ready()  # Đã load, chưa warmup
+
+    readiness.mark_warm("detector", 30.0)
+    assert not readiness.is_ready()
+    readiness.mark_warm("ocr", 50.0)
+    assert readiness.is_ready()
+    assert readiness.snapshot()["detector"] == {
+        "loaded": True, "warm": True, "load_ms": 120.0, "warmup_ms": 30.0, "error": None
+    }
+
+
+def test_error_is_reported_and_cleared_by_warmup():
+    readiness = ModelReadiness(("ocr",))
+    readiness.mark_error("ocr", "model file missing")
+    assert not readiness.is_ready()
+    assert readiness.snapshot()["ocr"]["error"] == "model file missing"
+
+    readiness.mark_warm("ocr")  # Process OCR spawn lại, warmup thành công
+    assert readiness.is_ready() and readiness.snapshot()["ocr"]["error"] is None
+
+
+def test_api_mode_is_ready_without_models():
+    assert ModelReadiness(()).is_ready()
+
+
+def test_ready_endpoint_status(monkeypatch):
+    readiness = ModelReadiness(("detector",))
+    monkeypatch.setattr(health, "readiness", readiness)
+
+    response = health.readiness_check()
+    assert response.status_code == 503
+    assert json.loads(response.body)["status"] == "starting"
+
+    readiness.mark_warm("detector")
+    assert health.readiness_check().status_code == 200
+
+
+def test_camera_routes_503_until_cameras_loaded(monkeypatch):
+    monkeypatch.setattr(ws_detection.camera_manager, "loaded", False)
+
+    with pytest.raises(HTTPException) as error:
+        ws_detection._get_pipeline()
+
+    assert error.value.status_code == 503
+    assert error.value.headers["Retry-After"] == "5"
@@ -0,0 +1,83 @@
+"""
+Vote text theo ký tự + scheduler đọc lại trong budget của track
+"""
+
+import pytest
+
+from app.ai.text_vote import normalize_read, reads_agree, vote_text
+from app.ai.track_state import TrackStateStore, STATUS_DONE, STATUS_NO_TEXT, STATUS_VERIFYING
+
+
+def test_normalize_and_agree_ignore_separators():
+    assert normalize_read("51f-123.45") == "51F12345"
+    assert reads_agree("51F-123.45", "51f12345")
+    assert not reads_agree("51F12345", "51F12346")
+
+
+def test_majority_fixes_single_confusion():
+    text, agreement = vote_text([("51F12345", 0.8), ("51F1Z345", 0.7), ("51F12345", 0.6)])
+    assert text == "51F12345"
+    assert agreement == pytest.approx((0.8 + 0.6) / (0.8 + 0.7 + 0.6))
+
+
+def test_tie_goes_to_first_read():
+    text, agreement = vote_text([("51F12345", 0.8), ("51F12845", 0.8)])
+    assert text == "51F12345"
+    assert agreement == 0.5
+
+
+def test_char_scores_break_tie():
+    reads = [
+        ("51F12345", 0.8, [0.9, 0.9, 0.9, 0.9, 0.9, 0.2, 0.9, 0.9]),
+        ("51F12845", 0.8, [0.9, 0.9, 0.9, 0.9, 0.9, 0.95, 0.9, 0.9]),
+    ]
+    assert vote_text(reads)[0] == "51F12845"
+
+
+def test_length_weighted_and_empty_reads():
+    # 2 lần đọc 8 ký tự thắng 1 lần đọc 9 ký tự score cao hơn
+    assert vote_text([("51F123456", 0.9), ("51F12345", 0.5), ("51F12345", 0.5)])[0] == "51F12345"
+    assert vote_text([("", 0.9), ("---", 0.9)]) == (None, 0.0)
+
+
+def _record(store, text, score, budget=3):
+    return store.record_read(
+        "plate_1", text, score, budget=budget, accept_score=0.9, lost_seconds=100,
+        validator=lambda t: len(normalize_read(t)) == 8
+    )
+
+
+def test_confident_valid_read_finalizes_immediately():
+    store = TrackStateStore(clock=lambda: 0.0)
+    store.touch("plate_1")
+    state, final = _record(store, "51F12345", 0.95)
+    assert final and state.status == STATUS_DONE
+
+
+def test_uncertain_read_is_verified_then_agreement_finalizes():
+    store = TrackStateStore(clock=lambda: 0.0)
+    store.touch("plate_1")
+
+    state, final = _record(store, "51F1Z345", 0.6)
+    assert not final and state.status == STATUS_VERIFYING and state.needs_ocr
+
+    state, final = _record(store, "51F12345", 0.7)
+    assert not final  # 2 lần đọc khác nhau
+
+    state, final = _record(store, "51F12345", 0.7)
+    assert final and state.text == "51F12345"
+
+
+def test_budget_exhausted_votes_or_gives_up():
+    store = TrackStateStore(clock=lambda: 0.0)
+    store.touch("plate_1")
+    _record(store, "51F12345", 0.6, budget=2)
+    state, final = _record(store, "51F12845", 0.5, budget=2)
+    assert final and state.status == STATUS_DONE and state.text == "51F12345"
+
+    store.touch("plate_2")
+    for _ in range(2):
+        state, final = store.record_read(
+            "plate_2", "No text", 0.0, budget=2, accept_score=0.9, lost_seconds=100, validator=lambda t: True
+        )
+    assert final and state.status == STATUS_NO_TEXT
@@ -0,0 +1,84 @@
+"""
+TrackStateStore: evict theo TTL (track mất) và LRU (vượt max_tracks), đồng hồ giả
+"""
+
+from app.ai.track_state import TrackStateStore, STATUS_PENDING
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _store(max_tracks=1024, ttl_seconds=10.0):
+    clock = _Clock()
+    return TrackStateStore(max_tracks=max_tracks, ttl_seconds=ttl_seconds, clock=clock), clock
+
+
+def test_touch_reuses_state():
+    store, clock = _store()
+    state = store.touch("plate_1")
+    clock.now = 1.0
+    assert store.touch("plate_1") is state
+    assert state.last_seen == 1.0
+    assert len(store) == 1
+
+
+def test_ttl_evicts_only_lost_tracks():
+    store, clock = _store(ttl_seconds=5.0)
+    store.touch("plate_1")
+    clock.now = 3.0
+    store.touch("plate_2")
+
+    clock.now = 6.0
+    store.evict_expired()
+    assert store.get("plate_1") is None  # Không thấy 6s > ttl
+    assert store.get("plate_2") is not None
+
+    clock.now = 8.5
+    store.evict_expired()
+    assert len(store) == 0
+    assert store.get_stats()["evicted"] == 2
+
+
+def test_lru_evicts_least_recently_seen():
+    store, clock = _store(max_tracks=2)
+    store.touch("plate_1")
+    clock.now = 1.0
+    store.touch("plate_2")
+    clock.now = 2.0
+    store.touch("plate_1")  # plate_1 vừa thấy lại → plate_2 cũ nhất
+
+    clock.now = 3.0
+    store.touch("plate_3")
+
+    assert store.get("plate_2") is None
+    assert store.get("plate_1") is not None and store.get("plate_3") is not None
+    assert store.get_stats() == {"tracks": 2, "max_tracks": 2, "evicted": 1}
+
+
+def test_read_for_evicted_track_is_ignored():
+    store, clock = _store(ttl_seconds=1.0)
+    store.touch("plate_1")
+    store.set_pending("plate_1")
+    clock.now = 5.0
+    store.evict_expired()
+
+    # Kết quả OCR về muộn sau khi track đã bị evict
+    state, final = store.record_read(
+        "plate_1", "51F12345", 0.99, budget=3, accept_score=0.9, lost_seconds=1.0, validator=lambda t: True
+    )
+    assert state is None and final is False
+
+
+def test_clear_pending_allows_retry():
+    store, _ = _store()
+    state = store.touch("plate_1")
+    store.set_pending("plate_1")
+    assert state.status == STATUS_PENDING and not state.needs_ocr
+
+    store.clear_pending("plate_1")  # OCR pool quá tải → thử lại lần sau
+    assert state.needs_ocr